@@ -1,49 +1,83 @@
 import streamlit as st
-from langchain_google_genai import GoogleGenerativeAIEmbeddings, ChatGoogleGenerativeAI
-from langchain_community.vectorstores import Qdrant
-from langchain_qdrant import QdrantVectorStore
 import os
+import sys
 from dotenv import load_dotenv
 
+# Shared modules (e.g. llmTransport) live at the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from llmTransport import chat_model, embeddings
+from singleFlight import SingleFlight, normalize_query
+
 # Load environment variables
 load_dotenv()
 
-# Embeddings
-embedder = GoogleGenerativeAIEmbeddings(
-    model="models/embedding-001",
-    google_api_key=os.getenv("GEMINI_API_KEY"),
-)
+COLLECTIONS = ("html_docs", "django_docs", "sql_docs")
+
+
+# Rebuilt every 10 minutes so a re-ingest with another storage profile gets matching search params
+@st.cache_resource(ttl=600)
+def load_collections():
+    """{name: (vector store, search params)}, connected once instead of on every rerun."""
+    # LangChain and Qdrant are imported here, so the page renders before they load
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+    from langchain_qdrant import QdrantVectorStore
+    from qdrantProfiles import profile_of, search_params
+
+    # Embeddings (LLM_TRANSPORT=record/replay/stub runs them offline)
+    embedder = embeddings(GoogleGenerativeAIEmbeddings(
+        model="models/embedding-001",
+        google_api_key=os.getenv("GEMINI_API_KEY"),
+    ))
+    collections = {}
+    for name in COLLECTIONS:
+        store = QdrantVectorStore.from_existing_collection(
+            url="http://localhost:6333",
+            collection_name=name,
+            embedding=embedder,
+        )
+        # Rescoring and oversampling to match how the collection was stored at ingestion
+        collections[name] = (store, search_params(profile_of(store.client.get_collection(name))))
+    return collections
+
+
+@st.cache_resource
+def load_llm():
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    return chat_model(ChatGoogleGenerativeAI(
+        model="gemini-2.0-flash-001",
+        temperature=0.2,
+        google_api_key=os.getenv("GEMINI_API_KEY"),
+    ))
 
-# Load existing collections
-html_qdrant = QdrantVectorStore.from_existing_collection(
-    url="http://localhost:6333",
-    collection_name="html_docs",
-    embedding=embedder,
-)
-django_qdrant = QdrantVectorStore.from_existing_collection(
-    url="http://localhost:6333",
-    collection_name="django_docs",
-    embedding=embedder,
-)
-sql_qdrant = QdrantVectorStore.from_existing_collection(
-    url="http://localhost:6333",
-    collection_name="sql_docs",
-    embedding=embedder,
-)
 
 st.title("CHAI DOCS RAG ☕")
 
 st.sidebar.header("About")
 st.sidebar.text("This is a CHAI Docs RAG system built using LangChain and Qdrant.\n\nYou can ask questions about HTML, Django, or SQL, and the system will retrieve relevant answers based on documentation.")
 
+
+@st.cache_resource
+def query_flight():
+    """One per server process, so identical questions from different sessions share a call."""
+    return SingleFlight()
+
+
+flight = query_flight()
+
 query = st.text_input("💬 Enter your query:")
 
+# Load existing collections
+collections = load_collections()
+html_qdrant, html_params = collections["html_docs"]
+django_qdrant, django_params = collections["django_docs"]
+sql_qdrant, sql_params = collections["sql_docs"]
 
 if query:
     def handle_query(query):
-        retrieved_html_docs = html_qdrant.similarity_search_with_score(query, k=3)
-        retrieved_django_docs = django_qdrant.similarity_search_with_score(query, k=3)
-        retrieved_sql_docs = sql_qdrant.similarity_search_with_score(query, k=3)
+        retrieved_html_docs = html_qdrant.similarity_search_with_score(query, k=3, search_params=html_params)
+        retrieved_django_docs = django_qdrant.similarity_search_with_score(query, k=3, search_params=django_params)
+        retrieved_sql_docs = sql_qdrant.similarity_search_with_score(query, k=3, search_params=sql_params)
 
         context_html = "\n".join([doc.page_content for doc, _ in retrieved_html_docs])
         context_django = "\n".join([doc.page_content for doc, _ in retrieved_django_docs])
@@ -71,13 +105,7 @@ if query:
         Answer:
         """
 
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash-001",
-            temperature=0.2,
-            google_api_key=os.getenv("GEMINI_API_KEY"),
-        )
-
-        response = llm.invoke(prompt)
+        response = load_llm().invoke(prompt)
         answer = response.content
 
         sources_html = [(doc.metadata.get("source", "Unknown URL"), score) for doc, score in retrieved_html_docs if doc.metadata.get("source")]
@@ -92,7 +120,8 @@ if query:
 
         return answer, most_relevant_source
 
-    answer, source = handle_query(query)
+    # Identical questions already being answered for another user wait for that answer
+    answer, source = flight.do(normalize_query(query), handle_query, query)
 
     st.subheader("🧠 Answer:")
     st.write(answer)
@@ -103,3 +132,6 @@ if query:
     st.markdown("<hr>", unsafe_allow_html=True)
 else:
     st.text("💬 Enter a query to get started.")
+
+st.sidebar.header("Shared queries")
+st.sidebar.text(flight.summary())
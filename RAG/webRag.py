@@ -1,14 +1,42 @@
 # Correct uploader.py
+"""Ingest the docs sites into Qdrant without touching what RAG/app.py is serving.
+
+Each run builds a new versioned collection per docs set (html_docs_v<timestamp>...),
+waits until its payload indexes and HNSW graph are built, then moves the alias the app
+queries (html_docs...) to it in one atomic request. A failed run leaves the live
+collection untouched; old versions beyond KEEP_VERSIONS are deleted.
+
+Usage:
+    python RAG/webRag.py                      # re-ingest every docs set
+    python RAG/webRag.py --only sql_docs
+    python RAG/webRag.py --profile binary     # storage profile, see qdrantProfiles.py
+    python RAG/webRag.py rollback sql_docs    # point the alias back at the previous version
+    python RAG/webRag.py versions
+"""
 from langchain_community.document_loaders import WebBaseLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_community.vectorstores import Qdrant  # ✅ updated import
+from langchain_qdrant import QdrantVectorStore
+from qdrant_client import QdrantClient, models
+import argparse
 import os
+import sys
+import time
 import requests
 from dotenv import load_dotenv
 
+# Shared modules (e.g. qdrantProfiles) live at the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from docChunker import BoilerplateFilter, chunk_pages, parse_page
+from qdrantProfiles import PAYLOAD_INDEXES, PROFILE, PROFILES, collection_config
+
 load_dotenv()
 
+QDRANT_URL = os.getenv("QDRANT_URL", "http://localhost:6333")
+# Versions kept per alias (the live one included) so a bad ingest can be rolled back
+KEEP_VERSIONS = int(os.getenv("KEEP_VERSIONS", "2"))
+# Seconds to wait for a new version's index before giving up on the cutover
+INDEX_TIMEOUT = float(os.getenv("INDEX_TIMEOUT", "600"))
+
 # requests session with headers
 requests.adapters.DEFAULT_RETRIES = 5
 session = requests.Session()
@@ -16,64 +44,195 @@ session.headers.update({
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/123.0.0.0 Safari/537.36"
 })
 
-# Loaders
-html_loader = WebBaseLoader([
-    "https://chaidocs.vercel.app/youtube/chai-aur-html/introduction/",
-    "https://chaidocs.vercel.app/youtube/chai-aur-html/emmit-crash-course/",
-    "https://chaidocs.vercel.app/youtube/chai-aur-html/html-tags/",
-], session=session)
-
-django_loader = WebBaseLoader([
-    "https://chaidocs.vercel.app/youtube/chai-aur-django/getting-started/",
-    "https://chaidocs.vercel.app/youtube/chai-aur-django/jinja-templates/",
-    "https://chaidocs.vercel.app/youtube/chai-aur-django/tailwind/",
-    "https://chaidocs.vercel.app/youtube/chai-aur-django/models/",
-    "https://chaidocs.vercel.app/youtube/chai-aur-django/relationships-and-forms/",
-], session=session)
-
-sql_loader = WebBaseLoader([
-    "https://chaidocs.vercel.app/youtube/chai-aur-sql/postgres/",
-    "https://chaidocs.vercel.app/youtube/chai-aur-sql/normalization/",
-    "https://chaidocs.vercel.app/youtube/chai-aur-sql/database-design-exercise/",
-    "https://chaidocs.vercel.app/youtube/chai-aur-sql/joins-and-keys/",
-], session=session)
-
-html_docs = html_loader.load()
-django_docs = django_loader.load()
-sql_docs = sql_loader.load()
-print(f"✅ Loaded {len(html_docs)} HTML docs, {len(django_docs)} Django docs, {len(sql_docs)} SQL docs")
-
-splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-html_splits = splitter.split_documents(html_docs)
-django_splits = splitter.split_documents(django_docs)
-sql_splits = splitter.split_documents(sql_docs)
-print(f"✅ Split into {len(html_splits)} HTML chunks, {len(django_splits)} Django chunks, {len(sql_splits)} SQL chunks")
-
-embedder = GoogleGenerativeAIEmbeddings(
-    model="models/embedding-001",
-    google_api_key=os.getenv("GEMINI_API_KEY"),
-)
-
-# Upload to Qdrant using only url
-Qdrant.from_documents(
-    documents=html_splits,
-    embedding=embedder,
-    collection_name="html_docs",
-    url="http://localhost:6333",  # ✅ Pass url, not client
-)
-
-Qdrant.from_documents(
-    documents=django_splits,
-    embedding=embedder,
-    collection_name="django_docs",
-    url="http://localhost:6333",
-)
-
-Qdrant.from_documents(
-    documents=sql_splits,
-    embedding=embedder,
-    collection_name="sql_docs",
-    url="http://localhost:6333",
-)
-
-print("🎉 Successfully uploaded all collections!")
+# Alias the app queries -> pages to ingest
+SOURCES = {
+    "html_docs": [
+        "https://chaidocs.vercel.app/youtube/chai-aur-html/introduction/",
+        "https://chaidocs.vercel.app/youtube/chai-aur-html/emmit-crash-course/",
+        "https://chaidocs.vercel.app/youtube/chai-aur-html/html-tags/",
+    ],
+    "django_docs": [
+        "https://chaidocs.vercel.app/youtube/chai-aur-django/getting-started/",
+        "https://chaidocs.vercel.app/youtube/chai-aur-django/jinja-templates/",
+        "https://chaidocs.vercel.app/youtube/chai-aur-django/tailwind/",
+        "https://chaidocs.vercel.app/youtube/chai-aur-django/models/",
+        "https://chaidocs.vercel.app/youtube/chai-aur-django/relationships-and-forms/",
+    ],
+    "sql_docs": [
+        "https://chaidocs.vercel.app/youtube/chai-aur-sql/postgres/",
+        "https://chaidocs.vercel.app/youtube/chai-aur-sql/normalization/",
+        "https://chaidocs.vercel.app/youtube/chai-aur-sql/database-design-exercise/",
+        "https://chaidocs.vercel.app/youtube/chai-aur-sql/joins-and-keys/",
+    ],
+}
+
+# === Versions and aliases ===
+def version_name(alias):
+    return f"{alias}_v{time.strftime('%Y%m%d%H%M%S')}"
+
+
+def versions(client, alias):
+    """Versioned collections of an alias, oldest first."""
+    prefix = f"{alias}_v"
+    names = [c.name for c in client.get_collections().collections]
+    return sorted(name for name in names if name.startswith(prefix) and name[len(prefix):].isdigit())
+
+
+def alias_target(client, alias):
+    for description in client.get_aliases().aliases:
+        if description.alias_name == alias:
+            return description.collection_name
+    return None
+
+
+def create_version(client, alias, vector_size, profile=PROFILE):
+    name = version_name(alias)
+    client.create_collection(
+        collection_name=name,
+        **collection_config(vector_size, profile),
+        # No indexing while bulk uploading; the graph is built once at the end
+        optimizers_config=models.OptimizersConfigDiff(indexing_threshold=0),
+    )
+    for field, schema in PAYLOAD_INDEXES.items():
+        client.create_payload_index(collection_name=name, field_name=field, field_schema=schema, wait=True)
+    return name
+
+
+def wait_until_indexed(client, name, timeout=INDEX_TIMEOUT):
+    """Turn indexing on and block until every vector is in the HNSW graph."""
+    # A threshold of 1 KB indexes every segment, however small
+    client.update_collection(collection_name=name, optimizers_config=models.OptimizersConfigDiff(indexing_threshold=1))
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        info = client.get_collection(name)
+        points = info.points_count or 0
+        if info.status == models.CollectionStatus.GREEN and (info.indexed_vectors_count or 0) >= points:
+            return info
+        if info.status == models.CollectionStatus.RED:
+            raise RuntimeError(f"{name} failed to optimize: {info.optimizer_status}")
+        time.sleep(1)
+    raise TimeoutError(f"{name} was not indexed within {timeout:.0f}s")
+
+
+def swap_alias(client, alias, name):
+    """Point `alias` at `name` in one request, so queries see either the old or the new version."""
+    operations = []
+    if alias_target(client, alias):
+        operations.append(models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=alias)))
+    elif client.collection_exists(alias):
+        # First run after plain collections: the alias name is still taken by a collection
+        print(f"⚠️ {alias} is a plain collection; replacing it with an alias (brief gap on this run only)")
+        client.delete_collection(alias)
+    operations.append(models.CreateAliasOperation(
+        create_alias=models.CreateAlias(collection_name=name, alias_name=alias)
+    ))
+    client.update_collection_aliases(change_aliases_operations=operations)
+
+
+def collect_garbage(client, alias, keep=KEEP_VERSIONS):
+    """Delete old versions, never the live one."""
+    live = alias_target(client, alias)
+    stale = [name for name in versions(client, alias) if name != live]
+    removed = stale[: max(0, len(stale) - (keep - 1))]
+    for name in removed:
+        client.delete_collection(name)
+    return removed
+
+
+def rollback(client, alias):
+    live = alias_target(client, alias)
+    older = [name for name in versions(client, alias) if live is None or name < live]
+    if not older:
+        raise RuntimeError(f"No older version of {alias} to roll back to")
+    swap_alias(client, alias, older[-1])
+    return older[-1]
+
+
+# === Ingestion ===
+def load_pages(urls):
+    """{url: parsed page}, fetched through WebBaseLoader's session and retries."""
+    soups = WebBaseLoader(urls, session=session).scrape_all(urls)
+    return {url: parse_page(soup) for url, soup in zip(urls, soups)}
+
+
+def ingest(client, embedder, alias, splits, profile=PROFILE):
+    if not splits:
+        raise RuntimeError(f"No content loaded for {alias}; keeping the live version")
+
+    vector_size = len(embedder.embed_query("vector size probe"))
+    name = create_version(client, alias, vector_size, profile)
+    try:
+        store = QdrantVectorStore(client=client, collection_name=name, embedding=embedder)
+        store.add_documents(splits, batch_size=64)
+        info = wait_until_indexed(client, name)
+        swap_alias(client, alias, name)
+    except BaseException:
+        # The live version is untouched; drop the half-built one
+        client.delete_collection(name)
+        raise
+    removed = collect_garbage(client, alias)
+    print(f"🔀 {alias} -> {name} ({info.points_count} points, {profile} storage)" + (f", removed {', '.join(removed)}" if removed else ""))
+    return name
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest the docs into versioned Qdrant collections.")
+    parser.add_argument("command", nargs="?", default="ingest", choices=["ingest", "rollback", "versions"])
+    parser.add_argument("alias", nargs="?", help="docs set for rollback")
+    parser.add_argument("--only", action="append", choices=sorted(SOURCES), help="ingest just these docs sets")
+    parser.add_argument("--profile", default=PROFILE, choices=sorted(PROFILES), help="storage profile for new versions")
+    args = parser.parse_args()
+
+    client = QdrantClient(url=QDRANT_URL)
+
+    if args.command == "versions":
+        for alias in SOURCES:
+            live = alias_target(client, alias)
+            for name in versions(client, alias):
+                print(f"{'✅' if name == live else '  '} {alias}: {name}")
+        return
+    if args.command == "rollback":
+        if args.alias not in SOURCES:
+            parser.error(f"rollback needs one of: {', '.join(SOURCES)}")
+        print(f"↩️ {args.alias} -> {rollback(client, args.alias)}")
+        return
+
+    embedder = GoogleGenerativeAIEmbeddings(
+        model="models/embedding-001",
+        google_api_key=os.getenv("GEMINI_API_KEY"),
+    )
+    selected = args.only or list(SOURCES)
+    # Boilerplate is learned from every page of the site, whichever docs sets are ingested;
+    # a docs set that fails to load only fails its own ingest
+    pages, failed = {}, []
+    for alias, urls in SOURCES.items():
+        try:
+            pages[alias] = load_pages(urls)
+        except Exception as e:
+            if alias in selected:
+                failed.append(alias)
+                print(f"❌ {alias}: {e}")
+            else:
+                print(f"⚠️ {alias}: not loaded ({e}); boilerplate is learned without it")
+    boilerplate = BoilerplateFilter(page.blocks for site in pages.values() for page in site.values())
+
+    for alias in selected:
+        if alias not in pages:
+            continue
+        try:
+            splits, stats = chunk_pages(pages[alias], boilerplate)
+            print(f"✅ {alias}: {stats['pages']} pages, {stats['dropped_blocks']}/{stats['blocks']} boilerplate blocks "
+                  f"dropped, {stats['chunks']} chunks ({stats['chars']:,} chars)")
+            ingest(client, embedder, alias, splits, args.profile)
+        except Exception as e:
+            failed.append(alias)
+            print(f"❌ {alias}: {e}")
+
+    if failed:
+        print(f"⚠️ Kept the previous versions of {', '.join(failed)}")
+    else:
+        print("🎉 Successfully uploaded all collections!")
+
+
+if __name__ == "__main__":
+    main()
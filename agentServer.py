@@ -0,0 +1,472 @@
+"""Async multi-session server for codingAgent and weatherAgent.
+
+One process hosts many sessions over WebSockets. Model clients are shared, model
+calls and tool calls run on separate bounded thread pools, and each session gets a
+query rate limit and can cancel its running turn.
+
+The agents' tools run shell commands, so the server listens on localhost by default and
+every request except /health needs the token from AGENT_SERVER_TOKEN (or --token), sent as
+"Authorization: Bearer <token>" or ?token=<token>. Without one a random token is printed at startup.
+
+Usage:
+    python agentServer.py --port 8765
+    LLM_TRANSPORT=stub python agentServer.py        # no network, e.g. for load tests
+
+Connect to ws://host:port/coding or ws://host:port/weather (add ?session=<id> to resume) and send:
+    {"type": "query", "text": "..."}     run one user turn; steps stream back as they are generated
+    {"type": "cancel"}                   stop the running turn
+Server messages: session, step_start, delta, step, observe, retry, done, cancelled, rate_limited, error.
+GET /health and GET /stats (token required) are served over plain HTTP on the same port.
+"""
+import argparse
+import asyncio
+from abc import ABC, abstractmethod
+import json
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlparse
+
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosed
+
+from streamParser import iter_step_events
+from tokenBudget import ConversationBudget, get_counter
+from tracing import get_tracer
+
+TOKEN = os.getenv("AGENT_SERVER_TOKEN")
+MODEL_WORKERS = int(os.getenv("MODEL_WORKERS", "64"))
+TOOL_WORKERS = int(os.getenv("TOOL_WORKERS", "8"))
+TOOL_TIMEOUT = float(os.getenv("TOOL_TIMEOUT", "120"))
+# Tool calls a session may have running at once, counting ones that timed out but have not exited yet
+SESSION_TOOLS = int(os.getenv("SESSION_TOOLS", "2"))
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "2000"))
+# Idle sessions are dropped after this many seconds
+SESSION_TTL = float(os.getenv("SESSION_TTL", "1800"))
+# Per-session query rate limit: sustained queries per second and burst size
+SESSION_RATE = float(os.getenv("SESSION_RATE", "0.5"))
+SESSION_BURST = int(os.getenv("SESSION_BURST", "3"))
+MAX_STEPS = 25
+PREVIEW_CHARS = 500
+
+tracer = get_tracer("agentServer")
+
+
+class Cancelled(Exception):
+    pass
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self):
+        """Spend a token; returns 0 when allowed, otherwise seconds until the next one."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+# === Agents ===
+class Agent(ABC):
+    """How the server talks to one agent module; built once and shared by every session."""
+
+    final_step = "output"
+
+    def text_message(self, role, text):
+        from google.genai import types
+
+        return types.Content(role=role, parts=[types.Part.from_text(text=text)])
+
+    def first_messages(self):
+        return []
+
+    def new_tool_state(self):
+        """Per-session state handed to run_tool, so sessions never share mutable tool state."""
+        return None
+
+    @abstractmethod
+    def new_budget(self):
+        pass
+
+    @abstractmethod
+    def open_stream(self, messages):
+        pass
+
+    @abstractmethod
+    def has_tool(self, name):
+        pass
+
+    @abstractmethod
+    def run_tool(self, name, tool_input, state):
+        pass
+
+
+class CodingAgent(Agent):
+    def __init__(self):
+        import codingAgent
+
+        self.module = codingAgent
+
+    def new_tool_state(self):
+        # Each session queues and flushes its own deferred installs
+        return self.module.InstallPlanner()
+
+    def new_budget(self):
+        # The system prompt is sent through the shared prompt cache, not in the history
+        return ConversationBudget(get_counter("gemini"), fixed_text=self.module.system_prompt)
+
+    def open_stream(self, messages):
+        return self.module.prompt_cache.generate_content_stream(messages, self.module.generation_config())
+
+    def has_tool(self, name):
+        return name in self.module.available_tools
+
+    def run_tool(self, name, tool_input, state):
+        return self.module.dispatch_tool(name, tool_input, planner=state)
+
+
+class WeatherAgent(Agent):
+    def __init__(self):
+        import weatherAgent
+
+        self.module = weatherAgent
+
+    def first_messages(self):
+        return [self.text_message("user", self.module.system_prompt)]
+
+    def new_budget(self):
+        return ConversationBudget(get_counter("gemini"), pinned=1)
+
+    def open_stream(self, messages):
+        return self.module.client.models.generate_content_stream(
+            model="gemini-2.0-flash-001", contents=messages, config=self.module.generation_config()
+        )
+
+    def has_tool(self, name):
+        return name in self.module.avaiable_tools
+
+    def run_tool(self, name, tool_input, state):
+        return self.module.avaiable_tools[name]["fn"](tool_input)
+
+
+AGENTS = {"coding": CodingAgent, "weather": WeatherAgent}
+
+
+class Session:
+    def __init__(self, session_id, agent_name, agent):
+        self.id = session_id
+        self.agent_name = agent_name
+        self.agent = agent
+        self.messages = agent.first_messages()
+        self.budget = agent.new_budget()
+        self.tool_state = agent.new_tool_state()
+        self.bucket = TokenBucket(SESSION_RATE, SESSION_BURST)
+        self.task = None
+        self.cancel_event = threading.Event()
+        # Released by the tool worker when the call really ends, not when the turn gives up on it
+        self.tool_slots = threading.BoundedSemaphore(SESSION_TOOLS)
+        self.last_used = time.monotonic()
+        self.turns = 0
+
+    @property
+    def busy(self):
+        return self.task is not None and not self.task.done()
+
+
+# === Server ===
+class AgentServer:
+    def __init__(self, token, model_workers=MODEL_WORKERS, tool_workers=TOOL_WORKERS, max_sessions=MAX_SESSIONS):
+        self.token = token
+        self.model_pool = ThreadPoolExecutor(model_workers, thread_name_prefix="model")
+        self.tool_pool = ThreadPoolExecutor(tool_workers, thread_name_prefix="tool")
+        self.max_sessions = max_sessions
+        self.sessions = {}
+        self.agents = {}
+        self.connections = 0
+        self.active = {"turns": 0, "model_calls": 0, "tool_calls": 0}
+        self.counts = {"turns": 0, "steps": 0, "tool_calls": 0, "tool_timeouts": 0, "tool_rejected": 0,
+                       "parse_retries": 0, "cancelled": 0, "rate_limited": 0, "errors": 0, "rejected": 0}
+        self.started = time.time()
+
+    def agent(self, name):
+        if name not in self.agents:
+            self.agents[name] = AGENTS[name]()
+        return self.agents[name]
+
+    # === Model calls (model pool) ===
+    def _stream_step(self, agent, messages, cancel, emit):
+        """Runs on a model worker: stream one step, forwarding events as they are parsed."""
+        stream = agent.open_stream(messages)
+        try:
+            for event in iter_step_events(chunk.text for chunk in stream):
+                if cancel.is_set():
+                    raise Cancelled()
+                if event.kind == "field" and event.key == "step":
+                    emit({"type": "step_start", "step": event.value})
+                elif event.kind == "delta":
+                    emit({"type": "delta", "text": event.value})
+                elif event.kind == "object":
+                    return event.value
+                elif event.kind == "error":
+                    raise json.JSONDecodeError("Invalid step object", event.value, 0)
+            raise json.JSONDecodeError("Stream ended before a complete step", "", 0)
+        finally:
+            close = getattr(stream, "close", None)
+            if close:
+                close()
+
+    async def next_step(self, session, cancel, send):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        emit = lambda message: loop.call_soon_threadsafe(queue.put_nowait, message)
+        self.active["model_calls"] += 1
+        try:
+            future = loop.run_in_executor(
+                self.model_pool, self._stream_step, session.agent, list(session.messages), cancel, emit
+            )
+            while True:
+                getter = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait({future, getter}, return_when=asyncio.FIRST_COMPLETED)
+                if getter in done:
+                    await send(getter.result())
+                    continue
+                getter.cancel()
+                while not queue.empty():
+                    await send(queue.get_nowait())
+                return future.result()
+        finally:
+            self.active["model_calls"] -= 1
+
+    # === Tool calls (tool pool) ===
+    async def run_tool(self, session, name, tool_input):
+        if not session.agent.has_tool(name):
+            return f"[ERROR] Unknown tool: {name}"
+        if not session.tool_slots.acquire(blocking=False):
+            self.counts["tool_rejected"] += 1
+            return f"[ERROR] {SESSION_TOOLS} tool calls of this session are still running; try again later"
+
+        def call():
+            try:
+                return session.agent.run_tool(name, tool_input, session.tool_state)
+            finally:
+                session.tool_slots.release()
+
+        loop = asyncio.get_running_loop()
+        self.active["tool_calls"] += 1
+        self.counts["tool_calls"] += 1
+        try:
+            with tracer.span("tool.call", tool=name, session=session.id):
+                return await asyncio.wait_for(loop.run_in_executor(self.tool_pool, call), TOOL_TIMEOUT)
+        except asyncio.TimeoutError:
+            # The session moves on; shell tools kill their command at the same limit, and until
+            # the worker returns the call keeps holding one of the session's tool slots
+            self.counts["tool_timeouts"] += 1
+            return f"[ERROR] Tool {name} timed out after {TOOL_TIMEOUT:.0f} seconds"
+        except Exception as e:
+            return f"[ERROR] Exception during tool execution: {str(e)}"
+        finally:
+            self.active["tool_calls"] -= 1
+
+    # === Turns ===
+    async def run_turn(self, session, text, send):
+        start = time.perf_counter()
+        cancel = session.cancel_event = threading.Event()
+        agent = session.agent
+        session.messages.append(agent.text_message("user", text))
+        session.turns += 1
+        self.counts["turns"] += 1
+        self.active["turns"] += 1
+        try:
+            with tracer.span("turn", agent=session.agent_name, session=session.id):
+                for _ in range(MAX_STEPS):
+                    session.budget.fit(session.messages)
+                    try:
+                        with tracer.span("model.call", session=session.id):
+                            step = await self.next_step(session, cancel, send)
+                    except json.JSONDecodeError as e:
+                        self.counts["parse_retries"] += 1
+                        await send({"type": "retry", "reason": e.msg})
+                        continue
+                    self.counts["steps"] += 1
+                    session.messages.append(agent.text_message("assistant", json.dumps(step)))
+                    await send({"type": "step", "step": step})
+
+                    kind = str(step.get("step", "")).lower()
+                    if kind == "action":
+                        name = step.get("function")
+                        output = await self.run_tool(session, name, step.get("input"))
+                        session.messages.append(
+                            agent.text_message("user", json.dumps({"step": "observe", "output": output}))
+                        )
+                        output = str(output)
+                        preview = output[:PREVIEW_CHARS] + ("..." if len(output) > PREVIEW_CHARS else "")
+                        await send({"type": "observe", "tool": name, "output": preview})
+                    elif kind == agent.final_step:
+                        await send({"type": "done", "answer": step.get("content", ""),
+                                    "seconds": round(time.perf_counter() - start, 3)})
+                        return
+                await send({"type": "error", "message": f"No final answer after {MAX_STEPS} steps"})
+        except (asyncio.CancelledError, Cancelled):
+            cancel.set()
+            self.counts["cancelled"] += 1
+            await send({"type": "cancelled"})
+        except Exception as e:
+            self.counts["errors"] += 1
+            await send({"type": "error", "message": str(e)})
+        finally:
+            self.active["turns"] -= 1
+            session.last_used = time.monotonic()
+
+    def cancel(self, session):
+        if session.busy:
+            session.cancel_event.set()
+            session.task.cancel()
+
+    # === Connections ===
+    def open_session(self, agent_name, session_id):
+        session = self.sessions.get(session_id) if session_id else None
+        if session is not None and session.agent_name == agent_name:
+            return session
+        if len(self.sessions) >= self.max_sessions:
+            return None
+        session = Session(secrets.token_hex(8), agent_name, self.agent(agent_name))
+        self.sessions[session.id] = session
+        return session
+
+    async def handler(self, websocket):
+        url = urlparse(websocket.request.path)
+        agent_name = url.path.strip("/") or "coding"
+        if agent_name not in AGENTS:
+            await websocket.close(1008, f"unknown agent {agent_name}")
+            return
+        session = self.open_session(agent_name, parse_qs(url.query).get("session", [None])[0])
+        if session is None:
+            self.counts["rejected"] += 1
+            await websocket.close(1013, "too many sessions")
+            return
+
+        async def send(message):
+            try:
+                await websocket.send(json.dumps(message))
+            except ConnectionClosed:
+                pass
+
+        self.connections += 1
+        try:
+            await send({"type": "session", "id": session.id, "agent": agent_name})
+            async for raw in websocket:
+                try:
+                    message = json.loads(raw)
+                except json.JSONDecodeError:
+                    await send({"type": "error", "message": "messages must be JSON"})
+                    continue
+                kind = message.get("type")
+                if kind == "query":
+                    if session.busy:
+                        await send({"type": "error", "message": "a turn is already running; cancel it first"})
+                        continue
+                    wait = session.bucket.take()
+                    if wait:
+                        self.counts["rate_limited"] += 1
+                        await send({"type": "rate_limited", "retry_after": round(wait, 2)})
+                        continue
+                    session.task = asyncio.create_task(self.run_turn(session, str(message.get("text", "")), send))
+                elif kind == "cancel":
+                    self.cancel(session)
+                else:
+                    await send({"type": "error", "message": f"unknown message type {kind}"})
+        except ConnectionClosed:
+            pass
+        finally:
+            self.connections -= 1
+            # Nobody is listening any more; the session itself stays resumable until it expires
+            self.cancel(session)
+
+    def stats(self):
+        return {
+            "uptime": round(time.time() - self.started, 1),
+            "sessions": len(self.sessions),
+            "connections": self.connections,
+            "active": dict(self.active),
+            "counts": dict(self.counts),
+            "workers": {"model": self.model_pool._max_workers, "tool": self.tool_pool._max_workers},
+        }
+
+    def authorized(self, request):
+        url = urlparse(request.path)
+        header = request.headers.get("Authorization", "")
+        token = header[len("Bearer "):] if header.startswith("Bearer ") else parse_qs(url.query).get("token", [""])[0]
+        return secrets.compare_digest(token.encode(), self.token.encode())
+
+    async def process_request(self, connection, request):
+        """Plain HTTP endpoints next to the WebSocket ones; everything but /health needs the token."""
+        path = urlparse(request.path).path
+        if path == "/health":
+            return connection.respond(HTTPStatus.OK, "ok\n")
+        if not self.authorized(request):
+            return connection.respond(HTTPStatus.UNAUTHORIZED, "missing or invalid token\n")
+        if path == "/stats":
+            response = connection.respond(HTTPStatus.OK, json.dumps(self.stats()) + "\n")
+            response.headers["Content-Type"] = "application/json"
+            return response
+        return None
+
+    async def reap(self, interval=60):
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            for session_id, session in list(self.sessions.items()):
+                if not session.busy and now - session.last_used > SESSION_TTL:
+                    del self.sessions[session_id]
+
+
+async def run_server(host, port, server):
+    # Import the agents and build their shared clients before the first connection
+    for name in AGENTS:
+        server.agent(name)
+    async with serve(server.handler, host, port, process_request=server.process_request,
+                     max_size=1 << 20, ping_interval=20) as ws_server:
+        reaper = asyncio.create_task(server.reap())
+        print(f"🚀 Agent server on ws://{host}:{port}/coding and ws://{host}:{port}/weather")
+        if host not in ("127.0.0.1", "localhost", "::1"):
+            print(f"⚠️ Listening on {host}: anyone who can reach it with the token can run shell commands here")
+        try:
+            await ws_server.serve_forever()
+        finally:
+            reaper.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve codingAgent and weatherAgent sessions over WebSockets.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--model-workers", type=int, default=MODEL_WORKERS, help="threads for model calls")
+    parser.add_argument("--tool-workers", type=int, default=TOOL_WORKERS, help="threads for tool calls")
+    parser.add_argument("--max-sessions", type=int, default=MAX_SESSIONS)
+    parser.add_argument("--token", default=TOKEN, help="required from clients (default: AGENT_SERVER_TOKEN)")
+    args = parser.parse_args()
+
+    token = args.token
+    if not token:
+        token = secrets.token_urlsafe(24)
+        print(f"🔑 No AGENT_SERVER_TOKEN set; clients must send this token: {token}")
+    server = AgentServer(token, args.model_workers, args.tool_workers, args.max_sessions)
+    try:
+        asyncio.run(run_server(args.host, args.port, server))
+    except KeyboardInterrupt:
+        print("\n👋 Server stopped")
+
+
+if __name__ == "__main__":
+    main()
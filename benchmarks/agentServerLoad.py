@@ -0,0 +1,137 @@
+"""Load test for agentServer.py: many concurrent sessions, each running a few tool-using turns.
+
+Run from the repo root (starts a stub-backed server, so no API key or network is needed):
+    python -m benchmarks.agentServerLoad --spawn --sessions 300 --turns 3
+    AGENT_SERVER_TOKEN=... python -m benchmarks.agentServerLoad --url ws://127.0.0.1:8765 --agent coding   # an already running server
+"""
+import argparse
+import asyncio
+import json
+import os
+import secrets
+import subprocess
+import sys
+import time
+import urllib.request
+
+from websockets.asyncio.client import connect
+
+from tracing import percentile
+
+
+def respond(request):
+    """Scripted stub model: one tool call, then the final answer."""
+    last = json.dumps(request["request"].get("contents", [])[-1:])
+    if "observe" in last:
+        return {"step": "output", "content": "Done: the command ran."}
+    return {"step": "action", "function": "run_command", "input": "true"}
+
+
+async def run_session(url, agent, turns, token, results):
+    start = time.perf_counter()
+    try:
+        async with connect(f"{url}/{agent}", open_timeout=60, max_size=1 << 20,
+                           additional_headers={"Authorization": f"Bearer {token}"}) as websocket:
+            json.loads(await websocket.recv())  # session
+            results["connect"].append(time.perf_counter() - start)
+            for turn in range(turns):
+                sent = time.perf_counter()
+                first = None
+                await websocket.send(json.dumps({"type": "query", "text": f"Run the load test, turn {turn}"}))
+                while True:
+                    message = json.loads(await websocket.recv())
+                    if first is None and message["type"] in ("step_start", "delta", "step"):
+                        first = time.perf_counter() - sent
+                    if message["type"] == "done":
+                        results["turn"].append(time.perf_counter() - sent)
+                        results["first_event"].append(first or 0.0)
+                        break
+                    if message["type"] == "rate_limited":
+                        await asyncio.sleep(message["retry_after"])
+                        await websocket.send(json.dumps({"type": "query", "text": f"Retry turn {turn}"}))
+                    elif message["type"] in ("error", "cancelled"):
+                        results["errors"].append(message.get("message", message["type"]))
+                        break
+    except Exception as e:
+        results["errors"].append(f"{type(e).__name__}: {e}")
+
+
+def spawn_server(port, latency, token):
+    env = {
+        **os.environ,
+        "AGENT_SERVER_TOKEN": token,
+        "LLM_TRANSPORT": "stub",
+        "LLM_STUB": "benchmarks.agentServerLoad:respond",
+        "LLM_STUB_LATENCY": str(latency),
+        # Every simulated user sends its turns back to back
+        "SESSION_BURST": "1000",
+    }
+    process = subprocess.Popen(
+        [sys.executable, "agentServer.py", "--port", str(port)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    for _ in range(300):
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1)
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("agentServer did not start")
+
+
+async def benchmark(url, agent, sessions, turns, token):
+    results = {"connect": [], "turn": [], "first_event": [], "errors": []}
+    start = time.perf_counter()
+    await asyncio.gather(*(run_session(url, agent, turns, token, results) for _ in range(sessions)))
+    results["seconds"] = time.perf_counter() - start
+    return results
+
+
+def report(results, sessions, turns, stats):
+    done = len(results["turn"])
+    print(f"{sessions} sessions x {turns} turns: {done} turns completed, {len(results['errors'])} errors, "
+          f"{results['seconds']:.2f}s, {done / results['seconds']:.1f} turns/s\n")
+    print(f"{'latency':<14}{'p50 s':>9}{'p95 s':>9}{'p99 s':>9}{'max s':>9}")
+    for name in ("connect", "first_event", "turn"):
+        values = results[name]
+        if values:
+            print(f"{name:<14}{percentile(values, 50):>9.3f}{percentile(values, 95):>9.3f}"
+                  f"{percentile(values, 99):>9.3f}{max(values):>9.3f}")
+    for error in sorted(set(results["errors"]))[:5]:
+        print(f"❌ {error}")
+    if stats:
+        print(f"\n📊 Server: {json.dumps(stats['counts'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test agentServer.py.")
+    parser.add_argument("--url", default="ws://127.0.0.1:8765")
+    parser.add_argument("--agent", default="weather", choices=["coding", "weather"])
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--spawn", action="store_true", help="start a stub-backed server on the --url port")
+    parser.add_argument("--latency", type=float, default=0.3, help="stub model latency per call, seconds")
+    parser.add_argument("--token", default=os.getenv("AGENT_SERVER_TOKEN"), help="server token (random with --spawn)")
+    args = parser.parse_args()
+
+    token = args.token or secrets.token_urlsafe(24)
+    port = int(args.url.rsplit(":", 1)[1])
+    process = spawn_server(port, args.latency, token) if args.spawn else None
+    try:
+        results = asyncio.run(benchmark(args.url, args.agent, args.sessions, args.turns, token))
+        http = args.url.replace("ws://", "http://").replace("wss://", "https://")
+        try:
+            request = urllib.request.Request(f"{http}/stats", headers={"Authorization": f"Bearer {token}"})
+            stats = json.load(urllib.request.urlopen(request, timeout=5))
+        except OSError:
+            stats = None
+        report(results, args.sessions, args.turns, stats)
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Train BytePairTokenizer and compare encode throughput with tiktoken's gpt-4o encoder.
+
+Run from the repo root:
+    python -m benchmarks.bpeTokenizer                     # 10 MB synthetic corpus
+    python -m benchmarks.bpeTokenizer --mb 100            # 100 MB synthetic corpus
+    python -m benchmarks.bpeTokenizer --file corpus.txt   # your own text
+"""
+import argparse
+import itertools
+import random
+import time
+
+import tiktoken
+
+from ownTokenizer import BytePairTokenizer
+
+SYLLABLES = ["ka", "chai", "ro", "de", "ve", "lo", "per", "na", "ti", "on", "ing", "ment", "sql", "py", "js", "the", "and"]
+PUNCTUATION = [".", ",", "!", "?", ":", ";", "()", "{}", "=>", "_"]
+
+
+def make_corpus(megabytes, seed=0):
+    """Zipf-ish pseudo-words with numbers and punctuation mixed in."""
+    rng = random.Random(seed)
+    words = ["".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 4))) for _ in range(20_000)]
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+    cumulative = list(itertools.accumulate(weights))
+    lines = []
+    size = 0
+    while size < megabytes * 1_000_000:
+        line_words = rng.choices(words, cum_weights=cumulative, k=rng.randint(5, 20))
+        if rng.random() < 0.3:
+            line_words.append(str(rng.randint(0, 99999)))
+        line = " ".join(line_words) + rng.choice(PUNCTUATION)
+        lines.append(line)
+        size += len(line) + 1
+    return "\n".join(lines)
+
+
+def throughput(fn, text, size_mb):
+    start = time.perf_counter()
+    tokens = fn(text)
+    seconds = time.perf_counter() - start
+    return len(tokens), size_mb / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mb", type=float, default=10, help="size of the synthetic corpus")
+    parser.add_argument("--file", help="train on this file instead of a synthetic corpus")
+    parser.add_argument("--vocab", type=int, default=8192, help="target vocab size")
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            corpus = f.read()
+    else:
+        corpus = make_corpus(args.mb)
+    size_mb = len(corpus.encode("utf-8")) / 1_000_000
+    print(f"corpus: {size_mb:.1f} MB")
+
+    start = time.perf_counter()
+    tokenizer = BytePairTokenizer().train(corpus.splitlines(keepends=True), args.vocab)
+    train_seconds = time.perf_counter() - start
+    print(f"train: {train_seconds:.1f}s to {tokenizer.vocab_size} tokens ({size_mb / train_seconds:.2f} MB/s)\n")
+
+    # Encode a held-out slice so the merge cache starts cold, then again warm
+    sample = make_corpus(min(size_mb, 5), seed=1) if not args.file else corpus[: 5_000_000]
+    sample_mb = len(sample.encode("utf-8")) / 1_000_000
+    encoder = tiktoken.encoding_for_model("gpt-4o")
+
+    rows = [
+        ("bpe (cold cache)",) + throughput(tokenizer.encode, sample, sample_mb),
+        ("bpe (warm cache)",) + throughput(tokenizer.encode, sample, sample_mb),
+        ("tiktoken gpt-4o",) + throughput(encoder.encode_ordinary, sample, sample_mb),
+    ]
+    assert tokenizer.decode(tokenizer.encode(sample)) == sample
+
+    print(f"encode sample: {sample_mb:.1f} MB")
+    print(f"{'encoder':<20}{'tokens':>12}{'bytes/token':>14}{'MB/s':>10}")
+    for name, count, mb_per_second in rows:
+        print(f"{name:<20}{count:>12}{sample_mb * 1_000_000 / count:>14.2f}{mb_per_second:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
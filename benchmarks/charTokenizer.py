@@ -0,0 +1,62 @@
+"""Throughput of EnglishCharTokenizer: nested-list encode/decode vs the array-backed path.
+
+Run from the repo root:
+    python -m benchmarks.charTokenizer          # 8 MB corpus
+    python -m benchmarks.charTokenizer 32       # 32 MB corpus
+"""
+import random
+import sys
+import time
+
+from ownTokenizer import EnglishCharTokenizer
+
+WORDS = "Humpty Dumpty sat on a wall had great fall 42 king's horses and all the men couldn't put him together again".split()
+
+
+def make_corpus(megabytes, seed=0):
+    rng = random.Random(seed)
+    lines = []
+    size = 0
+    while size < megabytes * 1_000_000:
+        line = " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 20)))
+        lines.append(line)
+        size += len(line) + 1
+    return "\n".join(lines)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main(megabytes):
+    tokenizer = EnglishCharTokenizer()
+    corpus = make_corpus(megabytes)
+    size_mb = len(corpus.encode("utf-8")) / 1_000_000
+    docs = corpus.split("\n")
+
+    nested, encode_old = timed(tokenizer.encode, corpus)
+    decoded_old, decode_old = timed(tokenizer.decode, nested)
+
+    encoded, encode_new = timed(tokenizer.encode_array, corpus)
+    decoded_new, decode_new = timed(tokenizer.decode_array, *encoded)
+
+    batch, encode_batch = timed(tokenizer.encode_batch, docs)
+    decoded_batch, decode_batch = timed(tokenizer.decode_batch, *batch)
+
+    assert decoded_new == decoded_old, "array round-trip differs from the nested-list one"
+    assert decoded_batch[:1000] == [tokenizer.decode(tokenizer.encode(doc)) for doc in docs[:1000]]
+
+    print(f"corpus: {size_mb:.1f} MB, {len(docs)} lines\n")
+    print(f"{'path':<16}{'encode MB/s':>14}{'decode MB/s':>14}")
+    for name, enc, dec in (
+        ("nested lists", encode_old, decode_old),
+        ("array", encode_new, decode_new),
+        ("array batch", encode_batch, decode_batch),
+    ):
+        print(f"{name:<16}{size_mb / enc:>14.1f}{size_mb / dec:>14.1f}")
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 8)
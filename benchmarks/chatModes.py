@@ -0,0 +1,62 @@
+"""Compare chat.py's per-step mode with the single structured call mode.
+
+Both modes run on chat.MODEL, so the numbers compare modes, not models: the per-step
+mode would otherwise send plan/action/observe steps to the router's cheap model.
+Pass --routed to keep that routing and measure what chat.py really does.
+
+Run from the repo root:
+    python -m benchmarks.chatModes
+    python -m benchmarks.chatModes "What is 12 * 17?" "Is 91 prime?"
+    python -m benchmarks.chatModes --routed
+"""
+import argparse
+import contextlib
+import io
+
+import chat
+
+DEFAULT_QUERIES = [
+    "What is 2 + 2?",
+    "What is 12 * 17?",
+    "Is 91 a prime number?",
+    "How many minutes are there in a week?",
+]
+
+
+def benchmark(queries, routed=False):
+    results = {}
+    cheap_model = chat.router.cheap_model
+    if not routed:
+        chat.router.cheap_model = chat.router.strong_model
+    try:
+        for name, run in (("steps", chat.run_steps), ("single", chat.run_single)):
+            runs = []
+            for query in queries:
+                # Keep the rendered steps out of the report
+                with contextlib.redirect_stdout(io.StringIO()):
+                    runs.append(run(query))
+            results[name] = runs
+    finally:
+        chat.router.cheap_model = cheap_model
+    return results
+
+
+def report(results, queries, routed=False):
+    models = f"steps routed between {chat.router.strong_model} and {chat.router.cheap_model}" if routed else f"all on {chat.MODEL}"
+    print(f"{len(queries)} queries, averages per query ({models})\n")
+    print(f"{'mode':<8}{'calls':>8}{'input tok':>12}{'output tok':>12}{'seconds':>10}")
+    for name, runs in results.items():
+        n = len(runs)
+        calls = sum(r["calls"] for r in runs) / n
+        input_tokens = sum(r["input_tokens"] for r in runs) / n
+        output_tokens = sum(r["output_tokens"] for r in runs) / n
+        seconds = sum(r["seconds"] for r in runs) / n
+        print(f"{name:<8}{calls:>8.1f}{input_tokens:>12.0f}{output_tokens:>12.0f}{seconds:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare chat.py's per-step and single-call modes.")
+    parser.add_argument("queries", nargs="*", default=DEFAULT_QUERIES)
+    parser.add_argument("--routed", action="store_true", help="let the router send cheap steps to the cheap model")
+    args = parser.parse_args()
+    report(benchmark(args.queries, args.routed), args.queries, args.routed)
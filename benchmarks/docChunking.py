@@ -0,0 +1,43 @@
+"""Compare the old recursive character splitter with docChunker on the RAG docs pages.
+
+Fetches the pages listed in RAG/webRag.py. Run from the repo root:
+    python -m benchmarks.docChunking
+"""
+import copy
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_community.document_loaders import WebBaseLoader
+
+import docChunker
+from RAG import webRag
+from tokenBudget import get_counter
+
+
+def measure(documents):
+    counter = get_counter("gemini")
+    tokens = [counter.count_text(d.page_content) for d in documents]
+    return {"chunks": len(documents), "tokens": sum(tokens), "avg": sum(tokens) / max(1, len(tokens))}
+
+
+def main():
+    urls = [url for urls in webRag.SOURCES.values() for url in urls]
+    soups = WebBaseLoader(urls, session=webRag.session).scrape_all(urls)
+
+    # What webRag.py did before: the page's whole text, 1000 char chunks with 200 chars of overlap
+    old_documents = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200).create_documents(
+        [soup.get_text() for soup in soups], metadatas=[{"source": url} for url in urls]
+    )
+
+    parsed = {url: docChunker.parse_page(copy.copy(soup)) for url, soup in zip(urls, soups)}
+    new_documents, stats = docChunker.chunk_pages(parsed)
+
+    print(f"{len(urls)} pages; docChunker dropped {stats['dropped_blocks']}/{stats['blocks']} blocks "
+          f"({stats['dropped_chars']:,} chars) as boilerplate\n")
+    print(f"{'chunker':<12}{'chunks':>8}{'tokens':>10}{'avg/chunk':>11}")
+    for name, documents in (("recursive", old_documents), ("docChunker", new_documents)):
+        row = measure(documents)
+        print(f"{name:<12}{row['chunks']:>8}{row['tokens']:>10,}{row['avg']:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Compare the Qdrant storage profiles: RAM per million vectors, search latency and recall@k.
+
+Needs the local Qdrant container (docker compose up -d). Uses clustered synthetic
+vectors sized like Gemini embeddings, so no embedding calls are made. Run from the repo root:
+    python -m benchmarks.qdrantProfiles
+    python -m benchmarks.qdrantProfiles --points 100000 --profiles float32 scalar binary
+"""
+import argparse
+import time
+
+import numpy as np
+from qdrant_client import QdrantClient, models
+
+import qdrantProfiles
+from RAG import webRag
+from tracing import percentile
+
+
+def dataset(points, queries, dim, clusters=200, seed=7):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    vectors = centers[rng.integers(clusters, size=points)] + 0.5 * rng.normal(size=(points, dim))
+    probes = centers[rng.integers(clusters, size=queries)] + 0.5 * rng.normal(size=(queries, dim))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    probes /= np.linalg.norm(probes, axis=1, keepdims=True)
+    return vectors.astype(np.float32), probes.astype(np.float32)
+
+
+def exact_neighbours(vectors, probes, k):
+    scores = probes @ vectors.T
+    return [set(row) for row in np.argpartition(-scores, k, axis=1)[:, :k].tolist()]
+
+
+def run_profile(client, name, vectors, probes, truth, k):
+    collection = f"profile_bench_{name}"
+    if client.collection_exists(collection):
+        client.delete_collection(collection)
+    start = time.perf_counter()
+    client.create_collection(
+        collection_name=collection,
+        **qdrantProfiles.collection_config(vectors.shape[1], name),
+        optimizers_config=models.OptimizersConfigDiff(indexing_threshold=0),
+    )
+    client.upload_collection(
+        collection, vectors=vectors, ids=range(len(vectors)),
+        payload=({"metadata": {"source": f"https://example.com/{i % 50}"}} for i in range(len(vectors))),
+        batch_size=512,
+    )
+    webRag.wait_until_indexed(client, collection)
+    build_seconds = time.perf_counter() - start
+
+    params = qdrantProfiles.search_params(name)
+    latencies, found = [], 0
+    try:
+        for probe, expected in zip(probes, truth):
+            start = time.perf_counter()
+            hits = client.query_points(collection, query=probe.tolist(), limit=k, search_params=params).points
+            latencies.append(time.perf_counter() - start)
+            found += len(expected & {hit.id for hit in hits})
+    finally:
+        client.delete_collection(collection)
+
+    return {
+        "ram_gb_per_million": qdrantProfiles.estimated_ram(name, 1_000_000, vectors.shape[1]) / 1e9,
+        "build_seconds": build_seconds,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "recall": found / (len(truth) * k),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Qdrant storage profiles.")
+    parser.add_argument("--url", default=webRag.QDRANT_URL)
+    parser.add_argument("--points", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--profiles", nargs="*", default=list(qdrantProfiles.PROFILES))
+    args = parser.parse_args()
+
+    client = QdrantClient(url=args.url, timeout=120)
+    vectors, probes = dataset(args.points, args.queries, args.dim)
+    truth = exact_neighbours(vectors, probes, args.k)
+
+    print(f"{args.points:,} vectors x {args.dim} dims, {args.queries} queries, recall@{args.k}\n")
+    print(f"{'profile':<10}{'RAM GB/1M (est)':>17}{'build s':>9}{'p50 ms':>8}{'p95 ms':>8}{'recall':>8}")
+    for name in args.profiles:
+        row = run_profile(client, name, vectors, probes, truth, args.k)
+        print(f"{name:<10}{row['ram_gb_per_million']:>17.2f}{row['build_seconds']:>9.1f}"
+              f"{row['p50_ms']:>8.2f}{row['p95_ms']:>8.2f}{row['recall']:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Check that searches keep working while RAG/webRag.py swaps in new collection versions.
+
+Needs the local Qdrant container (docker compose up -d). Uses random vectors, so no
+embedding calls are made. Run from the repo root:
+    python -m benchmarks.ragCutover
+    python -m benchmarks.ragCutover --points 50000 --swaps 3 --readers 8
+"""
+import argparse
+import random
+import threading
+import time
+
+from qdrant_client import QdrantClient, models
+
+from RAG import webRag
+from tracing import percentile
+
+ALIAS = "cutover_bench"
+
+
+def fill(client, name, points, size, batch=1000):
+    for start in range(0, points, batch):
+        client.upsert(name, points=[
+            models.PointStruct(
+                id=i,
+                vector=[random.random() for _ in range(size)],
+                payload={"page_content": f"chunk {i}", "metadata": {"source": f"https://example.com/{i % 50}"}},
+            )
+            for i in range(start, min(points, start + batch))
+        ], wait=True)
+
+
+def new_version(client, points, size):
+    name = webRag.create_version(client, ALIAS, size)
+    fill(client, name, points, size)
+    webRag.wait_until_indexed(client, name)
+    webRag.swap_alias(client, ALIAS, name)
+    webRag.collect_garbage(client, ALIAS)
+    # Version names have one-second resolution
+    time.sleep(1)
+    return name
+
+
+def reader(client, size, stop, phase, samples, errors):
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            hits = client.query_points(ALIAS, query=[random.random() for _ in range(size)], limit=3).points
+            if not hits:
+                errors.append((phase[0], "empty result"))
+        except Exception as e:
+            errors.append((phase[0], type(e).__name__))
+        samples.append((phase[0], time.perf_counter() - start))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure search latency and errors across alias swaps.")
+    parser.add_argument("--url", default=webRag.QDRANT_URL)
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--size", type=int, default=768)
+    parser.add_argument("--swaps", type=int, default=2)
+    parser.add_argument("--readers", type=int, default=4)
+    args = parser.parse_args()
+
+    client = QdrantClient(url=args.url)
+    print(f"📦 Building the first version ({args.points} points)...")
+    new_version(client, args.points, args.size)
+
+    stop, phase, samples, errors = threading.Event(), ["steady"], [], []
+    threads = [threading.Thread(target=reader, args=(client, args.size, stop, phase, samples, errors), daemon=True)
+               for _ in range(args.readers)]
+    for thread in threads:
+        thread.start()
+    try:
+        time.sleep(5)
+        for swap in range(args.swaps):
+            phase[0] = "reingest"
+            name = new_version(client, args.points, args.size)
+            print(f"🔀 Swap {swap + 1}: {ALIAS} -> {name}")
+            phase[0] = "steady"
+            time.sleep(5)
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+        for name in webRag.versions(client, ALIAS):
+            client.delete_collection(name)
+
+    print(f"\n{'phase':<10}{'searches':>10}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name in ("steady", "reingest"):
+        seconds = [s for p, s in samples if p == name]
+        if seconds:
+            failed = sum(1 for p, _ in errors if p == name)
+            print(f"{name:<10}{len(seconds):>10}{failed:>8}{percentile(seconds, 50) * 1000:>9.1f}"
+                  f"{percentile(seconds, 95) * 1000:>9.1f}{percentile(seconds, 99) * 1000:>9.1f}")
+    for error in sorted(set(e for _, e in errors))[:5]:
+        print(f"❌ {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Startup cost of the entry points: import time, time to the first prompt, Streamlit reruns.
+
+Each CLI agent is profiled with `python -X importtime` and then started for real until its
+input prompt shows; the Streamlit apps are run headless with streamlit's AppTest, once cold
+and then rerun in the same process the way a widget change reruns them. Models run on the
+stub transport, so no API key or network is needed. Run from the repo root:
+    python -m benchmarks.startupTime
+    python -m benchmarks.startupTime --runs 10 --json startup.jsonl   # append results to track them
+"""
+import argparse
+import json
+import os
+import re
+import selectors
+import subprocess
+import sys
+import tempfile
+import time
+
+from tracing import percentile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Entry point -> the input prompt it prints once it is ready
+AGENTS = {"codingAgent": "You: ", "weatherAgent": "> ", "chat": "> "}
+APPS = ["hitesh.py", "RAG/app.py"]
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)")
+
+
+def child_env():
+    env = dict(os.environ, PYTHONUNBUFFERED="1")
+    env.setdefault("LLM_TRANSPORT", "stub")
+    env.pop("TRACE_FILE", None)
+    return env
+
+
+# === CLI agents ===
+def import_profile(module, top=4):
+    """(cumulative import ms, [(name, ms)] of its heaviest direct imports)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=child_env(), capture_output=True, text=True,
+    )
+    children = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        cumulative, level, name = int(match[2]), (len(match[3]) - 1) // 2, match[4]
+        if level == 1:
+            children.append((name, cumulative / 1000))
+        elif level == 0 and name == module:
+            return cumulative / 1000, sorted(children, key=lambda c: -c[1])[:top]
+        elif level == 0:
+            children = []
+    raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+
+def time_to_prompt(args, prompt, timeout=60):
+    """Seconds from spawning the process until `prompt` is printed."""
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable] + args, cwd=ROOT, env=child_env(),
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    )
+    output = b""
+    try:
+        with selectors.DefaultSelector() as selector:
+            selector.register(process.stdout, selectors.EVENT_READ)
+            while prompt.encode() not in output:
+                remaining = timeout - (time.perf_counter() - start)
+                if remaining <= 0 or not selector.select(remaining):
+                    raise TimeoutError(f"no prompt from {' '.join(args)} within {timeout}s")
+                chunk = os.read(process.stdout.fileno(), 4096)
+                if not chunk:
+                    raise RuntimeError(f"{' '.join(args)} exited before prompting: {output[-500:]!r}")
+                output += chunk
+        return time.perf_counter() - start
+    finally:
+        process.kill()
+        process.wait()
+
+
+def measure_agents(runs):
+    # A bare interpreter reaching input() is the floor every entry point pays
+    baseline = [time_to_prompt(["-c", "input('> ')"], "> ") for _ in range(runs)]
+    rows = {"python (bare)": {"import_ms": 0.0, "prompt_ms": percentile(baseline, 50) * 1000, "heaviest": []}}
+    for module, prompt in AGENTS.items():
+        import_ms, heaviest = import_profile(module)
+        seconds = [time_to_prompt([f"{module}.py"], prompt) for _ in range(runs)]
+        rows[module] = {"import_ms": import_ms, "prompt_ms": percentile(seconds, 50) * 1000, "heaviest": heaviest}
+    return rows
+
+
+# === Streamlit apps ===
+def app_worker(path, reruns):
+    """Runs in a fresh process: one cold run, then reruns of the same session."""
+    from streamlit.testing.v1 import AppTest
+
+    start = time.perf_counter()
+    app = AppTest.from_file(os.path.join(ROOT, path), default_timeout=120)
+    app.run()
+    first = time.perf_counter() - start
+    seconds = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        app.run()
+        seconds.append(time.perf_counter() - start)
+    error = app.exception[0].message if app.exception else None
+    print(json.dumps({"first_ms": first * 1000, "rerun_p50_ms": percentile(seconds, 50) * 1000,
+                      "rerun_p95_ms": percentile(seconds, 95) * 1000, "error": error}))
+
+
+def measure_apps(reruns):
+    rows = {}
+    with tempfile.TemporaryDirectory() as scratch:
+        env = dict(child_env(), SESSION_DB=os.path.join(scratch, "sessions.db"))
+        for path in APPS:
+            result = subprocess.run(
+                [sys.executable, "-m", "benchmarks.startupTime", "--app-worker", path, "--reruns", str(reruns)],
+                cwd=ROOT, env=env, capture_output=True, text=True,
+            )
+            lines = result.stdout.strip().splitlines()
+            if result.returncode or not lines:
+                rows[path] = {"error": (result.stderr.strip().splitlines() or ["worker failed"])[-1]}
+            else:
+                rows[path] = json.loads(lines[-1])
+    return rows
+
+
+# === Report ===
+def report(agents, apps, runs, reruns):
+    print(f"CLI agents, median of {runs} starts\n")
+    print(f"{'entry point':<16}{'import ms':>11}{'prompt ms':>11}  heaviest imports")
+    for name, row in agents.items():
+        heaviest = ", ".join(f"{module} {ms:.0f}" for module, ms in row["heaviest"])
+        print(f"{name:<16}{row['import_ms']:>11.0f}{row['prompt_ms']:>11.0f}  {heaviest}")
+
+    print(f"\nStreamlit apps, {reruns} reruns each\n")
+    print(f"{'app':<16}{'first ms':>11}{'rerun p50':>11}{'rerun p95':>11}")
+    for path, row in apps.items():
+        if "first_ms" in row:
+            print(f"{path:<16}{row['first_ms']:>11.0f}{row['rerun_p50_ms']:>11.1f}{row['rerun_p95_ms']:>11.1f}")
+        if row.get("error"):
+            print(f"{'':<16}⚠️ {row['error'][:100]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure entry point startup and Streamlit rerun cost.")
+    parser.add_argument("--runs", type=int, default=5, help="starts per CLI agent")
+    parser.add_argument("--reruns", type=int, default=20, help="reruns per Streamlit app")
+    parser.add_argument("--json", help="append the results to this JSONL file")
+    parser.add_argument("--app-worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.app_worker:
+        app_worker(args.app_worker, args.reruns)
+        return
+
+    agents = measure_agents(args.runs)
+    apps = measure_apps(args.reruns)
+    report(agents, apps, args.runs, args.reruns)
+    if args.json:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+        with open(args.json, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"time": time.time(), "revision": revision.stdout.strip(),
+                                "agents": agents, "apps": apps}) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,34 @@
+import functools
 import json
-from google import genai
-from google.genai import types
+import time
 import os
 from dotenv import load_dotenv
+from lazyImport import lazy_import, prewarm
+from streamParser import iter_step_events
+from llmTransport import gemini_client
+from modelRouter import ModelRouter
+from tokenBudget import ConversationBudget, get_counter
+from tracing import get_tracer
 
 load_dotenv()
 
-# Initialize Gemini client
-client = genai.Client(
+# The SDK loads on first use (prewarmed while main() waits for the query)
+types = lazy_import("google.genai.types")
+
+# Stream each step as it is generated (set STREAM=0 to wait for the whole JSON object)
+STREAM = os.getenv("STREAM", "1") != "0"
+
+# "steps": one request per reasoning step, "single": every step in one structured response
+CHAT_MODE = os.getenv("CHAT_MODE", "steps")
+
+MODEL = "gemini-2.0-flash-001"
+STEPS = ["analyse", "think", "output", "validate", "result"]
+
+# Spans for each run and model call when TRACE_FILE is set
+tracer = get_tracer("chat")
+
+# Initialize Gemini client (LLM_TRANSPORT=record/replay/stub runs it offline)
+client = gemini_client(
     api_key=os.environ.get("GEMINI_API_KEY"),
 )
 
@@ -37,45 +58,219 @@ Response 4: { "step": "validate", "content": "Seems like 4 is the correct answer
 Response 5: { "step": "result", "content": "2 + 2 = 4 and that is calculated by adding all numbers" }
 """
 
-# Get initial user input
-query = input("> ")
+# Single call mode asks for the whole step list at once instead of one step per request
+single_prompt = system_prompt.replace(
+    "Respond only using the following JSON format:\n{ \"step\": \"string\", \"content\": \"string\" }\n\nAlways perform one step at a time and wait for the next input.",
+    "Respond with all of the steps at once as a JSON array, in order, ending with the \"result\" step:\n"
+    "[{ \"step\": \"string\", \"content\": \"string\" }, ...]",
+)
 
-# Initialize message history
-messages = [
-    types.Content(
-        role="user",
-        parts=[types.Part.from_text(text=f"{system_prompt}\nUser Input: {query}")],
+STEP_MAX_TOKENS = 200
+# Invalid or cut-off replies in a row before the run is given up
+MAX_RETRIES = 3
+
+
+@functools.cache
+def step_config():
+    return types.GenerateContentConfig(
+        max_output_tokens=STEP_MAX_TOKENS,
+        response_mime_type="application/json",
     )
-]
-
-while True:
-    # Send to Gemini
-    response = client.models.generate_content(
-        model="gemini-2.0-flash-001",
-        contents=messages,
-        config=types.GenerateContentConfig(
-            max_output_tokens=200,
-            response_mime_type="application/json",
+
+
+@functools.cache
+def single_config():
+    return types.GenerateContentConfig(
+        max_output_tokens=STEP_MAX_TOKENS * len(STEPS),
+        response_mime_type="application/json",
+        response_schema=types.Schema(
+            type=types.Type.ARRAY,
+            items=types.Schema(
+                type=types.Type.OBJECT,
+                properties={
+                    "step": types.Schema(type=types.Type.STRING, enum=STEPS),
+                    "content": types.Schema(type=types.Type.STRING),
+                },
+                required=["step", "content"],
+                property_ordering=["step", "content"],
+            ),
         ),
     )
 
-    parsed_response = json.loads(response.candidates[0].content.parts[0].text)
 
-    step = parsed_response.get("step")
-    content = parsed_response.get("content")
+# Analysing, validating and restating the result are cheap; thinking and solving stay on MODEL
+router = ModelRouter("chat", max_output_tokens=STEP_MAX_TOKENS, strong_steps={"think", "output"},
+                     strong_model=MODEL)
+
+
+def new_stats():
+    return {"calls": 0, "input_tokens": 0, "output_tokens": 0, "seconds": 0.0}
+
+
+def add_usage(stats, usage):
+    if usage is None:
+        return
+    stats["input_tokens"] += usage.prompt_token_count or 0
+    stats["output_tokens"] += usage.candidates_token_count or 0
+
+
+def print_step(step, content):
+    icon = "🎉" if step.lower() == "result" else "🧠"
+    print(f"{icon} [{step.upper()}]: {content}")
+
+
+def generate(contents, config, stats, model=MODEL):
+    """Call Gemini once and return the step objects in the response, printing them as they arrive."""
+    with tracer.span("model.call", model=model, stream=STREAM) as span:
+        input_tokens, output_tokens = stats["input_tokens"], stats["output_tokens"]
+        steps = _generate(contents, config, stats, span, model)
+        span.set(
+            steps=len(steps),
+            input_tokens=stats["input_tokens"] - input_tokens,
+            output_tokens=stats["output_tokens"] - output_tokens,
+        )
+        return steps
+
+
+def _generate(contents, config, stats, span, model):
+    stats["calls"] += 1
+
+    if not STREAM:
+        response = client.models.generate_content(model=model, contents=contents, config=config)
+        add_usage(stats, response.usage_metadata)
+        text = response.candidates[0].content.parts[0].text
+        with tracer.span("parse", chars=len(text)):
+            parsed = json.loads(text)
+        steps = parsed if isinstance(parsed, list) else [parsed]
+        for parsed_step in steps:
+            if parsed_step.get("step") and parsed_step.get("content"):
+                print_step(parsed_step["step"], parsed_step["content"])
+        return steps
 
-    if not step or not content:
-        print("⚠️ Response missing 'step' or 'content'")
-        break
+    start = time.perf_counter()
+    stream = client.models.generate_content_stream(model=model, contents=contents, config=config)
+    usage = None
+
+    def texts():
+        nonlocal usage
+        for i, chunk in enumerate(stream):
+            if i == 0:
+                span.set(ttft=round(time.perf_counter() - start, 4))
+            # The last chunk carries the token counts for the whole response
+            usage = chunk.usage_metadata or usage
+            yield chunk.text
+
+    steps = []
+    for event in iter_step_events(texts()):
+        if event.kind == "field" and event.key == "step":
+            icon = "🎉" if event.value.lower() == "result" else "🧠"
+            print(f"{icon} [{event.value.upper()}]: ", end="", flush=True)
+        elif event.kind == "delta":
+            print(event.value, end="", flush=True)
+        elif event.kind == "object":
+            print()
+            steps.append(event.value)
+        elif event.kind == "error":
+            raise json.JSONDecodeError("Invalid step object", event.value, 0)
+
+    add_usage(stats, usage)
+    if not steps:
+        raise json.JSONDecodeError("Stream ended before a complete step", "", 0)
+    return steps
+
+
+def run_steps(query):
+    """Original mode: one request per reasoning step, resending the history each time."""
+    stats = new_stats()
+    start = time.perf_counter()
+
+    # Initialize message history
+    messages = [
+        types.Content(
+            role="user",
+            parts=[types.Part.from_text(text=f"{system_prompt}\nUser Input: {query}")],
+        )
+    ]
+
+    # The first message holds the system prompt and the question, so it is never trimmed
+    budget = ConversationBudget(get_counter("gemini"), pinned=1)
+
+    previous = "user"
+    retries = 0
+    while True:
+        if budget.fit(messages):
+            print(f"✂️ Trimmed old steps: {budget.summary()}")
+        input_tokens, output_tokens = stats["input_tokens"], stats["output_tokens"]
+        route = router.route(previous)
+        call_start = time.perf_counter()
+        try:
+            parsed_response = generate(messages, router.config(step_config(), route), stats, route.model)[0]
+        except json.JSONDecodeError:
+            # Cut off or malformed: the next attempt goes to the strong model
+            router.failed(route)
+            retries += 1
+            if retries >= MAX_RETRIES:
+                print(f"❌ No valid reply from the model after {MAX_RETRIES} attempts")
+                break
+            print("⚠️ Invalid JSON from the model, retrying")
+            continue
+        retries = 0
+        budget.calibrate(stats["input_tokens"] - input_tokens)
+
+        step = parsed_response.get("step")
+        content = parsed_response.get("content")
+        previous = str(step).lower()
+        router.record(route, previous, stats["input_tokens"] - input_tokens,
+                      stats["output_tokens"] - output_tokens, time.perf_counter() - call_start)
+
+        if not step or not content:
+            print("⚠️ Response missing 'step' or 'content'")
+            break
+
+        if step.lower() == "result":
+            break
 
-    if step.lower() == "result":
-        print(f"🎉 [{step.upper()}]: {content}")
-        break
-    else:
-        print(f"🧠 [{step.upper()}]: {content}")
         messages.append(
             types.Content(
                 role="model",
                 parts=[types.Part.from_text(text=json.dumps(parsed_response))],
             )
         )
+
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+
+def run_single(query):
+    """Ask for the whole step list in one structured response and render it locally."""
+    stats = new_stats()
+    start = time.perf_counter()
+
+    contents = [
+        types.Content(
+            role="user",
+            parts=[types.Part.from_text(text=f"{single_prompt}\nUser Input: {query}")],
+        )
+    ]
+    steps = generate(contents, single_config(), stats)
+    if not any(parsed_step.get("step", "").lower() == "result" for parsed_step in steps):
+        print("⚠️ Response missing the 'result' step")
+
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+
+def main():
+    prewarm("google.genai")
+    # Get initial user input
+    query = input("> ")
+    run = run_single if CHAT_MODE == "single" else run_steps
+    with tracer.span("turn", mode=CHAT_MODE, query_chars=len(query)):
+        run(query)
+    if run is run_steps:
+        print(f"🔀 Routing: {router.summary()}")
+        router.save()
+
+
+if __name__ == "__main__":
+    main()
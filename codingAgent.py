@@ -2,29 +2,55 @@ import os
 import json
 import re
 import shutil
+import functools
 from dotenv import load_dotenv
-from google import genai
-from google.genai import types
 import subprocess
-import requests
-import sqlite3
 from pathlib import Path
 import time
+from lazyImport import lazy_import, prewarm
+from llmTransport import gemini_client
+from streamParser import iter_step_events
+from installPlanner import InstallPlanner
+from modelRouter import ModelRouter
+from promptCache import PromptCache
+from tokenBudget import ConversationBudget, get_counter
+from tracing import get_tracer
 
 load_dotenv()
 
+# The SDK loads on first use (prewarmed while main() waits for the first query);
+# tool modules load the first time their tool is dispatched
+types = lazy_import("google.genai.types")
+requests = lazy_import("requests")
+sqlite3 = lazy_import("sqlite3")
+fileEdit = lazy_import("fileEdit")
+fileIndex = lazy_import("fileIndex")
+scaffold = lazy_import("scaffold")
+templateStore = lazy_import("templateStore")
+
 # === Gemini Client ===
-client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+client = gemini_client(api_key=os.getenv("GEMINI_API_KEY"))
+
+# Stream each step as it is generated (set STREAM=0 to wait for the whole JSON object)
+STREAM = os.getenv("STREAM", "1") != "0"
 
 
 # === Tool Definitions ===
-def run_command(command: str):
-    """Run a shell command and return the output."""
+# Shared across tool calls so overlapping installs are skipped or batched
+installer = InstallPlanner()
+
+# Spans for each turn, model call and tool call when TRACE_FILE is set
+tracer = get_tracer("codingAgent")
+
+
+def run_command(command: str, cwd=None):
+    """Run a shell command (in `cwd` if given) and return the output."""
     try:
         print(f"\n📋 Running command: {command}")
         process = subprocess.Popen(
             command, 
             shell=True, 
+            cwd=cwd,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
             text=True
@@ -43,38 +69,21 @@ def run_command(command: str):
 
 
 def create_folder_structure(structure, base_path="."):
-    """Create a folder structure from a nested dictionary."""
+    """Create a folder structure from a nested dictionary, all-or-nothing."""
     if isinstance(structure, str):
         try:
             structure = json.loads(structure)
         except json.JSONDecodeError:
             return "[ERROR] Invalid JSON format for folder structure"
-    
-    created_items = []
+    if not isinstance(structure, dict):
+        return "[ERROR] Folder structure must be a JSON object"
+
     try:
-        for name, content in structure.items():
-            path = os.path.join(base_path, name)
-            if isinstance(content, dict):  # folder
-                os.makedirs(path, exist_ok=True)
-                created_items.append(f"[DIR] {path}")
-                sub_items = create_folder_structure(content, path)
-                if isinstance(sub_items, list):
-                    created_items.extend(sub_items)
-                else:
-                    created_items.append(sub_items)
-            else:  # file
-                directory = os.path.dirname(path)
-                if directory:
-                    os.makedirs(directory, exist_ok=True)
-                with open(path, "w", encoding="utf-8") as f:
-                    f.write(content)
-                created_items.append(f"[FILE] {path}")
-        
-        if isinstance(base_path, str) and base_path == ".":
-            return created_items
-        return "\n".join(created_items) if created_items else "No items created"
+        return scaffold.format_manifest(scaffold.materialize(structure, base_path))
+    except scaffold.ScaffoldError as e:
+        return f"[ERROR] {str(e)}"
     except Exception as e:
-        return f"[ERROR] Failed to create folder structure: {str(e)}"
+        return f"[ERROR] Failed to create folder structure (nothing was written): {str(e)}"
 
 
 def read_folder_structure(base_path=".", max_depth=5, excluded_dirs=None):
@@ -120,16 +129,28 @@ def read_folder_structure(base_path=".", max_depth=5, excluded_dirs=None):
         return f"[ERROR] Failed to read folder structure: {str(e)}"
 
 
-def read_file(file_path):
-    """Read the content of a specific file."""
+def read_file(file_path, start_line=None, end_line=None, offset=None, length=None):
+    """Read a file, or a window of it by lines or bytes."""
     try:
-        with open(file_path, "r", encoding="utf-8") as file:
-            content = file.read()
-        return content
-    except UnicodeDecodeError:
-        return "[ERROR] File contains binary content that cannot be read as text"
+        # Handle JSON input
+        if isinstance(file_path, dict) or (isinstance(file_path, str) and file_path.startswith("{")):
+            params = json.loads(file_path) if isinstance(file_path, str) else file_path
+            file_path = params.get("file_path", "")
+            start_line = params.get("start_line")
+            end_line = params.get("end_line")
+            offset = params.get("offset")
+            length = params.get("length")
+        elif "|||" in file_path:
+            # Split format: "path|||start-end"
+            file_path, line_range = [part.strip() for part in file_path.split("|||", 1)]
+            start_line, _, end_line = line_range.partition("-")
+            start_line, end_line = start_line or None, end_line or None
+
+        return fileIndex.read_range(file_path, start_line, end_line, offset, length)
     except FileNotFoundError:
         return f"[ERROR] File not found: {file_path}"
+    except (json.JSONDecodeError, ValueError) as e:
+        return f"[ERROR] Invalid input for read_file: {str(e)}"
     except Exception as e:
         return f"[ERROR] Could not read file: {str(e)}"
 
@@ -164,6 +185,35 @@ def write_file(file_path, content=""):
         return f"[ERROR] Could not write to file: {str(e)}"
 
 
+def edit_file(file_path, patch=""):
+    """Apply SEARCH/REPLACE blocks or a unified diff to a file and return a short summary."""
+    try:
+        # Handle JSON input
+        if isinstance(file_path, dict) or (isinstance(file_path, str) and file_path.startswith("{")):
+            try:
+                params = json.loads(file_path) if isinstance(file_path, str) else file_path
+                file_path = params.get("file_path", "")
+                patch = params.get("patch", "")
+                if not patch and "search" in params:
+                    search = params["search"].removesuffix("\n")
+                    replace = params.get("replace", "").removesuffix("\n")
+                    # An empty replacement deletes the lines, so it gets no line of its own
+                    patch = f"<<<<<<< SEARCH\n{search}\n=======\n" + (f"{replace}\n" if replace else "") + ">>>>>>> REPLACE"
+            except json.JSONDecodeError:
+                pass
+        elif not patch:
+            # Split format, or a bare unified diff that names the file in its +++ header
+            parts = file_path.split("|||", 1)
+            if len(parts) == 2:
+                file_path, patch = parts[0].strip(), parts[1]
+            else:
+                file_path, patch = "", file_path
+
+        return fileEdit.apply_patch(file_path, patch)
+    except Exception as e:
+        return f"[ERROR] Could not edit file: {str(e)}"
+
+
 def search_files(pattern, file_type="", base_path=".", max_results=20):
     """Search for files containing a specific pattern."""
     try:
@@ -222,8 +272,11 @@ def search_files(pattern, file_type="", base_path=".", max_results=20):
         return f"[ERROR] Failed to search files: {str(e)}"
 
 
-def install_dependencies(packages, manager="npm"):
-    """Install dependencies using the specified package manager."""
+def install_dependencies(packages, manager="npm", directory=".", defer=False, planner=None):
+    """Install dependencies, skipping ones that are already satisfied and batching queued ones.
+
+    `planner` is the InstallPlanner holding the caller's queue; the module-wide one by default.
+    """
     try:
         # Handle JSON input
         if isinstance(packages, dict) or isinstance(packages, str) and packages.startswith("{"):
@@ -234,27 +287,17 @@ def install_dependencies(packages, manager="npm"):
                     params = packages
                 packages = params.get("packages", "")
                 manager = params.get("manager", "npm")
+                directory = params.get("directory", ".")
+                defer = bool(params.get("defer", False))
             except json.JSONDecodeError:
                 pass  # Fall back to using packages as a string
-                
-        managers = {
-            "npm": "npm install",
-            "yarn": "yarn add",
-            "pip": "pip install",
-            "pipenv": "pipenv install",
-            "composer": "composer require",
-        }
-        
-        if manager not in managers:
-            return f"[ERROR] Unsupported package manager: {manager}"
-        
-        command = f"{managers[manager]} {packages}"
-        return run_command(command)
+
+        return (planner or installer).add(packages, manager, directory, defer)
     except Exception as e:
         return f"[ERROR] Failed to install dependencies: {str(e)}"
 
 
-def initialize_project(project_type, project_name):
+def initialize_project(project_type, project_name=""):
     """Initialize a new project with boilerplate code."""
     try:
         # Handle JSON input
@@ -269,22 +312,12 @@ def initialize_project(project_type, project_name):
             except json.JSONDecodeError:
                 pass  # Fall back to using project_type as a string
                 
-        project_types = {
-            "react": f"npx create-react-app {project_name}",
-            "next": f"npx create-next-app {project_name}",
-            "vue": f"npm init vue@latest {project_name}",
-            "express": f"npx express-generator {project_name}",
-            "django": f"django-admin startproject {project_name}",
-            "flask": f"mkdir {project_name} && cd {project_name} && echo \"from flask import Flask\\n\\napp = Flask(__name__)\\n\\n@app.route('/')\\ndef home():\\n    return 'Hello, World!'\\n\\nif __name__ == '__main__':\\n    app.run(debug=True)\" > app.py",
-            "vite-react": f"npm create vite@latest {project_name} -- --template react",
-            "vite-vue": f"npm create vite@latest {project_name} -- --template vue",
-            "vite-svelte": f"npm create vite@latest {project_name} -- --template svelte",
-        }
-        
-        if project_type not in project_types:
-            return f"[ERROR] Unsupported project type: {project_type}. Available types: {', '.join(project_types.keys())}"
-        
-        return run_command(project_types[project_type])
+        if not project_type or not project_name:
+            return "[ERROR] Missing required parameters for initialize_project. Need project_type and project_name."
+
+        return templateStore.format_result(templateStore.instantiate(project_type, project_name))
+    except templateStore.TemplateError as e:
+        return f"[ERROR] {str(e)}"
     except Exception as e:
         return f"[ERROR] Failed to initialize project: {str(e)}"
 
@@ -307,22 +340,18 @@ def run_dev_server(command, directory="."):
         if not command:
             return "[ERROR] No command provided"
             
-        current_dir = os.getcwd()
+        # cwd= instead of os.chdir: the working directory is shared by every thread
         try:
-            os.chdir(directory)
-            
             # For Windows
             if os.name == 'nt':
-                process = subprocess.Popen(f"start cmd /k {command}", shell=True)
+                process = subprocess.Popen(f"start cmd /k {command}", shell=True, cwd=directory)
             # For Unix-like systems
             else:
-                process = subprocess.Popen(f"{command} &", shell=True)
+                process = subprocess.Popen(f"{command} &", shell=True, cwd=directory)
                 
-            os.chdir(current_dir)
             time.sleep(2)  # Give the server a moment to start
             return f"Development server started with command: {command} in directory: {directory}"
         except Exception as e:
-            os.chdir(current_dir)
             return f"[ERROR] Failed to start dev server: {str(e)}"
     except Exception as e:
         return f"[ERROR] Failed to parse parameters: {str(e)}"
@@ -411,15 +440,9 @@ def deploy_static_site(directory, platform="netlify"):
         if platform not in platforms:
             return f"[ERROR] Unsupported platform: {platform}. Available platforms: {', '.join(platforms.keys())}"
         
-        current_dir = os.getcwd()
-        try:
-            os.chdir(directory)
-            result = run_command(platforms[platform])
-            os.chdir(current_dir)
-            return result
-        except Exception as e:
-            os.chdir(current_dir)
-            return f"[ERROR] Deployment failed: {str(e)}"
+        if not os.path.isdir(directory):
+            return f"[ERROR] Directory not found: {directory}"
+        return run_command(platforms[platform], cwd=directory)
     except Exception as e:
         return f"[ERROR] Failed to parse parameters: {str(e)}"
 
@@ -537,12 +560,20 @@ available_tools = {
     },
     "read_file": {
         "fn": read_file,
-        "description": "Reads the content of a specific file",
+        "description": "Reads a file, or a range of its lines or bytes",
     },
     "write_file": {
         "fn": write_file,
         "description": "Writes content to a specific file",
     },
+    "edit_file": {
+        "fn": edit_file,
+        "description": "Applies SEARCH/REPLACE blocks or a unified diff to an existing file",
+    },
+    "apply_patch": {
+        "fn": edit_file,
+        "description": "Alias of edit_file for unified diffs",
+    },
     "search_files": {
         "fn": search_files,
         "description": "Searches for files containing a specific pattern",
@@ -611,13 +642,23 @@ system_prompt = """
     - run_command: Runs a shell command and returns the output
     - create_folder_structure: Creates folders/files from a nested dictionary
     - read_folder_structure: Reads the folder/file structure recursively
-    - read_file: Reads the content of a specific file
+    - read_file: Reads a file. Big files come back as their first 200 lines with a header saying how to read more. Use one of these formats:
+        1. Simple format: "path/to/file.js"
+        2. Line range: "logs/app.log|||500-700" or {"file_path": "logs/app.log", "start_line": 500, "end_line": 700}
+        3. Byte window: {"file_path": "dist/bundle.js", "offset": 1048576, "length": 4096}
     - write_file: Writes content to a specific file. Use one of these formats:
         1. JSON: {"file_path": "path/to/file.js", "content": "file content here"}
         2. Split format: "path/to/file.js|||file content here"
+    - edit_file: Changes part of an existing file. Prefer it over write_file for edits, and send only the changed region. Use one of these formats:
+        1. JSON: {"file_path": "src/app.js", "search": "exact old lines", "replace": "new lines"}
+        2. Split format with SEARCH/REPLACE blocks (several blocks allowed):
+           "src/app.js|||<<<<<<< SEARCH\\nold lines\\n=======\\nnew lines\\n>>>>>>> REPLACE"
+        3. A unified diff with ---/+++ headers and @@ hunks
+    - apply_patch: Same as edit_file, for unified diffs
     - search_files: Searches for files containing a specific pattern
-    - install_dependencies: Installs dependencies using a package manager. Use one of these formats:
-        1. JSON: {"packages": "react react-dom", "manager": "npm"}
+    - install_dependencies: Installs dependencies using a package manager. Packages that are already installed are skipped.
+      Add "defer": true to queue packages while you are still writing files; everything queued is installed in one batch before the next run_command/run_dev_server. Use one of these formats:
+        1. JSON: {"packages": "react react-dom", "manager": "npm", "directory": "my-app", "defer": true}
         2. Simple format: "react react-dom"
         3. With manager: "react react-dom --manager=yarn"
     - initialize_project: Initializes a new project with boilerplate code. Use one of these formats:
@@ -671,7 +712,15 @@ system_prompt = """
       "input": "src/utils/format.js|||export const formatDate = (date) => {\\n  return new Date(date).toLocaleDateString();\\n};"
     }
     
-    3. Using initialize_project with JSON format:
+    3. Using edit_file to change one function:
+    {
+      "step": "action",
+      "function": "edit_file",
+      "content": "Fixing the date format",
+      "input": "src/utils/format.js|||<<<<<<< SEARCH\\n  return new Date(date).toLocaleDateString();\\n=======\\n  return new Date(date).toISOString().slice(0, 10);\\n>>>>>>> REPLACE"
+    }
+
+    4. Using initialize_project with JSON format:
     {
       "step": "action",
       "function": "initialize_project",
@@ -679,7 +728,7 @@ system_prompt = """
       "input": "{\"project_type\": \"react\", \"project_name\": \"my-react-app\"}"
     }
     
-    4. Using initialize_project with simple format:
+    5. Using initialize_project with simple format:
     {
       "step": "action",
       "function": "initialize_project",
@@ -687,7 +736,7 @@ system_prompt = """
       "input": "react my-react-app"
     }
     
-    5. Using install_dependencies with JSON format:
+    6. Using install_dependencies with JSON format:
     {
       "step": "action",
       "function": "install_dependencies",
@@ -695,7 +744,7 @@ system_prompt = """
       "input": "{\"packages\": \"react react-dom\", \"manager\": \"npm\"}"
     }
     
-    6. Using install_dependencies with simple format:
+    7. Using install_dependencies with simple format:
     {
       "step": "action",
       "function": "install_dependencies",
@@ -705,9 +754,190 @@ system_prompt = """
 """
 
 
+# === Tool Dispatch ===
+def dispatch_tool(tool_name, tool_input, planner=None):
+    """Run a tool call from the model, handling the input formats each tool accepts.
+
+    `planner` holds the caller's deferred installs (one per server session); the
+    module-wide InstallPlanner by default.
+    """
+    planner = planner or installer
+    installed = ""
+    try:
+        result = None
+
+        # Deferred installs must land before anything runs the project
+        if tool_name in ("run_command", "run_dev_server", "deploy_static_site") and planner.pending:
+            installed = planner.flush()
+
+        # Special handling for write_file
+        if tool_name == "write_file":
+            try:
+                # Try parsing as JSON first
+                params = json.loads(tool_input)
+                if "file_path" in params and "content" in params:
+                    file_path = params["file_path"]
+                    content = params["content"]
+                    result = write_file(file_path, content)
+                else:
+                    result = write_file(tool_input)
+            except json.JSONDecodeError:
+                # If not JSON, try to extract file_path and content
+                parts = tool_input.split("|||", 1)
+                if len(parts) == 2:
+                    file_path, content = parts
+                    result = write_file(file_path.strip(), content)
+                else:
+                    result = f"[ERROR] Invalid input format for write_file. Expected JSON or 'file_path|||content'"
+
+        # Special handling for create_folder_structure
+        elif tool_name == "create_folder_structure":
+            result = create_folder_structure(tool_input)
+
+        # Special handling for initialize_project
+        elif tool_name == "initialize_project":
+            try:
+                # Parse as JSON if possible
+                try:
+                    params = json.loads(tool_input)
+                    if isinstance(params, dict):
+                        if "project_type" in params and "project_name" in params:
+                            result = initialize_project(
+                                project_type=params.get("project_type"),
+                                project_name=params.get("project_name")
+                            )
+                        else:
+                            result = f"[ERROR] Missing required parameters for initialize_project. Need project_type and project_name."
+                    else:
+                        result = f"[ERROR] Invalid format for initialize_project parameters."
+                except json.JSONDecodeError:
+                    # If not JSON, try to extract parameters
+                    parts = tool_input.split(" ", 1)
+                    if len(parts) == 2:
+                        project_type, project_name = parts
+                        result = initialize_project(
+                            project_type=project_type.strip(),
+                            project_name=project_name.strip()
+                        )
+                    else:
+                        result = f"[ERROR] Invalid input format for initialize_project. Expected 'project_type project_name' or JSON."
+            except Exception as e:
+                result = f"[ERROR] Failed to initialize project: {str(e)}"
+
+        # Special handling for install_dependencies
+        elif tool_name == "install_dependencies":
+            try:
+                # Parse as JSON if possible
+                try:
+                    params = json.loads(tool_input)
+                    result = install_dependencies(params if isinstance(params, dict) else tool_input, planner=planner)
+                except json.JSONDecodeError:
+                    # If not JSON, try to extract parameters
+                    if " --manager=" in tool_input:
+                        parts = tool_input.split(" --manager=", 1)
+                        packages = parts[0].strip()
+                        manager = parts[1].strip()
+                        result = install_dependencies(packages, manager, planner=planner)
+                    else:
+                        result = install_dependencies(tool_input, planner=planner)
+            except Exception as e:
+                result = f"[ERROR] Failed to install dependencies: {str(e)}"
+
+        # Handle other tools
+        else:
+            result = available_tools[tool_name]["fn"](tool_input)
+    except Exception as e:
+        result = f"[ERROR] Exception during tool execution: {str(e)}"
+
+    return f"{installed}\n{result}" if installed else result
+
+
+# === Model Calls ===
+# The system prompt is registered once as cached content instead of being resent every step
+prompt_cache = PromptCache(system_prompt, model="gemini-2.0-flash-001", client=client, display_name="codingAgent-system-prompt")
+# Cached content belongs to one model, so each routed model gets its own
+prompt_caches = {prompt_cache.model: prompt_cache}
+
+MAX_OUTPUT_TOKENS = 8192
+# Invalid or cut-off replies in a row before the turn is given up
+MAX_RETRIES = 3
+
+
+@functools.cache
+def generation_config():
+    return types.GenerateContentConfig(
+        temperature=0.6,
+        max_output_tokens=MAX_OUTPUT_TOKENS,
+        response_mime_type="application/json",
+    )
+
+
+# Plans and small tool calls go to a cheaper model; steps that write code stay on the strong one
+router = ModelRouter(
+    "codingAgent",
+    max_output_tokens=MAX_OUTPUT_TOKENS,
+    strong_steps={"action:write_file", "action:edit_file", "action:apply_patch", "action:create_folder_structure"},
+    strong_model=prompt_cache.model,
+)
+
+
+def cache_for(model):
+    if model not in prompt_caches:
+        prompt_caches[model] = PromptCache(system_prompt, model=model, client=client, display_name="codingAgent-system-prompt")
+    return prompt_caches[model]
+
+
+def step_label(step):
+    """Router label for a step: actions are told apart by tool, since writing code needs the strong model."""
+    kind = str(step.get("step", "")).lower()
+    return f"action:{step.get('function')}" if kind == "action" else kind
+
+
+def next_step(messages, route=None):
+    """Get the next step from Gemini.
+
+    Returns the parsed step and whether its content was already printed while streaming.
+    """
+    cache = cache_for(route.model) if route else prompt_cache
+    config = router.config(generation_config(), route) if route else generation_config()
+    if not STREAM:
+        response = cache.generate_content(messages, config)
+        response_text = response.candidates[0].content.parts[0].text
+        with tracer.span("parse", chars=len(response_text)):
+            return json.loads(response_text), False
+
+    stream = cache.generate_content_stream(messages, config)
+    printing = False
+    for event in iter_step_events(chunk.text for chunk in stream):
+        if event.kind == "field" and event.key == "step":
+            step = event.value.lower()
+            printing = step in ("plan", "output")
+            if step == "plan":
+                print("\n🧠 PLAN: ", end="", flush=True)
+            elif step == "output":
+                print("\n🤖 OUTPUT: ", end="", flush=True)
+        elif event.kind == "field" and event.key == "function":
+            # Big inputs (file contents) can take a while, show which tool is coming
+            print(f"\n⏳ Preparing {event.value}...", flush=True)
+        elif event.kind == "delta" and printing:
+            print(event.value, end="", flush=True)
+        elif event.kind == "object":
+            # Hand the step back as soon as it closes so actions dispatch immediately
+            if printing:
+                print()
+            return event.value, printing
+        elif event.kind == "error":
+            raise json.JSONDecodeError("Invalid step object", event.value, 0)
+    raise json.JSONDecodeError("Stream ended before a complete step", "", 0)
+
+
 # === Interactive Agent Loop ===
 def main():
-    messages = [types.Content(role="user", parts=[{"text": system_prompt}])]
+    # The system prompt prefix is added by prompt_cache
+    messages = []
+    # Built with the first query: counting the system prompt loads the tokenizer
+    budget = None
+    prewarm("google.genai")
 
     print("\n🤖 Fullstack Developer Coding Agent initialized!")
     print("🚀 How can I help you build your application today?")
@@ -717,168 +947,116 @@ def main():
             user_query = input("\n🧑‍💻 You: ")
             if user_query.lower() in ['exit', 'quit', 'bye']:
                 print("\n👋 Thank you for using the Fullstack Developer Coding Agent. Goodbye!")
+                if installer.pending:
+                    print(installer.flush())
+                for cache in prompt_caches.values():
+                    print(f"📊 Prompt usage ({cache.model}): {cache.summary()}")
+                print(f"🔀 Routing: {router.summary()}")
+                router.save()
+                print(f"📦 Installs: {installer.summary()}")
+                if budget:
+                    print(f"📊 Context: {budget.summary()}")
                 break
                 
+            if budget is None:
+                budget = ConversationBudget(get_counter("gemini"), fixed_text=system_prompt)
             messages.append(types.Content(role="user", parts=[{"text": user_query}]))
 
-            while True:
-                try:
-                    response = client.models.generate_content(
-                        model="gemini-2.0-flash-001",
-                        contents=messages,
-                        config=types.GenerateContentConfig(
-                            temperature=0.6,
-                            max_output_tokens=8192,
-                            response_mime_type="application/json",
-                        ),
-                    )
-
-                    response_text = response.candidates[0].content.parts[0].text
-                    res_json = json.loads(response_text)
-                    step = res_json["step"].lower()
-
-                    messages.append(
-                        types.Content(role="assistant", parts=[{"text": json.dumps(res_json)}])
-                    )
-
-                    if step == "plan":
-                        print(f"\n🧠 PLAN: {res_json['content']}")
-                        continue
+            with tracer.span("turn", query_chars=len(user_query)) as turn:
+                previous = "user"
+                retries = 0
+                while True:
+                    try:
+                        if budget.fit(messages):
+                            print(f"\n✂️ Trimmed old messages: {budget.summary()}")
+                        route = router.route(previous)
+                        cache = cache_for(route.model)
+                        calls = len(cache.calls)
+                        start = time.perf_counter()
+                        with tracer.span("model.call", model=route.model, stream=STREAM,
+                                         max_output_tokens=route.max_output_tokens) as call:
+                            try:
+                                res_json, printed = next_step(messages, route)
+                            except json.JSONDecodeError:
+                                router.failed(route)
+                                raise
+                            retries = 0
+                            call.set(step=str(res_json.get("step")))
+                            input_tokens, output_tokens = budget.total, get_counter("gemini").count_text(json.dumps(res_json))
+                            if len(cache.calls) > calls:
+                                usage = cache.calls[-1]
+                                budget.calibrate(usage["cached_tokens"] + usage["uncached_tokens"])
+                                input_tokens = usage["cached_tokens"] + usage["uncached_tokens"]
+                                output_tokens = usage["output_tokens"] or output_tokens
+                                call.set(
+                                    input_tokens=input_tokens,
+                                    cached_tokens=usage["cached_tokens"],
+                                    output_tokens=usage["output_tokens"],
+                                    ttft=round(usage["ttft"], 4),
+                                )
+                            router.record(route, step_label(res_json), input_tokens, output_tokens,
+                                          time.perf_counter() - start)
+                        step = res_json["step"].lower()
+                        previous = "observe" if step == "action" else step
 
-                    elif step == "action":
-                        tool_name = res_json["function"]
-                        tool_input = res_json["input"]
+                        messages.append(
+                            types.Content(role="assistant", parts=[{"text": json.dumps(res_json)}])
+                        )
 
-                        if tool_name in available_tools:
-                            print(f"\n⚙️ ACTION: Calling {tool_name}...")
-                            try:
-                                result = None
-                                
-                                # Special handling for write_file
-                                if tool_name == "write_file":
-                                    try:
-                                        # Try parsing as JSON first
-                                        params = json.loads(tool_input)
-                                        if "file_path" in params and "content" in params:
-                                            file_path = params["file_path"]
-                                            content = params["content"]
-                                            result = write_file(file_path, content)
-                                        else:
-                                            result = write_file(tool_input)
-                                    except json.JSONDecodeError:
-                                        # If not JSON, try to extract file_path and content
-                                        parts = tool_input.split("|||", 1)
-                                        if len(parts) == 2:
-                                            file_path, content = parts
-                                            result = write_file(file_path.strip(), content)
-                                        else:
-                                            result = f"[ERROR] Invalid input format for write_file. Expected JSON or 'file_path|||content'"
-                                
-                                # Special handling for create_folder_structure
-                                elif tool_name == "create_folder_structure":
-                                    try:
-                                        structure = json.loads(tool_input)
-                                        result = create_folder_structure(structure)
-                                    except json.JSONDecodeError:
-                                        result = f"[ERROR] Invalid JSON structure: {tool_input}"
-                                
-                                # Special handling for initialize_project
-                                elif tool_name == "initialize_project":
-                                    try:
-                                        # Parse as JSON if possible
-                                        try:
-                                            params = json.loads(tool_input)
-                                            if isinstance(params, dict):
-                                                if "project_type" in params and "project_name" in params:
-                                                    result = initialize_project(
-                                                        project_type=params.get("project_type"),
-                                                        project_name=params.get("project_name")
-                                                    )
-                                                else:
-                                                    result = f"[ERROR] Missing required parameters for initialize_project. Need project_type and project_name."
-                                            else:
-                                                result = f"[ERROR] Invalid format for initialize_project parameters."
-                                        except json.JSONDecodeError:
-                                            # If not JSON, try to extract parameters
-                                            parts = tool_input.split(" ", 1)
-                                            if len(parts) == 2:
-                                                project_type, project_name = parts
-                                                result = initialize_project(
-                                                    project_type=project_type.strip(),
-                                                    project_name=project_name.strip()
-                                                )
-                                            else:
-                                                result = f"[ERROR] Invalid input format for initialize_project. Expected 'project_type project_name' or JSON."
-                                    except Exception as e:
-                                        result = f"[ERROR] Failed to initialize project: {str(e)}"
-                                
-                                # Special handling for install_dependencies
-                                elif tool_name == "install_dependencies":
-                                    try:
-                                        # Parse as JSON if possible
-                                        try:
-                                            params = json.loads(tool_input)
-                                            if isinstance(params, dict):
-                                                packages = params.get("packages", "")
-                                                manager = params.get("manager", "npm")
-                                                result = install_dependencies(
-                                                    packages=packages,
-                                                    manager=manager
-                                                )
-                                            else:
-                                                result = install_dependencies(tool_input)
-                                        except json.JSONDecodeError:
-                                            # If not JSON, try to extract parameters
-                                            if " --manager=" in tool_input:
-                                                parts = tool_input.split(" --manager=", 1)
-                                                packages = parts[0].strip()
-                                                manager = parts[1].strip()
-                                                result = install_dependencies(packages, manager)
-                                            else:
-                                                result = install_dependencies(tool_input)
-                                    except Exception as e:
-                                        result = f"[ERROR] Failed to install dependencies: {str(e)}"
-                                
-                                # Handle other tools
-                                else:
-                                    result = available_tools[tool_name]["fn"](tool_input)
-                                    
-                            except Exception as e:
-                                result = f"[ERROR] Exception during tool execution: {str(e)}"
-
-                            obs = {"step": "observe", "output": result}
-                            messages.append(
-                                types.Content(role="user", parts=[{"text": json.dumps(obs)}])
-                            )
+                        if step == "plan":
+                            if not printed:
+                                print(f"\n🧠 PLAN: {res_json['content']}")
+                            continue
+
+                        elif step == "action":
+                            tool_name = res_json["function"]
+                            tool_input = res_json["input"]
+
+                            if tool_name in available_tools:
+                                print(f"\n⚙️ ACTION: Calling {tool_name}...")
+                                with tracer.span("tool.call", tool=tool_name, input_bytes=len(str(tool_input))) as tool_span:
+                                    result = dispatch_tool(tool_name, tool_input)
+                                    tool_span.set(output_bytes=len(str(result)), error=str(result).startswith("[ERROR]"))
+
+                                obs = {"step": "observe", "output": result}
+                                messages.append(
+                                    types.Content(role="user", parts=[{"text": json.dumps(obs)}])
+                                )
                             
-                            # Format the observation output for better readability
-                            if isinstance(result, dict):
-                                formatted_result = json.dumps(result, indent=2)
-                                preview = formatted_result[:500] + ('...' if len(formatted_result) > 500 else '')
-                            else:
-                                result_str = str(result)
-                                preview = result_str[:500] + ('...' if len(result_str) > 500 else '')
+                                # Format the observation output for better readability
+                                if isinstance(result, dict):
+                                    formatted_result = json.dumps(result, indent=2)
+                                    preview = formatted_result[:500] + ('...' if len(formatted_result) > 500 else '')
+                                else:
+                                    result_str = str(result)
+                                    preview = result_str[:500] + ('...' if len(result_str) > 500 else '')
                                 
-                            print(f"\n🔍 OBSERVATION: {preview}")
-                            continue
-                        else:
-                            print(f"\n[ERROR] Unknown tool: {tool_name}")
-                            break
+                                print(f"\n🔍 OBSERVATION: {preview}")
+                                continue
+                            else:
+                                print(f"\n[ERROR] Unknown tool: {tool_name}")
+                                break
 
-                    elif step == "output":
-                        print(f"\n🤖 OUTPUT: {res_json['content']}")
-                        break
+                        elif step == "output":
+                            if not printed:
+                                print(f"\n🤖 OUTPUT: {res_json['content']}")
+                            break
 
-                    else:
-                        print(f"\n[WARNING] Unknown step: {step}")
-                        break
+                        else:
+                            print(f"\n[WARNING] Unknown step: {step}")
+                            break
                         
-                except json.JSONDecodeError:
-                    print("\n[ERROR] Received invalid JSON response from the model. Retrying...")
-                    continue
-                except Exception as e:
-                    print(f"\n[ERROR] Error during API call: {str(e)}")
-                    break
+                    except json.JSONDecodeError as e:
+                        turn.event("retry", reason=f"invalid JSON: {e.msg}")
+                        retries += 1
+                        if retries >= MAX_RETRIES:
+                            print(f"\n[ERROR] No valid JSON from the model after {MAX_RETRIES} attempts. Please try again.")
+                            break
+                        print("\n[ERROR] Received invalid JSON response from the model. Retrying...")
+                        continue
+                    except Exception as e:
+                        print(f"\n[ERROR] Error during API call: {str(e)}")
+                        break
                     
         except KeyboardInterrupt:
             print("\n\n👋 Agent execution interrupted. Goodbye!")
@@ -0,0 +1,259 @@
+"""Structure-aware chunking for documentation pages.
+
+Pages are parsed into sections (heading path plus paragraphs, list items, tables and
+code blocks). Blocks repeated across many pages of the site (menus, footers, "edit this
+page" bars...) are dropped by shingle hashing. Sections are packed into chunks on block
+boundaries, each chunk starting with its heading breadcrumb; only a block too big for
+one chunk is split, with a sentence (or a table header) of overlap.
+"""
+import hashlib
+import math
+import os
+import re
+from collections import Counter, namedtuple
+
+from bs4 import BeautifulSoup, Comment, NavigableString, Tag
+from langchain_core.documents import Document
+
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1000"))
+SHINGLE_WORDS = 5
+# A shingle on at least this share of the pages (and at least BOILERPLATE_MIN_PAGES) is boilerplate
+BOILERPLATE_SHARE = 0.5
+BOILERPLATE_MIN_PAGES = 3
+# Blocks made mostly of boilerplate shingles are dropped
+BOILERPLATE_BLOCK = 0.8
+
+DROP_TAGS = ["script", "style", "noscript", "svg", "nav", "header", "footer", "aside", "form", "button",
+             "iframe", "template", "dialog"]
+HEADINGS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+BLOCK_TAGS = list(HEADINGS) + ["pre", "table", "p", "ul", "ol", "li", "blockquote", "div", "section",
+                               "article", "dl", "dt", "dd", "figure", "details", "hr"]
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+# kind is one of "heading", "text", "code" or "table"
+Block = namedtuple("Block", ["kind", "text", "level"])
+Page = namedtuple("Page", ["title", "language", "blocks"])
+
+
+# === Parsing ===
+def parse_page(page):
+    """Title, language and content blocks of a page (HTML text or a BeautifulSoup)."""
+    soup = page if isinstance(page, BeautifulSoup) else BeautifulSoup(page, "html.parser")
+    title = soup.title.get_text(strip=True) if soup.title else ""
+    language = soup.html.get("lang", "") if soup.html else ""
+
+    root = soup.find("main") or soup.find("article") or soup.body or soup
+    for tag in root.find_all(DROP_TAGS):
+        tag.decompose()
+    for tag in root.find_all(attrs={"role": "navigation"}) + root.find_all(attrs={"aria-hidden": "true"}):
+        tag.decompose()
+
+    blocks = []
+    _walk(root, blocks)
+    return Page(title, language, blocks)
+
+
+def _walk(node, blocks):
+    inline = []
+
+    def flush():
+        text = " ".join(" ".join(inline).split())
+        if text:
+            blocks.append(Block("text", text, 0))
+        inline.clear()
+
+    for child in node.children:
+        if isinstance(child, Comment):
+            continue
+        if isinstance(child, NavigableString):
+            inline.append(str(child))
+            continue
+        if not isinstance(child, Tag):
+            continue
+        if child.name in HEADINGS:
+            flush()
+            text = child.get_text(" ", strip=True)
+            if text:
+                blocks.append(Block("heading", text, HEADINGS[child.name]))
+        elif child.name == "pre":
+            flush()
+            code = child.get_text().strip("\n")
+            if code.strip():
+                blocks.append(Block("code", code, 0))
+        elif child.name == "table":
+            flush()
+            rows = [" | ".join(cell.get_text(" ", strip=True) for cell in row.find_all(["th", "td"]))
+                    for row in child.find_all("tr")]
+            rows = [row for row in rows if row.strip(" |")]
+            if rows:
+                blocks.append(Block("table", "\n".join(rows), 0))
+        elif child.find(BLOCK_TAGS) is None and child.name not in BLOCK_TAGS:
+            inline.append(child.get_text(" "))  # <a>, <code>, <strong>... inside running text
+        elif child.find(BLOCK_TAGS) is None:
+            flush()
+            text = child.get_text(" ", strip=True)
+            if text:
+                blocks.append(Block("text", " ".join(text.split()), 0))
+        else:
+            flush()
+            _walk(child, blocks)
+    flush()
+
+
+# === Boilerplate ===
+def shingles(text):
+    words = text.lower().split()
+    if len(words) <= SHINGLE_WORDS:
+        grams = [" ".join(words)]
+    else:
+        grams = (" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1))
+    return {hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest() for gram in grams}
+
+
+class BoilerplateFilter:
+    """Learns which shingles repeat across the pages of a site and drops text blocks made of them.
+
+    Headings, code and tables are always kept: a repeated heading or snippet is structure, not chrome.
+    """
+
+    def __init__(self, pages):
+        pages = list(pages)
+        seen = Counter()
+        for blocks in pages:
+            page_shingles = set()
+            for block in blocks:
+                if block.kind == "text":
+                    page_shingles |= shingles(block.text)
+            seen.update(page_shingles)
+        if len(pages) < BOILERPLATE_MIN_PAGES:
+            self.common = set()
+        else:
+            threshold = max(BOILERPLATE_MIN_PAGES, math.ceil(BOILERPLATE_SHARE * len(pages)))
+            self.common = {h for h, pages_with in seen.items() if pages_with >= threshold}
+
+    def is_boilerplate(self, block):
+        if block.kind != "text":
+            return False
+        block_shingles = shingles(block.text)
+        return bool(block_shingles) and len(block_shingles & self.common) / len(block_shingles) >= BOILERPLATE_BLOCK
+
+    def clean(self, blocks):
+        return [block for block in blocks if not self.is_boilerplate(block)]
+
+
+# === Chunking ===
+def sections(blocks):
+    """[(heading path, content blocks)] in page order."""
+    result = [((), [])]
+    stack = []
+    for block in blocks:
+        if block.kind == "heading":
+            while stack and stack[-1].level >= block.level:
+                stack.pop()
+            stack.append(block)
+            result.append((tuple(h.text for h in stack), []))
+        else:
+            result[-1][1].append(block)
+    return [(path, content) for path, content in result if content]
+
+
+def _pack(units, size, repeat=None, overlap_last=False):
+    """Group units into pieces of about `size` chars.
+
+    Each new piece starts with `repeat` (a table header) or, with `overlap_last`, the
+    previous piece's last unit when it is short.
+    """
+    start = [repeat] if repeat else []
+    pieces, current = [], list(start)
+    length = sum(len(u) + 1 for u in current)
+    for unit in units:
+        # A piece holding only the repeated header is not flushed; the unit joins it
+        if len(current) > len(start) and length + len(unit) + 1 > size:
+            pieces.append(current)
+            if repeat:
+                current = list(start)
+            elif overlap_last and len(current[-1]) < size // 4:
+                current = [current[-1]]
+            else:
+                current = []
+            length = sum(len(u) + 1 for u in current)
+        current.append(unit)
+        length += len(unit) + 1
+    if len(current) > len(start):
+        pieces.append(current)
+    return pieces
+
+
+def render(block, size):
+    """Text pieces for one block; only blocks bigger than `size` become more than one."""
+    if block.kind == "code":
+        lines = block.text.split("\n")
+        # Code is split on lines without overlap, and every piece stays fenced
+        return ["```\n" + "\n".join(piece) + "\n```" for piece in _pack(lines, size - 8)]
+    if block.kind == "table":
+        header, *rows = block.text.split("\n")
+        if not rows or len(block.text) <= size:
+            return [block.text]
+        return ["\n".join(piece) for piece in _pack(rows, size, repeat=header)]
+    if len(block.text) <= size:
+        return [block.text]
+    # A sentence of overlap keeps a split paragraph readable on both sides
+    return [" ".join(piece) for piece in _pack(SENTENCE_END.split(block.text), size, overlap_last=True)]
+
+
+def chunk_page(url, page, size=CHUNK_SIZE):
+    """Documents for one parsed page; whole sections share a chunk when they fit."""
+    chunks = []
+
+    def breadcrumb(path):
+        return " > ".join(filter(None, (page.title,) + path))
+
+    def start(path):
+        return {"path": path, "parts": [], "length": len(breadcrumb(path)) + 2}
+
+    current = None
+    for path, content in sections(page.blocks):
+        pieces = [piece for block in content for piece in render(block, int(size * 0.9))]
+        heading = f"{'#' * len(path)} {path[-1]}" if path else ""
+        section_length = sum(len(piece) + 2 for piece in pieces) + len(heading) + 2
+        if current and current["parts"] and current["length"] + section_length <= size:
+            if heading:
+                current["parts"].append(heading)
+                current["length"] += len(heading) + 2
+        else:
+            if current and current["parts"]:
+                chunks.append(current)
+            current = start(path)
+        for piece in pieces:
+            if current["parts"] and current["length"] + len(piece) + 2 > size:
+                chunks.append(current)
+                current = start(path)
+            current["parts"].append(piece)
+            current["length"] += len(piece) + 2
+    if current and current["parts"]:
+        chunks.append(current)
+
+    return [
+        Document(
+            page_content="\n\n".join([breadcrumb(chunk["path"])] + chunk["parts"]).strip(),
+            metadata={"source": url, "title": page.title, "language": page.language,
+                      "section": " > ".join(chunk["path"])},
+        )
+        for chunk in chunks
+    ]
+
+
+def chunk_pages(pages, boilerplate=None, size=CHUNK_SIZE):
+    """Documents for {url: Page}, with boilerplate dropped; returns (documents, stats)."""
+    boilerplate = boilerplate or BoilerplateFilter(page.blocks for page in pages.values())
+    documents = []
+    stats = {"pages": len(pages), "blocks": 0, "dropped_blocks": 0, "dropped_chars": 0, "chunks": 0, "chars": 0}
+    for url, page in pages.items():
+        kept = boilerplate.clean(page.blocks)
+        stats["blocks"] += len(page.blocks)
+        stats["dropped_blocks"] += len(page.blocks) - len(kept)
+        stats["dropped_chars"] += sum(len(b.text) for b in page.blocks) - sum(len(b.text) for b in kept)
+        documents.extend(chunk_page(url, page._replace(blocks=kept), size))
+    stats["chunks"] = len(documents)
+    stats["chars"] = sum(len(d.page_content) for d in documents)
+    return documents, stats
@@ -0,0 +1,254 @@
+import difflib
+import os
+import re
+import shutil
+import tempfile
+from collections import namedtuple
+
+# old/new are lists of lines without line endings; hint is the 0-based line the diff claims
+Hunk = namedtuple("Hunk", ["old", "new", "hint"])
+
+SEARCH_REPLACE = re.compile(
+    r"^<{5,9} SEARCH[^\n]*\n(.*?)^={5,9}[^\n]*\n(.*?)^>{5,9} REPLACE[^\n]*$",
+    re.MULTILINE | re.DOTALL,
+)
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+# Lowest similarity accepted for a fuzzy match of a whole block
+FUZZY_THRESHOLD = 0.85
+
+
+# === Parsing ===
+def parse_search_replace(patch):
+    hunks = []
+    for search, replace in SEARCH_REPLACE.findall(patch):
+        hunks.append(Hunk(search.splitlines(), replace.splitlines(), None))
+    return hunks
+
+
+def _diff_path(line):
+    path = line[4:].split("\t")[0].strip()
+    if path == "/dev/null":
+        return None
+    return path[2:] if path.startswith(("a/", "b/")) else path
+
+
+def parse_unified_diff(patch):
+    """Return [(target path or None, hunks)], one entry per file in the diff.
+
+    File headers (--- / +++ pairs) are only recognised between hunks, using the line
+    counts from each @@ header, so an added "++ x" or removed "-- x" line inside a hunk
+    is never mistaken for one.
+    """
+    files = []
+    hunks, target = [], None
+    old, new, hint = None, None, None
+    old_left = new_left = 0
+    lines = patch.splitlines()
+
+    def close_hunk():
+        if old is not None:
+            hunks.append(Hunk(old, new, hint))
+
+    for i, line in enumerate(lines):
+        between = old_left <= 0 and new_left <= 0
+        if between and line.startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ "):
+            close_hunk()
+            if hunks:
+                files.append((target, hunks))
+            hunks, old = [], None
+            target = _diff_path(lines[i + 1]) or _diff_path(line)
+            continue
+        if between and line.startswith("+++ ") and i and lines[i - 1].startswith("--- "):
+            continue
+        header = HUNK_HEADER.match(line) if between else None
+        if header:
+            close_hunk()
+            start = int(header.group(1))
+            # An empty old side (-U0 insertion) names the line the new lines go after
+            hint = start if header.group(2) == "0" else max(start - 1, 0)
+            old, new = [], []
+            old_left = int(header.group(2)) if header.group(2) is not None else 1
+            new_left = int(header.group(4)) if header.group(4) is not None else 1
+            continue
+        if old is None or line.startswith("\\"):
+            # Text before the first hunk, or "\ No newline at end of file"
+            continue
+        if between and not line.startswith(("+", "-", " ")) and line.strip():
+            # git metadata between files (diff --git, index ...)
+            continue
+        if line.startswith("-"):
+            old.append(line[1:])
+            old_left -= 1
+        elif line.startswith("+"):
+            new.append(line[1:])
+            new_left -= 1
+        else:
+            # Context; models often drop the leading space on blank lines
+            text = line[1:] if line.startswith(" ") else line
+            old.append(text)
+            new.append(text)
+            old_left -= 1
+            new_left -= 1
+    close_hunk()
+    if hunks:
+        files.append((target, hunks))
+    return files
+
+
+# === Anchoring ===
+def _matches(lines, block, normalize):
+    size = len(block)
+    wanted = [normalize(line) for line in block]
+    return [i for i in range(len(lines) - size + 1)
+            if all(normalize(lines[i + j]) == wanted[j] for j in range(size))]
+
+
+def locate(lines, block, hint=None):
+    """Find where `block` starts in `lines`; returns (index, how) or (None, reason).
+
+    Tries an exact match, then ignoring trailing whitespace, then ignoring all
+    surrounding whitespace, then the most similar window. Several candidates are
+    resolved by the hunk's line hint; without one that's an error.
+    """
+    if not block:
+        return (hint if hint is not None else len(lines)), "insert"
+
+    for how, normalize in (("exact", lambda s: s), ("rstrip", str.rstrip), ("strip", str.strip)):
+        found = _matches(lines, block, normalize)
+        if len(found) == 1:
+            return found[0], how
+        if found:
+            if hint is None:
+                return None, f"search text matches {len(found)} places, add more context"
+            return min(found, key=lambda i: abs(i - hint)), how
+
+    # Fuzzy: compare whole windows, preferring ones near the hint
+    target = "\n".join(line.strip() for line in block)
+    best, best_score = None, 0.0
+    size = len(block)
+    for i in range(len(lines) - size + 1):
+        window = "\n".join(line.strip() for line in lines[i:i + size])
+        matcher = difflib.SequenceMatcher(None, window, target, autojunk=False)
+        if matcher.real_quick_ratio() < FUZZY_THRESHOLD or matcher.quick_ratio() < FUZZY_THRESHOLD:
+            continue
+        score = matcher.ratio()
+        if hint is not None:
+            score -= abs(i - hint) * 1e-6
+        if score > best_score:
+            best, best_score = i, score
+    if best is not None and best_score >= FUZZY_THRESHOLD:
+        return best, f"fuzzy {best_score:.2f}"
+    return None, "search text not found"
+
+
+def _reindent(old_block, found_block, new_block):
+    """When anchoring ignored indentation, shift the replacement by the same amount."""
+    def indent(line):
+        return line[: len(line) - len(line.lstrip())]
+
+    first_old = next((line for line in old_block if line.strip()), None)
+    first_found = next((line for line in found_block if line.strip()), None)
+    if first_old is None or first_found is None:
+        return new_block
+    old_indent, found_indent = indent(first_old), indent(first_found)
+    if old_indent == found_indent:
+        return new_block
+    result = []
+    for line in new_block:
+        if line.startswith(old_indent):
+            line = found_indent + line[len(old_indent):]
+        result.append(line)
+    return result
+
+
+def apply_hunks(lines, hunks):
+    """Apply hunks to a list of lines; returns (new lines, notes) or raises ValueError."""
+    lines = list(lines)
+    notes = []
+    offset = 0
+    for number, hunk in enumerate(hunks, 1):
+        hint = hunk.hint + offset if hunk.hint is not None else None
+        index, how = locate(lines, hunk.old, hint)
+        if index is None:
+            preview = hunk.old[0].strip()[:60] if hunk.old else ""
+            raise ValueError(f"hunk {number}: {how} ({preview!r})")
+        found = lines[index:index + len(hunk.old)]
+        new = hunk.new if how == "exact" else _reindent(hunk.old, found, hunk.new)
+        lines[index:index + len(hunk.old)] = new
+        offset += len(new) - len(hunk.old)
+        notes.append(f"hunk {number} @ line {index + 1} ({how}) +{len(hunk.new)} -{len(hunk.old)}")
+    return lines, notes
+
+
+# === Writing ===
+def atomic_write(path, text, newline="\n"):
+    """Write via a temp file in the same directory and rename it over the target."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline=newline) as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(path):
+            shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _patched_text(file_path, hunks):
+    """New text and newline style for one file, or raises ValueError."""
+    if os.path.exists(file_path):
+        with open(file_path, "r", encoding="utf-8", newline="") as f:
+            text = f.read()
+    elif all(not hunk.old for hunk in hunks):
+        text = ""  # new file made only of additions
+    else:
+        raise ValueError(f"File not found: {file_path}")
+
+    newline = "\r\n" if "\r\n" in text else "\n"
+    trailing_newline = text.endswith(("\n", "\r")) or not text
+    try:
+        lines, notes = apply_hunks(text.splitlines(), hunks)
+    except ValueError as e:
+        raise ValueError(f"Patch not applied to {file_path}: {e}")
+
+    added = sum(len(h.new) for h in hunks)
+    removed = sum(len(h.old) for h in hunks)
+    summary = f"Patched {file_path}: {len(hunks)} hunk(s), +{added} -{removed} lines; " + "; ".join(notes)
+    return "\n".join(lines) + ("\n" if trailing_newline and lines else ""), newline, summary
+
+
+def apply_patch(file_path, patch):
+    """Apply search/replace blocks or a unified diff to one or more files; returns a compact summary.
+
+    Every file is patched in memory first, so a hunk that fails leaves all files untouched.
+    """
+    hunks = parse_search_replace(patch)
+    if hunks:
+        files = [(file_path, hunks)]
+    else:
+        files = parse_unified_diff(patch)
+        if len(files) == 1 and file_path:
+            files = [(file_path, files[0][1])]
+        else:
+            files = [(target or file_path, file_hunks) for target, file_hunks in files]
+    if not files:
+        return "[ERROR] No hunks found. Use SEARCH/REPLACE blocks or a unified diff with @@ headers"
+    if not all(path for path, _ in files):
+        return "[ERROR] No file path provided"
+
+    results = []
+    for path, file_hunks in files:
+        try:
+            results.append((path, *_patched_text(path, file_hunks)))
+        except ValueError as e:
+            return f"[ERROR] {e}"
+    for path, text, newline, _ in results:
+        atomic_write(path, text, newline=newline)
+    return "\n".join(summary for *_, summary in results)
@@ -0,0 +1,202 @@
+import hashlib
+import mmap
+import os
+from array import array
+from collections import OrderedDict
+
+SNIFF_BYTES = 8192
+# Files up to this size are returned whole when no range is asked for
+MAX_READ_BYTES = 64 * 1024
+DEFAULT_LINES = 200
+# Indexes of files at least this big are also saved to disk, so a restart doesn't rescan them
+PERSIST_MIN_BYTES = 4 * 1024 * 1024
+INDEX_DIR = os.getenv("READ_INDEX_DIR", os.path.join(os.path.expanduser("~"), ".cache", "genai", "line-index"))
+MAX_INDEXES = 64
+
+# Control bytes that never show up in text files (tab, newlines, form feed and ESC are allowed)
+_CONTROL = bytes(set(range(32)) - {8, 9, 10, 12, 13, 27})
+
+
+def is_binary(sample):
+    """NUL bytes or lots of control characters in the first few KB mean binary."""
+    if not sample:
+        return False
+    if b"\0" in sample:
+        return True
+    try:
+        sample.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off at the end of the sample is fine
+        if e.start < len(sample) - 3:
+            return True
+    return len(sample.translate(None, _CONTROL)) < len(sample) * 0.9
+
+
+class LineIndex:
+    """Byte offset of the start of every line, valid for one (size, mtime) of a file."""
+
+    def __init__(self, path, size, mtime_ns, offsets):
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.offsets = offsets
+
+    @property
+    def line_count(self):
+        return len(self.offsets)
+
+    def matches(self, stat):
+        return self.size == stat.st_size and self.mtime_ns == stat.st_mtime_ns
+
+    def span(self, start, end):
+        """Byte range covering lines start..end (1-based, inclusive)."""
+        end_offset = self.offsets[end] if end < self.line_count else self.size
+        return self.offsets[start - 1], end_offset
+
+    def line_at(self, offset):
+        """1-based line containing a byte offset."""
+        low, high = 0, self.line_count
+        while low < high:
+            mid = (low + high) // 2
+            if self.offsets[mid] <= offset:
+                low = mid + 1
+            else:
+                high = mid
+        return max(low, 1)
+
+
+def _scan(mm, size):
+    offsets = array("q", [0] if size else [])
+    pos = mm.find(b"\n")
+    while pos != -1 and pos + 1 < size:
+        offsets.append(pos + 1)
+        pos = mm.find(b"\n", pos + 1)
+    return offsets
+
+
+def _index_file(path):
+    key = hashlib.blake2b(path.encode("utf-8"), digest_size=16).hexdigest()
+    return os.path.join(INDEX_DIR, f"{key}.idx")
+
+
+def _load_persisted(path, stat):
+    try:
+        with open(_index_file(path), "rb") as f:
+            header = array("q")
+            header.fromfile(f, 3)
+            size, mtime_ns, count = header
+            if size != stat.st_size or mtime_ns != stat.st_mtime_ns:
+                return None
+            offsets = array("q")
+            offsets.fromfile(f, count)
+        return LineIndex(path, size, mtime_ns, offsets)
+    except (OSError, EOFError, ValueError):
+        return None
+
+
+def _persist(index):
+    try:
+        os.makedirs(INDEX_DIR, exist_ok=True)
+        target = _index_file(index.path)
+        tmp_path = f"{target}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            array("q", [index.size, index.mtime_ns, index.line_count]).tofile(f)
+            index.offsets.tofile(f)
+        os.replace(tmp_path, target)
+    except OSError:
+        pass  # the in-memory index still works
+
+
+_indexes = OrderedDict()
+
+
+def get_index(path, mm=None):
+    """Line index for `path`, rebuilt only when its size or mtime changes."""
+    path = os.path.realpath(path)
+    stat = os.stat(path)
+    index = _indexes.get(path)
+    if index is None or not index.matches(stat):
+        index = _load_persisted(path, stat) if stat.st_size >= PERSIST_MIN_BYTES else None
+        if index is None:
+            if mm is None:
+                with open(path, "rb") as f, _map(f, stat.st_size) as mapped:
+                    offsets = _scan(mapped, stat.st_size)
+            else:
+                offsets = _scan(mm, stat.st_size)
+            index = LineIndex(path, stat.st_size, stat.st_mtime_ns, offsets)
+            if stat.st_size >= PERSIST_MIN_BYTES:
+                _persist(index)
+        _indexes[path] = index
+        if len(_indexes) > MAX_INDEXES:
+            _indexes.popitem(last=False)
+    _indexes.move_to_end(path)
+    return index
+
+
+class _EmptyMap(bytes):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def _map(f, size):
+    # mmap can't map empty files
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else _EmptyMap()
+
+
+def _decode(data, start_trim=True):
+    """Decode a byte window without garbling characters cut at either edge."""
+    if start_trim:
+        skip = 0
+        while skip < min(3, len(data)) and 0x80 <= data[skip] < 0xC0:
+            skip += 1
+        data = data[skip:]
+    return data.decode("utf-8", errors="replace")
+
+
+def read_range(path, start_line=None, end_line=None, offset=None, length=None, max_bytes=MAX_READ_BYTES):
+    """Read a window of a file by lines (1-based, inclusive) or bytes, with a short header.
+
+    Without a range, small files come back whole and big ones as their first
+    DEFAULT_LINES lines, so the model never receives megabytes by accident.
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if is_binary(f.read(SNIFF_BYTES)):
+            return f"[ERROR] {path} looks like a binary file ({size:,} bytes), not shown"
+        with _map(f, size) as mm:
+            if offset is not None or length is not None:
+                start = min(max(int(offset or 0), 0), size)
+                stop = min(start + min(int(length or max_bytes), max_bytes), size)
+                index = get_index(path, mm)
+                text = _decode(mm[start:stop], start_trim=start > 0)
+                header = (f"[bytes {start:,}-{stop:,} of {size:,}, "
+                          f"lines {index.line_at(start)}-{index.line_at(max(stop - 1, 0))} of {index.line_count:,}]")
+                return f"{header}\n{text}"
+
+            if start_line is None and end_line is None and size <= max_bytes:
+                return _decode(mm[:], start_trim=False)
+
+            index = get_index(path, mm)
+            if not index.line_count:
+                return f"[empty file: {path}]"
+            start = min(max(int(start_line or 1), 1), index.line_count)
+            end = int(end_line) if end_line else start + DEFAULT_LINES - 1
+            end = min(max(end, start), index.line_count)
+            begin, stop = index.span(start, end)
+            truncated = stop - begin > max_bytes
+            if truncated:
+                # Keep whole lines that fit, or cut the first one if it alone is too long
+                end = max(index.line_at(begin + max_bytes) - 1, start)
+                begin, stop = index.span(start, end)
+                stop = min(stop, begin + max_bytes)
+            text = _decode(mm[begin:stop], start_trim=False)
+
+    header = f"[lines {start}-{end} of {index.line_count:,}, {size:,} bytes"
+    if truncated:
+        header += f", truncated to {max_bytes:,} bytes"
+    if end < index.line_count:
+        header += f"; read more with start_line={end + 1}"
+    return f"{header}]\n{text}"
@@ -1,18 +1,37 @@
 import json
 import streamlit as st
-from openai import OpenAI
 from dotenv import load_dotenv
 import os
+import time
+from streamParser import iter_step_events
+from llmTransport import openai_client
+from promptCache import PromptCache
+from sessionStore import SessionStore
+from tokenBudget import get_counter
 
 load_dotenv()
 
+# Stream each step as it is generated (set STREAM=0 to wait for the whole JSON object)
+STREAM = os.getenv("STREAM", "1") != "0"
+
+# Fast answers skip the hidden analyse/think round-trips (FAST_MODE=0 starts with them on)
+FAST_MODE = os.getenv("FAST_MODE", "1") != "0"
+
 api_key = os.getenv("GEMINI_API_KEY")
 url = os.getenv("base_url")
 
-client = OpenAI(
-    api_key=api_key,
-    base_url=url
-)
+
+
+@st.cache_resource
+def get_client():
+    # One client and connection pool per process; the SDK is imported on the first request
+    return openai_client(
+        api_key=api_key,
+        base_url=url
+    )
+
+
+client = get_client()
 
 st.title("Hitesh Chaudhary AI 🤖")
 
@@ -107,32 +126,166 @@ Kuch nahi rakha usmein. Aao yaar, thoda code likho. Baith ke kuch solid kaam kar
 """
 
 
-if "messages" not in st.session_state:
-    st.session_state.messages = [
-        {"role": "system", "content": system_prompt}
-    ]
+@st.cache_resource
+def get_prompt_cache():
+    # Shared by every session and rerun so the persona prompt is cached once per process
+    return PromptCache(system_prompt, model="gemini-2.0-flash-001", display_name="hitesh-persona")
+
+
+prompt_cache = get_prompt_cache()
+
+
+@st.cache_resource
+def get_session_store():
+    return SessionStore(os.getenv("SESSION_DB", "sessions.db"))
+
+
+def summarize_turns(summary, turns):
+    """Fold turns that left the window into the running summary with a small, uncached request."""
+    transcript = "\n".join(f"{turn['role']}: {turn['content']}" for turn in turns)
+    response = client.chat.completions.create(
+        model="gemini-2.0-flash-001",
+        max_tokens=300,
+        messages=[{
+            "role": "user",
+            "content": "Update the running summary of this chat with the new turns. "
+                       "Keep names, goals and advice already given. Under 150 words.\n\n"
+                       f"Summary so far:\n{summary or '(empty)'}\n\nNew turns:\n{transcript}",
+        }],
+    )
+    return response.choices[0].message.content
+
+
+# Sessions are keyed by the ?session= query param so a reload (or restart) picks them back up
+session_id = st.query_params.get("session")
+if not session_id:
+    session_id = get_session_store().new_session_id()
+    st.query_params["session"] = session_id
 
+if "chat_session" not in st.session_state or st.session_state.chat_session.session_id != session_id:
+    st.session_state.chat_session = get_session_store().load(
+        session_id, summarize=summarize_turns, count_tokens=get_counter("gemini").count_text
+    )
+session = st.session_state.chat_session
 
-query = st.text_input("Ask Hitesh sir something 👇", key="user_input")
-submit = st.button("Send")
 
+def stream_step(messages):
+    """Stream one step, showing the answer token by token once the output step starts."""
+    start = time.perf_counter()
+    stream = prompt_cache.openai_create(
+        client, messages,
+        response_format={"type": "json_object"},
+        stream=True,
+        stream_options={"include_usage": True},
+    )
+    ttft = None
+    usage = None
 
-if submit or query:
-    st.session_state.messages.append({"role": "user", "content": query})
+    def texts():
+        nonlocal ttft, usage
+        for chunk in stream:
+            if ttft is None:
+                ttft = time.perf_counter() - start
+            # With include_usage the last chunk has no choices, only the token counts
+            usage = chunk.usage or usage
+            if chunk.choices:
+                yield chunk.choices[0].delta.content
 
-    while True:
-        response = client.chat.completions.create(
-            model="gemini-2.0-flash",
-            response_format={"type": "json_object"},
-            messages=st.session_state.messages
-        )
+    placeholder = None
+    answer = ""
+    parsed_response = None
+    for event in iter_step_events(texts()):
+        if event.kind == "field" and event.key == "step":
+            if event.value == "output":
+                placeholder = st.empty()
+            else:
+                st.write(f"🧠: thinking....")
+        elif event.kind == "delta" and placeholder is not None:
+            answer += event.value
+            placeholder.write(f"🤖: {answer}")
+        elif event.kind == "object" and parsed_response is None:
+            parsed_response = event.value
+        elif event.kind == "error":
+            raise json.JSONDecodeError("Invalid step object", event.value, 0)
 
-        parsed_response = json.loads(response.choices[0].message.content)
-        st.session_state.messages.append({"role": "assistant", "content": json.dumps(parsed_response)})
+    prompt_cache.record_openai(usage, ttft or 0.0, time.perf_counter() - start)
+    if parsed_response is None:
+        raise json.JSONDecodeError("Stream ended before a complete step", "", 0)
+    return parsed_response
 
-        if parsed_response.get("step") != "output":
-            st.write(f"🧠: thinking....")
-            continue
+
+# Sent as a user turn, not a system message: Gemini rejects system instructions next to cached content
+fast_instruction = """
+Fast mode: skip the analyse and think steps and ignore the JSON response schema.
+Reply with only the final "output" answer, in character, as plain text.
+"""
+
+
+def stream_answer(messages):
+    """Ask for just the final in-persona answer in one request and stream it token by token."""
+    start = time.perf_counter()
+    messages = [{"role": "user", "content": fast_instruction}] + messages
+    stream = prompt_cache.openai_create(
+        client, messages,
+        stream=True,
+        stream_options={"include_usage": True},
+    )
+    ttft = None
+    usage = None
+    placeholder = st.empty()
+    answer = ""
+    for chunk in stream:
+        if ttft is None:
+            ttft = time.perf_counter() - start
+        usage = chunk.usage or usage
+        if chunk.choices and chunk.choices[0].delta.content:
+            answer += chunk.choices[0].delta.content
+            placeholder.write(f"🤖: {answer}")
+
+    prompt_cache.record_openai(usage, ttft or 0.0, time.perf_counter() - start)
+    return answer
+
+
+fast_mode = st.sidebar.toggle("⚡ Fast answers", value=FAST_MODE)
+
+# A form submits once, so reruns (e.g. flipping the toggle) don't resend the last query
+with st.form("ask", clear_on_submit=True):
+    query = st.text_input("Ask Hitesh sir something 👇")
+    submit = st.form_submit_button("Send")
+
+
+if submit and query:
+    session.add_turn("user", query)
+
+    # Only the final answer goes into the history, intermediate steps live for this turn only
+    if fast_mode:
+        answer = stream_answer(session.messages())
+    else:
+        steps = []
+        while True:
+            messages = session.messages() + steps
+            if STREAM:
+                parsed_response = stream_step(messages)
+            else:
+                start = time.perf_counter()
+                response = prompt_cache.openai_create(
+                    client, messages,
+                    response_format={"type": "json_object"},
+                )
+                seconds = time.perf_counter() - start
+                prompt_cache.record_openai(response.usage, seconds, seconds)
+                parsed_response = json.loads(response.choices[0].message.content)
+            steps.append({"role": "assistant", "content": json.dumps(parsed_response)})
+
+            if parsed_response.get("step") != "output":
+                if not STREAM:
+                    st.write(f"🧠: thinking....")
+                continue
         
-        st.write(f"🤖: {parsed_response.get('content')}")
-        break
+            if not STREAM:
+                st.write(f"🤖: {parsed_response.get('content')}")
+            answer = parsed_response.get("content", "")
+            break
+
+    session.add_turn("assistant", answer)
+    st.sidebar.caption(f"📊 {prompt_cache.summary()}")
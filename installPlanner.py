@@ -0,0 +1,301 @@
+import json
+import os
+import re
+import shlex
+import subprocess
+import time
+from collections import OrderedDict, namedtuple
+
+CACHE_DIR = os.getenv("PACKAGE_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "genai", "packages"))
+INSTALL_TIMEOUT = int(os.getenv("INSTALL_TIMEOUT", "600"))
+
+# flags are the manager flags given with the package (-D, --save-dev, --pre...), as a tuple
+Requirement = namedtuple("Requirement", ["name", "spec", "raw", "flags"])
+
+MANAGERS = {
+    "npm": {"ecosystem": "node", "command": "npm install"},
+    "yarn": {"ecosystem": "node", "command": "yarn add"},
+    "pip": {"ecosystem": "python", "command": "pip install"},
+    "pipenv": {"ecosystem": "python", "command": "pipenv install"},
+    "composer": {"ecosystem": "php", "command": "composer require"},
+}
+
+PIP_REQUIREMENT = re.compile(r"^([A-Za-z0-9][A-Za-z0-9._-]*)(\[[^\]]*\])?\s*(.*)$")
+# Flags whose value is the next token ("--registry URL", "-r requirements.txt")
+VALUE_FLAGS = {"--registry", "--tag", "--prefix", "-i", "--index-url", "--extra-index-url", "--find-links",
+               "-c", "--constraint", "-r", "--requirement", "-e", "--editable", "-t", "--target"}
+# Flags asking for a (re)install even when the installed version already satisfies the spec
+REINSTALL_FLAGS = {"-U", "--upgrade", "--force-reinstall", "--force"}
+
+
+# === Parsing ===
+def normalize_name(name, ecosystem):
+    return re.sub(r"[-_.]+", "-", name).lower() if ecosystem == "python" else name
+
+
+def split_flags(packages):
+    """(package tokens, flags) from "-D typescript" / "--index-url URL flask"; flags keep their values."""
+    tokens = shlex.split(packages) if isinstance(packages, str) else list(packages)
+    names, flags = [], []
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token.startswith("-"):
+            flags.append(token)
+            if token in VALUE_FLAGS and i + 1 < len(tokens):
+                i += 1
+                flags.append(tokens[i])
+        else:
+            names.append(token)
+        i += 1
+    return names, tuple(flags)
+
+
+def parse_packages(packages, manager):
+    """Split "react@^18 lodash" / "-D flask>=3 requests" into requirements, last one per name wins.
+
+    Flags such as -D or --pre apply to every package of the request and are carried in
+    each requirement, so the install command keeps them.
+    """
+    ecosystem = MANAGERS[manager]["ecosystem"]
+    requirements = OrderedDict()
+    names, flags = split_flags(packages)
+    for raw in names:
+        if ecosystem == "node":
+            at = raw.find("@", 1)  # skip the @ of a scope
+            name, spec = (raw[:at], raw[at + 1:]) if at > 0 else (raw, "")
+        elif ecosystem == "python":
+            match = PIP_REQUIREMENT.match(raw)
+            if not match:
+                continue
+            name, spec = match.group(1), match.group(3)
+        else:
+            name, _, spec = raw.partition(":")
+        key = normalize_name(name, ecosystem)
+        requirements.pop(key, None)
+        requirements[key] = Requirement(key, spec.strip(), raw, flags)
+    return list(requirements.values())
+
+
+# === Version checks ===
+def _numbers(version):
+    return tuple(int(part) for part in re.findall(r"\d+", version.split("-")[0].split("+")[0])[:3])
+
+
+def satisfies(version, spec, ecosystem):
+    """Whether an installed version meets a spec; unknown spec syntax counts as not satisfied."""
+    if version is None:
+        return False
+    spec = spec.strip()
+    if ecosystem == "python":
+        if not spec:
+            return True
+        try:
+            from packaging.specifiers import InvalidSpecifier, SpecifierSet
+        except ImportError:
+            return spec.startswith("==") and _numbers(spec[2:]) == _numbers(version)
+        try:
+            return SpecifierSet(spec).contains(version, prereleases=True)
+        except InvalidSpecifier:
+            return False
+
+    if spec in ("", "*", "latest", "x"):
+        return True
+    have, want = _numbers(version), _numbers(spec)
+    if not want:
+        return False
+    if spec[0] == "^":
+        # Same left-most non-zero part, and not older
+        significant = next((i for i, n in enumerate(want) if n), len(want) - 1)
+        return have[: significant + 1] == want[: significant + 1] and have >= want
+    if spec[0] == "~":
+        return have[:2] == want[:2] and have >= want
+    if spec.startswith(">="):
+        return have >= want
+    if spec[0].isdigit() or spec[0] in "=v":
+        return have[: len(want)] == want
+    return False
+
+
+# === Installed state ===
+def _read_json(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class InstalledState:
+    """Versions from lockfiles and the installed environment, loaded lazily per directory."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._locks = {}
+        self._pip = None
+
+    def _lock(self, name):
+        if name not in self._locks:
+            self._locks[name] = _read_json(os.path.join(self.directory, name)) or {}
+        return self._locks[name]
+
+    def node_version(self, name):
+        package = _read_json(os.path.join(self.directory, "node_modules", name, "package.json"))
+        if package:
+            return package.get("version")
+        lock = self._lock("package-lock.json")
+        entry = lock.get("packages", {}).get(f"node_modules/{name}") or lock.get("dependencies", {}).get(name)
+        # Only trust the lockfile when node_modules exists at all
+        if entry and os.path.isdir(os.path.join(self.directory, "node_modules")):
+            return entry.get("version")
+        return None
+
+    def python_version(self, name, manager):
+        if manager == "pipenv":
+            lock = self._lock("Pipfile.lock")
+            for section in ("default", "develop"):
+                for locked, entry in lock.get(section, {}).items():
+                    if normalize_name(locked, "python") == name and isinstance(entry, dict):
+                        return entry.get("version", "").lstrip("=") or None
+            return None
+        if self._pip is None:
+            try:
+                output = subprocess.run(
+                    "pip list --format=json --disable-pip-version-check", shell=True,
+                    cwd=self.directory, capture_output=True, text=True, timeout=60,
+                ).stdout
+                self._pip = {normalize_name(p["name"], "python"): p["version"] for p in json.loads(output or "[]")}
+            except (subprocess.TimeoutExpired, ValueError):
+                self._pip = {}
+        return self._pip.get(name)
+
+    def php_version(self, name):
+        for package in self._lock("composer.lock").get("packages", []):
+            if package.get("name") == name:
+                return package.get("version", "").lstrip("v")
+        return None
+
+    def version(self, requirement, manager):
+        ecosystem = MANAGERS[manager]["ecosystem"]
+        if ecosystem == "node":
+            return self.node_version(requirement.name)
+        if ecosystem == "python":
+            return self.python_version(requirement.name, manager)
+        return self.php_version(requirement.name)
+
+
+# === Planner ===
+class InstallPlanner:
+    """Skips satisfied requirements and merges pending installs into one command per manager."""
+
+    def __init__(self, cache_dir=CACHE_DIR, timeout=INSTALL_TIMEOUT):
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+        # (manager, directory, flags) -> {name: Requirement}; a request made only of flags
+        # (e.g. "-r requirements.txt") is queued under the name "" with raw None
+        self.pending = OrderedDict()
+        self._states = {}
+        self.stats = {"requested": 0, "skipped": 0, "installed": 0, "commands": 0, "seconds": 0.0}
+
+    def _state(self, directory):
+        directory = os.path.abspath(directory)
+        if directory not in self._states:
+            self._states[directory] = InstalledState(directory)
+        return self._states[directory]
+
+    def command(self, manager, requirements):
+        """Install command using the shared cache; returns (command, extra env)."""
+        user_flags = requirements[0].flags if requirements else ()
+        names = " ".join(shlex.quote(part) for part in user_flags + tuple(r.raw for r in requirements if r.raw))
+        base = MANAGERS[manager]["command"]
+        if manager == "yarn" and not any(r.raw for r in requirements):
+            base = "yarn install"  # `yarn add` needs packages
+        env = {}
+        if manager == "npm":
+            flags = f"--cache {shlex.quote(os.path.join(self.cache_dir, 'npm'))} --prefer-offline --no-audit --no-fund"
+        elif manager == "yarn":
+            flags = f"--cache-folder {shlex.quote(os.path.join(self.cache_dir, 'yarn'))} --prefer-offline"
+        elif manager == "pip":
+            flags = f"--cache-dir {shlex.quote(os.path.join(self.cache_dir, 'pip'))} --disable-pip-version-check"
+            # Wheels dropped here act as a local mirror
+            wheels = os.path.join(self.cache_dir, "wheels")
+            if os.path.isdir(wheels):
+                flags += f" --find-links {shlex.quote(wheels)}"
+        elif manager == "pipenv":
+            flags = ""
+            env = {"PIP_CACHE_DIR": f"{self.cache_dir}/pip", "PIPENV_CACHE_DIR": f"{self.cache_dir}/pipenv"}
+        else:
+            flags = "--prefer-dist"
+            env = {"COMPOSER_CACHE_DIR": f"{self.cache_dir}/composer"}
+        return f"{base} {flags} {names}".replace("  ", " "), env
+
+    def add(self, packages, manager="npm", directory=".", defer=False):
+        """Plan an install; runs it (with anything already queued) unless `defer` is set."""
+        if manager not in MANAGERS:
+            return f"[ERROR] Unsupported package manager: {manager}"
+        requirements = parse_packages(packages, manager)
+        _, flags = split_flags(packages)
+        if not requirements and not flags:
+            return "[ERROR] No packages provided"
+
+        state = self._state(directory)
+        ecosystem = MANAGERS[manager]["ecosystem"]
+        key = (manager, os.path.abspath(directory), flags)
+        queue = self.pending.setdefault(key, OrderedDict())
+        if not requirements:
+            # Flags only: install from package.json / a requirements file as given
+            queue[""] = Requirement("", "", None, flags)
+        reinstall = bool(REINSTALL_FLAGS & set(flags))
+        skipped = []
+        for requirement in requirements:
+            self.stats["requested"] += 1
+            version = state.version(requirement, manager)
+            if not reinstall and satisfies(version, requirement.spec, ecosystem):
+                skipped.append(f"{requirement.name}@{version}")
+                self.stats["skipped"] += 1
+                queue.pop(requirement.name, None)
+            else:
+                queue[requirement.name] = requirement
+
+        message = f"Already installed: {', '.join(skipped)}" if skipped else ""
+        if not queue:
+            self.pending.pop(key, None)
+        if defer:
+            queued = sum(len(q) for q in self.pending.values())
+            return "\n".join(filter(None, [message, f"Queued; {queued} package(s) will be installed in one batch"]))
+        return "\n".join(filter(None, [message, self.flush()])) or "Nothing to install"
+
+    def flush(self):
+        """Run one install command per (manager, directory) for everything queued."""
+        results = []
+        while self.pending:
+            (manager, directory, _), queue = self.pending.popitem(last=False)
+            requirements = list(queue.values())
+            command, env = self.command(manager, requirements)
+            print(f"\n📋 Running command: {command}")
+            start = time.perf_counter()
+            try:
+                process = subprocess.run(
+                    command, shell=True, cwd=directory, capture_output=True, text=True,
+                    timeout=self.timeout, env={**os.environ, **env},
+                )
+            except subprocess.TimeoutExpired:
+                results.append(f"[ERROR] {command} timed out after {self.timeout} seconds")
+                continue
+            finally:
+                self.stats["seconds"] += time.perf_counter() - start
+                self.stats["commands"] += 1
+                # Whatever happened, re-read lockfiles and the environment next time
+                self._states.pop(directory, None)
+            if process.returncode != 0:
+                results.append(f"[ERROR] {command} failed with exit code {process.returncode}:\n{process.stderr.strip()[-2000:]}")
+                continue
+            self.stats["installed"] += sum(1 for r in requirements if r.raw)
+            results.append(f"Installed {' '.join(r.raw or ' '.join(r.flags) for r in requirements)} with {manager} "
+                           f"in {time.perf_counter() - start:.1f}s")
+        return "\n".join(results)
+
+    def summary(self):
+        s = self.stats
+        return (f"{s['requested']} packages requested, {s['skipped']} already satisfied, "
+                f"{s['installed']} installed in {s['commands']} commands ({s['seconds']:.1f}s)")
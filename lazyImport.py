@@ -0,0 +1,57 @@
+"""Deferred imports for the agent entry points.
+
+The Gemini SDK alone takes most of a second to import. Entry points bind heavy modules
+with lazy_import (loaded on first attribute access) and call prewarm before the first
+input() so the import runs in the background while the user is typing.
+
+    types = lazy_import("google.genai.types")
+    prewarm("google.genai")
+"""
+import importlib
+import threading
+
+# Background imports started by prewarm
+_prewarming = []
+
+
+class LazyModule:
+    """Stands in for a module and imports it on first attribute access."""
+
+    def __init__(self, name):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        if self._module is None:
+            # Importing a package's submodule while another thread is still importing the
+            # package can fail half-way, so let a running prewarm finish first
+            for thread in _prewarming:
+                thread.join()
+            self.__dict__["_module"] = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name):
+    return LazyModule(name)
+
+
+def prewarm(*names):
+    """Import modules on a daemon thread; lazy modules wait for it instead of importing alongside it."""
+    def run():
+        for name in names:
+            try:
+                importlib.import_module(name)
+            except Exception:
+                pass  # the real import on first use reports the error
+
+    thread = threading.Thread(target=run, name="prewarm", daemon=True)
+    _prewarming.append(thread)
+    thread.start()
+    return thread
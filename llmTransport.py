@@ -0,0 +1,498 @@
+"""Shared LLM transport: live, record, replay or stub, picked with LLM_TRANSPORT.
+
+    live    the real SDK clients, untouched and built on first use (default)
+    record  real calls, with every request/response (stream chunks and timing) appended to LLM_LOG
+    replay  responses served from LLM_LOG, no network; LLM_REPLAY_SPEED=1 replays recorded latency
+    stub    canned responses shaped like the real ones, so loops run end to end offline
+
+Agents get their clients from here (gemini_client, openai_client, chat_model, embeddings)
+and use them exactly like the SDK objects they stand in for.
+
+Usage:
+    LLM_TRANSPORT=record python weatherAgent.py
+    LLM_TRANSPORT=replay LLM_REPLAY_SPEED=0 python weatherAgent.py
+    LLM_TRANSPORT=stub LLM_STUB_LATENCY=0.3 python codingAgent.py
+"""
+import gzip
+import hashlib
+import importlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import defaultdict, deque
+
+from dotenv import load_dotenv
+
+# The settings below are read at import, which happens before the agents load their .env
+load_dotenv()
+
+MODE = os.getenv("LLM_TRANSPORT", "live")
+LOG_PATH = os.getenv("LLM_LOG", "llm_log.jsonl")
+# Multiplier for recorded latency on replay (0 = as fast as possible, 1 = as recorded)
+REPLAY_SPEED = float(os.getenv("LLM_REPLAY_SPEED", "0"))
+# "stub" answers requests missing from the log instead of raising ReplayMiss
+REPLAY_MISS = os.getenv("LLM_REPLAY_MISS", "error")
+# Stub timing (seconds) and an optional "module:function" that builds replies from a request
+STUB_LATENCY = float(os.getenv("LLM_STUB_LATENCY", "0"))
+STUB_GAP = float(os.getenv("LLM_STUB_GAP", "0"))
+STUB_RESPONDER = os.getenv("LLM_STUB")
+STUB_CHUNK_CHARS = 16
+STUB_EMBED_DIM = int(os.getenv("LLM_STUB_EMBED_DIM", "768"))
+
+MODES = ("live", "record", "replay", "stub")
+
+
+class ReplayMiss(LookupError):
+    pass
+
+
+# === Serialization ===
+def _jsonable(value):
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json", exclude_none=True)
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items() if v is not None}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def _texts(value):
+    """Every string found under "text"/"content" keys, in order."""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key in ("text", "content") and isinstance(item, str):
+                yield item
+            elif isinstance(item, (dict, list)):
+                yield from _texts(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _texts(item)
+    elif isinstance(value, str):
+        yield value
+
+
+class TransportLog:
+    """Append-only JSONL (optionally gzipped) log of calls, indexed by request key for replay."""
+
+    def __init__(self, path=None):
+        self.path = path or LOG_PATH
+        self._lock = threading.Lock()
+        self._entries = None
+        # Cached content names differ per run; requests refer to them by a content-derived alias
+        self.cache_aliases = {}
+
+    def _open(self, mode):
+        if self.path.endswith(".gz"):
+            return gzip.open(self.path, mode + "t", encoding="utf-8")
+        return open(self.path, mode, encoding="utf-8")
+
+    def key(self, api, request):
+        text = json.dumps(_jsonable(request), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        for name, alias in self.cache_aliases.items():
+            text = text.replace(name, alias)
+        return hashlib.sha256(f"{api}\n{text}".encode("utf-8")).hexdigest()[:32]
+
+    def append(self, entry):
+        line = json.dumps(entry, separators=(",", ":"), ensure_ascii=False)
+        with self._lock, self._open("a") as f:
+            f.write(line + "\n")
+
+    def next(self, key):
+        """The next recorded entry for `key`; the last one repeats once they run out."""
+        with self._lock:
+            if self._entries is None:
+                self._entries = defaultdict(deque)
+                if os.path.exists(self.path):
+                    with self._open("r") as f:
+                        for line in f:
+                            if line.strip():
+                                entry = json.loads(line)
+                                self._entries[entry["key"]].append(entry)
+            queue = self._entries.get(key)
+            if not queue:
+                return None
+            return queue.popleft() if len(queue) > 1 else queue[0]
+
+
+_log = None
+
+
+def get_log():
+    global _log
+    if _log is None:
+        _log = TransportLog()
+    return _log
+
+
+# === Stub replies ===
+def _load_responder():
+    if not STUB_RESPONDER:
+        return None
+    module, _, name = STUB_RESPONDER.partition(":")
+    return getattr(importlib.import_module(module), name or "respond")
+
+
+def stub_reply(api, request, wants_json=False, schema=None):
+    """Reply text for a request: a final step object for JSON requests, a short answer otherwise."""
+    responder = _load_responder()
+    if responder is not None:
+        reply = responder({"api": api, "request": _jsonable(request)})
+        return reply if isinstance(reply, str) else json.dumps(reply)
+
+    texts = list(_texts(_jsonable(request.get("contents", request.get("messages", request.get("input"))))))
+    question = " ".join((texts[-1] if texts else "").split())[-80:]
+    if not wants_json:
+        return f"Stub answer to: {question}"
+
+    schema = schema or {}
+    items = schema.get("items") or {}
+    steps = (items.get("properties") or {}).get("step", {}).get("enum")
+    if str(schema.get("type", "")).upper() == "ARRAY":
+        return json.dumps([{"step": step, "content": f"Stub {step} for: {question}"} for step in steps or ["result"]])
+    # The agents end on "result" (chat.py) or "output" (the tool agents)
+    prompt = "\n".join(texts)
+    named = set(re.findall(r'"step"\s*:\s*"(\w+)"', prompt))
+    final = "result" if "result" in named else "output"
+    return json.dumps({"step": final, "content": f"Stub answer to: {question}"})
+
+
+def _pieces(text):
+    return [text[i:i + STUB_CHUNK_CHARS] for i in range(0, len(text), STUB_CHUNK_CHARS)] or [""]
+
+
+def _tokens(text):
+    return len(text) // 4 + 1
+
+
+# === Replay plumbing ===
+def _sleep(seconds):
+    if seconds > 0:
+        time.sleep(seconds)
+
+
+def _replayed(entry, build):
+    """Objects for a recorded or stubbed entry, with its latency scaled."""
+    speed = REPLAY_SPEED if entry.get("recorded", True) else 1.0
+    if "chunks" not in entry:
+        _sleep(entry.get("seconds", 0) * speed)
+        return build(entry["response"])
+
+    def chunks():
+        _sleep(entry.get("ttft", 0) * speed)
+        gaps = entry.get("gaps") or []
+        for i, chunk in enumerate(entry["chunks"]):
+            if i:
+                _sleep((gaps[i - 1] if i - 1 < len(gaps) else 0) * speed)
+            yield build(chunk)
+
+    return chunks()
+
+
+def _recorded_stream(log, key, api, model, stream, start):
+    chunks, gaps = [], []
+    ttft, last = None, None
+    try:
+        for chunk in stream:
+            now = time.perf_counter()
+            if ttft is None:
+                ttft = now - start
+            else:
+                gaps.append(round(now - last, 4))
+            last = now
+            chunks.append(_jsonable(chunk))
+            yield chunk
+    finally:
+        log.append({"key": key, "api": api, "model": model, "chunks": chunks, "ttft": round(ttft or 0.0, 4),
+                    "gaps": gaps, "seconds": round(time.perf_counter() - start, 4)})
+
+
+class _Transport:
+    """Routes one API call through record, replay or stub."""
+
+    def __init__(self, mode):
+        self.mode = mode
+        self.log = get_log()
+
+    def call(self, api, model, request, live, build, stub_entry, stream=False):
+        key = self.log.key(api, request)
+        if self.mode == "record":
+            start = time.perf_counter()
+            result = live()
+            if stream:
+                return _recorded_stream(self.log, key, api, model, result, start)
+            seconds = round(time.perf_counter() - start, 4)
+            self.log.append({"key": key, "api": api, "model": model, "response": _jsonable(result), "seconds": seconds})
+            return result
+
+        entry = self.log.next(key) if self.mode == "replay" else None
+        if entry is None:
+            if self.mode == "replay" and REPLAY_MISS != "stub":
+                raise ReplayMiss(f"No recorded {api} response for this request ({model}) in {self.log.path}")
+            entry = stub_entry()
+        return _replayed(entry, build)
+
+
+# === Gemini (google-genai) ===
+class _GeminiModels:
+    def __init__(self, transport, client):
+        self._transport = transport
+        self._client = client
+
+    def _stub_entry(self, request, stream):
+        from google.genai import types
+
+        config = request.get("config")
+        if isinstance(config, dict):
+            config = types.GenerateContentConfig(**config)
+        wants_json = bool(config and config.response_mime_type == "application/json")
+        schema = _jsonable(config.response_schema) if config and config.response_schema else None
+        text = stub_reply("gemini", request, wants_json, schema)
+        prompt_tokens = sum(_tokens(t) for t in _texts(_jsonable(request.get("contents"))))
+        usage = {"prompt_token_count": prompt_tokens, "candidates_token_count": _tokens(text),
+                 "total_token_count": prompt_tokens + _tokens(text)}
+
+        def chunk(piece, final):
+            body = {"candidates": [{"content": {"role": "model", "parts": [{"text": piece}]},
+                                    **({"finish_reason": "STOP"} if final else {})}]}
+            if final:
+                body["usage_metadata"] = usage
+            return body
+
+        entry = {"recorded": False, "ttft": STUB_LATENCY, "seconds": STUB_LATENCY}
+        if not stream:
+            return {**entry, "response": chunk(text, True)}
+        pieces = _pieces(text)
+        return {**entry, "chunks": [chunk(p, i == len(pieces) - 1) for i, p in enumerate(pieces)],
+                "gaps": [STUB_GAP] * (len(pieces) - 1)}
+
+    def _call(self, api, stream, model, contents, config, **kwargs):
+        from google.genai import types
+
+        request = {"model": model, "contents": contents, "config": config, **kwargs}
+        live = lambda: getattr(self._client().models, api)(model=model, contents=contents, config=config, **kwargs)
+        return self._transport.call(
+            f"gemini.{api}", model, request, live, types.GenerateContentResponse.model_validate,
+            lambda: self._stub_entry(request, stream), stream=stream,
+        )
+
+    def generate_content(self, *, model, contents, config=None, **kwargs):
+        return self._call("generate_content", False, model, contents, config, **kwargs)
+
+    def generate_content_stream(self, *, model, contents, config=None, **kwargs):
+        return self._call("generate_content_stream", True, model, contents, config, **kwargs)
+
+
+class _GeminiCaches:
+    def __init__(self, transport, client):
+        self._transport = transport
+        self._client = client
+
+    def create(self, *, model, config=None, **kwargs):
+        from google.genai import types
+
+        digest = hashlib.sha256(json.dumps(_jsonable(config), sort_keys=True).encode("utf-8")).hexdigest()[:16]
+        alias = f"cachedContents/replay-{digest}"
+        if self._transport.mode != "record":
+            return types.CachedContent(name=alias, model=model)
+        cache = self._client().caches.create(model=model, config=config, **kwargs)
+        self._transport.log.cache_aliases[cache.name] = alias
+        return cache
+
+    def update(self, *, name, config=None, **kwargs):
+        from google.genai import types
+
+        if self._transport.mode != "record":
+            return types.CachedContent(name=name)
+        return self._client().caches.update(name=name, config=config, **kwargs)
+
+    def delete(self, *, name, **kwargs):
+        if self._transport.mode == "record":
+            return self._client().caches.delete(name=name, **kwargs)
+
+
+class GeminiClient:
+    """Stands in for google.genai.Client: .models.generate_content(_stream) and .caches."""
+
+    def __init__(self, mode=MODE, **client_kwargs):
+        self._client_kwargs = client_kwargs
+        self._real = None
+        transport = _Transport(mode)
+        self.models = _GeminiModels(transport, self._real_client)
+        self.caches = _GeminiCaches(transport, self._real_client)
+
+    def _real_client(self):
+        if self._real is None:
+            from google import genai
+
+            self._real = genai.Client(**self._client_kwargs)
+        return self._real
+
+
+class _LazyClient:
+    """A live SDK client built on first attribute access, so importing an agent doesn't load the SDK."""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+        return getattr(self._client, name)
+
+
+def _live_gemini(client_kwargs):
+    from google import genai
+
+    return genai.Client(**client_kwargs)
+
+
+def gemini_client(**client_kwargs):
+    """A google-genai client for the current LLM_TRANSPORT mode."""
+    if MODE == "live":
+        return _LazyClient(lambda: _live_gemini(client_kwargs))
+    return GeminiClient(MODE, **client_kwargs)
+
+
+# === OpenAI-compatible chat completions ===
+class _Completions:
+    def __init__(self, transport, client):
+        self._transport = transport
+        self._client = client
+
+    def _stub_entry(self, kwargs):
+        wants_json = (kwargs.get("response_format") or {}).get("type") in ("json_object", "json_schema")
+        text = stub_reply("openai", kwargs, wants_json)
+        prompt_tokens = sum(_tokens(t) for t in _texts(kwargs.get("messages")))
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": _tokens(text),
+                 "total_tokens": prompt_tokens + _tokens(text)}
+        base = {"id": "stub", "created": 0, "model": kwargs.get("model", "stub")}
+        entry = {"recorded": False, "ttft": STUB_LATENCY, "seconds": STUB_LATENCY}
+        if not kwargs.get("stream"):
+            return {**entry, "response": {**base, "object": "chat.completion", "usage": usage, "choices": [
+                {"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": text}}]}}
+        chunks = [{**base, "object": "chat.completion.chunk", "choices": [
+            {"index": 0, "delta": {"role": "assistant", "content": piece}}]} for piece in _pieces(text)]
+        chunks[-1]["choices"][0]["finish_reason"] = "stop"
+        if (kwargs.get("stream_options") or {}).get("include_usage"):
+            chunks.append({**base, "object": "chat.completion.chunk", "choices": [], "usage": usage})
+        return {**entry, "chunks": chunks, "gaps": [STUB_GAP] * (len(chunks) - 1)}
+
+    def create(self, **kwargs):
+        from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+        stream = bool(kwargs.get("stream"))
+        build = (ChatCompletionChunk if stream else ChatCompletion).model_validate
+        return self._transport.call(
+            "openai.chat" + (".stream" if stream else ""), kwargs.get("model"), kwargs,
+            lambda: self._client().chat.completions.create(**kwargs), build,
+            lambda: self._stub_entry(kwargs), stream=stream,
+        )
+
+
+class _Chat:
+    def __init__(self, completions):
+        self.completions = completions
+
+
+class OpenAIClient:
+    """Stands in for openai.OpenAI: .chat.completions.create, streaming or not."""
+
+    def __init__(self, mode=MODE, **client_kwargs):
+        self._client_kwargs = client_kwargs
+        self._real = None
+        self.chat = _Chat(_Completions(_Transport(mode), self._real_client))
+
+    def _real_client(self):
+        if self._real is None:
+            from openai import OpenAI
+
+            self._real = OpenAI(**self._client_kwargs)
+        return self._real
+
+
+def _live_openai(client_kwargs):
+    from openai import OpenAI
+
+    return OpenAI(**client_kwargs)
+
+
+def openai_client(**client_kwargs):
+    """An OpenAI-compatible client for the current LLM_TRANSPORT mode."""
+    if MODE == "live":
+        return _LazyClient(lambda: _live_openai(client_kwargs))
+    return OpenAIClient(MODE, **client_kwargs)
+
+
+# === LangChain (RAG) ===
+class _ChatModel:
+    def __init__(self, llm):
+        self._llm = llm
+        self._transport = _Transport(MODE)
+
+    def invoke(self, prompt, **kwargs):
+        from langchain_core.messages import AIMessage
+
+        model = getattr(self._llm, "model", None)
+        request = {"model": model, "input": prompt if isinstance(prompt, str) else _jsonable(prompt)}
+
+        def live():
+            return self._llm.invoke(prompt, **kwargs)
+
+        def stub_entry():
+            return {"recorded": False, "seconds": STUB_LATENCY, "response": {"content": stub_reply("langchain", request)}}
+
+        return self._transport.call("langchain.invoke", model, request, live,
+                                    lambda response: AIMessage(content=response["content"]), stub_entry)
+
+
+def chat_model(llm):
+    """Wrap a LangChain chat model so .invoke goes through the transport."""
+    return llm if MODE == "live" else _ChatModel(llm)
+
+
+def _stub_vector(text):
+    rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+    vector = [rng.gauss(0, 1) for _ in range(STUB_EMBED_DIM)]
+    norm = sum(x * x for x in vector) ** 0.5 or 1.0
+    return [x / norm for x in vector]
+
+
+def embeddings(embedder):
+    """Wrap LangChain embeddings so embed_query/embed_documents go through the transport."""
+    if MODE == "live":
+        return embedder
+
+    from langchain_core.embeddings import Embeddings
+
+    class TransportEmbeddings(Embeddings):
+        def __init__(self):
+            self._transport = _Transport(MODE)
+            self._model = getattr(embedder, "model", None)
+
+        def _call(self, api, texts, live):
+            request = {"model": self._model, "input": texts}
+            stub_entry = lambda: {"recorded": False, "seconds": STUB_LATENCY,
+                                  "response": [_stub_vector(t) for t in texts]}
+            vectors = self._transport.call(
+                api, self._model, request, lambda: [[round(x, 7) for x in v] for v in live()],
+                lambda response: response, stub_entry,
+            )
+            return vectors
+
+        def embed_documents(self, texts):
+            return self._call("embeddings.documents", list(texts), lambda: embedder.embed_documents(texts))
+
+        def embed_query(self, text):
+            return self._call("embeddings.query", [text], lambda: [embedder.embed_query(text)])[0]
+
+    return TransportEmbeddings()
@@ -0,0 +1,177 @@
+"""Pick the model and output cap for each agent request from the step it is likely to produce.
+
+Agents ask for one step at a time, so the previous step predicts the next one well
+(a plan is usually followed by an action, an observation by a plan or the answer).
+Requests whose likely next steps are all cheap (plans, tool selection, short answers)
+go to a smaller, faster model with an output cap learned from past steps; anything
+that may write code goes to the strong model with the agent's own cap. A reply that
+comes back cut off or unparseable is retried on the strong model and raises the cap.
+
+Transition counts and output sizes persist in ROUTER_STATS across runs.
+Set MODEL_ROUTER=0 to send every request to the strong model as before.
+"""
+import json
+import math
+import os
+import tempfile
+import threading
+from collections import namedtuple
+
+ENABLED = os.getenv("MODEL_ROUTER", "1") != "0"
+STRONG_MODEL = os.getenv("STRONG_MODEL", "gemini-2.0-flash-001")
+CHEAP_MODEL = os.getenv("CHEAP_MODEL", "gemini-2.0-flash-lite-001")
+STATS_PATH = os.getenv("ROUTER_STATS", os.path.join(os.path.expanduser("~"), ".cache", "genai", "router.json"))
+
+# USD per million input / output tokens
+PRICES = {
+    "gemini-2.0-flash-001": (0.10, 0.40),
+    "gemini-2.0-flash-lite-001": (0.075, 0.30),
+}
+# Route cheap only while the chance of a strong step is at most this
+MAX_STRONG_RISK = 0.2
+# Observations of a previous step needed before trusting its prediction
+MIN_OBSERVATIONS = 3
+# Next steps rarer than this don't count when sizing the cap
+MIN_LIKELIHOOD = 0.05
+# Learned cap = p95 of observed output tokens times this, rounded up to CAP_STEP
+CAP_HEADROOM = 1.5
+CAP_STEP = 64
+MAX_SAMPLES = 100
+
+Route = namedtuple("Route", ["model", "max_output_tokens", "previous", "predicted", "escalated"])
+
+
+def cost(model, input_tokens, output_tokens):
+    price_in, price_out = PRICES.get(model, PRICES[STRONG_MODEL])
+    return (input_tokens * price_in + output_tokens * price_out) / 1e6
+
+
+def _p95(values):
+    values = sorted(values)
+    return values[min(len(values) - 1, math.ceil(0.95 * len(values)) - 1)]
+
+
+class ModelRouter:
+    """Routes one agent's requests; step labels are whatever the agent records ("plan", "action:write_file"...)."""
+
+    def __init__(self, agent, max_output_tokens, strong_steps=(), min_output_tokens=128,
+                 strong_model=STRONG_MODEL, cheap_model=CHEAP_MODEL, path=STATS_PATH):
+        self.agent = agent
+        self.max_output_tokens = max_output_tokens
+        self.min_output_tokens = min_output_tokens
+        self.strong_steps = set(strong_steps)
+        self.strong_model = strong_model
+        self.cheap_model = cheap_model if ENABLED else strong_model
+        self.path = path
+        self._lock = threading.Lock()
+        self._escalate = False
+        # transitions: previous -> {next: count}; outputs: step -> recent output token counts;
+        # latency: model -> step -> [calls, seconds]
+        self.state = self._load()
+        self.stats = {"calls": 0, "cheap": 0, "escalated": 0, "truncated": 0, "failed": 0,
+                      "cost": 0.0, "baseline_cost": 0.0, "seconds_saved": 0.0}
+
+    # === Learned state ===
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                state = json.load(f).get(self.agent, {})
+        except (OSError, ValueError):
+            state = {}
+        return {"transitions": state.get("transitions", {}), "outputs": state.get("outputs", {}),
+                "latency": state.get("latency", {})}
+
+    def save(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                everything = json.load(f)
+        except (OSError, ValueError):
+            everything = {}
+        with self._lock:
+            everything[self.agent] = self.state
+            data = json.dumps(everything)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path) or ".")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+    def likely_steps(self, previous):
+        """{step: probability} for the step that follows `previous`, or {} with too little data."""
+        counts = self.state["transitions"].get(previous, {})
+        total = sum(counts.values())
+        if total < MIN_OBSERVATIONS:
+            return {}
+        return {step: n / total for step, n in counts.items() if n / total >= MIN_LIKELIHOOD}
+
+    def cap(self, step):
+        samples = self.state["outputs"].get(step, [])
+        if len(samples) < MIN_OBSERVATIONS:
+            return None
+        cap = math.ceil(_p95(samples) * CAP_HEADROOM / CAP_STEP) * CAP_STEP
+        return max(self.min_output_tokens, min(self.max_output_tokens, cap))
+
+    # === Routing ===
+    def route(self, previous):
+        """Model and output cap for the request that follows step `previous` ("user" at the start of a turn)."""
+        strong = Route(self.strong_model, self.max_output_tokens, previous, None, False)
+        if self._escalate:
+            self._escalate = False
+            self.stats["escalated"] += 1
+            return strong._replace(escalated=True)
+        likely = self.likely_steps(previous)
+        if not ENABLED or not likely:
+            return strong
+        predicted = max(likely, key=likely.get)
+        if sum(p for step, p in likely.items() if step in self.strong_steps) > MAX_STRONG_RISK:
+            return strong._replace(predicted=predicted)
+        caps = [self.cap(step) for step in likely]
+        if None in caps:
+            return strong._replace(predicted=predicted)
+        return Route(self.cheap_model, max(caps), previous, predicted, False)
+
+    def config(self, config, route):
+        """The agent's generation config with the route's output cap."""
+        return config.model_copy(update={"max_output_tokens": route.max_output_tokens})
+
+    def record(self, route, step, input_tokens, output_tokens, seconds):
+        """Learn from a completed call; `step` is the label the reply turned out to be."""
+        with self._lock:
+            transitions = self.state["transitions"].setdefault(route.previous, {})
+            transitions[step] = transitions.get(step, 0) + 1
+            samples = self.state["outputs"].setdefault(step, [])
+            samples.append(output_tokens)
+            del samples[:-MAX_SAMPLES]
+            latency = self.state["latency"].setdefault(route.model, {}).setdefault(step, [0, 0.0])
+            latency[0] += 1
+            latency[1] += seconds
+
+            self.stats["calls"] += 1
+            self.stats["cost"] += cost(route.model, input_tokens, output_tokens)
+            self.stats["baseline_cost"] += cost(self.strong_model, input_tokens, output_tokens)
+            if route.model != self.strong_model:
+                self.stats["cheap"] += 1
+                strong_calls, strong_seconds = self.state["latency"].get(self.strong_model, {}).get(step, [0, 0.0])
+                if strong_calls:
+                    self.stats["seconds_saved"] += strong_seconds / strong_calls - seconds
+            if output_tokens >= route.max_output_tokens:
+                self.stats["truncated"] += 1
+
+    def failed(self, route):
+        """The reply was cut off or unparseable: retry on the strong model, and size the cap up."""
+        self.stats["failed"] += 1
+        self._escalate = True
+        if route.model != self.strong_model and route.predicted:
+            with self._lock:
+                samples = self.state["outputs"].setdefault(route.predicted, [])
+                samples.append(min(self.max_output_tokens, route.max_output_tokens * 2))
+
+    def summary(self):
+        s = self.stats
+        if not s["calls"]:
+            return "no calls routed"
+        saved = s["baseline_cost"] - s["cost"]
+        percent = 100 * saved / s["baseline_cost"] if s["baseline_cost"] else 0.0
+        return (f"{s['calls']} calls, {s['cheap']} on {self.cheap_model}, {s['escalated']} retried on {self.strong_model}; "
+                f"${s['cost']:.5f} vs ${s['baseline_cost']:.5f} all-strong (saved {percent:.0f}%), "
+                f"~{round(s['seconds_saved'], 1) + 0.0}s faster")
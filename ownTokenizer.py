@@ -1,3 +1,27 @@
+import heapq
+import re
+from array import array
+from collections import Counter, defaultdict, namedtuple
+from itertools import accumulate
+
+try:
+    import numpy as np
+except ImportError:  # the bytes.translate path below works without it
+    np = None
+
+# Flat token ids (uint8) plus word boundaries: word i is ids[offsets[i]:offsets[i + 1]]
+EncodedText = namedtuple("EncodedText", ["ids", "offsets"])
+# Same for many texts: text j spans words doc_offsets[j]..doc_offsets[j + 1]
+EncodedBatch = namedtuple("EncodedBatch", ["ids", "offsets", "doc_offsets"])
+
+WORD_BREAK = 255
+# Extra codes used by the NumPy path
+DROPPED = 254
+DOC_BREAK = 253
+# What str.split() treats as whitespace within ASCII
+ASCII_WHITESPACE = b" \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f"
+
+
 class EnglishCharTokenizer:
     def __init__(self):
         self.vocabSpace = {}
@@ -9,6 +33,31 @@ class EnglishCharTokenizer:
             self.NumvocabSpace[idx] = ch
             idx += 1
 
+        # 256-entry lookup tables for bytes.translate: vocab bytes map to their id,
+        # the (normalized) word separator to WORD_BREAK, everything else is deleted
+        encode_table = bytearray(range(256))
+        keep = set()
+        for ch, i in self.vocabSpace.items():
+            encode_table[ord(ch)] = WORD_BREAK if ch == " " else i
+            keep.add(ord(ch))
+        self._encode_table = bytes(encode_table)
+        self._delete = bytes(b for b in range(256) if b not in keep)
+        self._delete_separators = self._delete + b" "
+
+        decode_table = bytearray(256)
+        for i, ch in self.NumvocabSpace.items():
+            decode_table[i] = ord(ch)
+        self._decode_table = bytes(decode_table)
+
+        if np is not None:
+            table = np.full(256, DROPPED, dtype=np.uint8)
+            for ch, i in self.vocabSpace.items():
+                table[ord(ch)] = i
+            table[list(ASCII_WHITESPACE)] = WORD_BREAK
+            table[0] = DOC_BREAK
+            self._np_table = table
+            self._np_decode_table = np.frombuffer(self._decode_table, dtype=np.uint8)
+
     def encode(self, text):
         return [
             [self.vocabSpace[char] for char in word if char in self.vocabSpace]
@@ -20,13 +69,291 @@ class EnglishCharTokenizer:
             "".join(self.NumvocabSpace[i] for i in word_ids) for word_ids in batch_ids
         )
 
+    # === High throughput path ===
+    def _word_pieces(self, text):
+        """Translated bytes of each word in `text` (same words as text.split())."""
+        normalized = " ".join(text.split())
+        if not normalized:
+            return []
+        # Non-ASCII characters only produce bytes >= 0x80, which are all deleted
+        data = normalized.encode("utf-8").translate(self._encode_table, self._delete)
+        return data.split(bytes([WORD_BREAK]))
+
+    def _np_words(self, raw):
+        """Split raw ASCII bytes into ids, word offsets and the text index of each word."""
+        codes = self._np_table.take(np.frombuffer(raw, dtype=np.uint8))
+        separator = (codes == WORD_BREAK) | (codes == DOC_BREAK)
+        previous = np.empty_like(separator)
+        previous[:1] = True
+        previous[1:] = separator[:-1]
+        word_starts = np.flatnonzero(~separator & previous)
+        offsets = np.zeros(len(word_starts) + 1, dtype=np.int64)
+        if len(word_starts) and (codes == DROPPED).any():
+            # Each segment [start_i, start_i+1) is a word plus the separators after it
+            np.cumsum(np.add.reduceat(codes < DOC_BREAK, word_starts, dtype=np.int64), out=offsets[1:])
+        elif len(word_starts):
+            # Nothing dropped: a word's length is just end - start
+            following = np.empty_like(separator)
+            following[-1:] = True
+            following[:-1] = separator[1:]
+            word_ends = np.flatnonzero(~separator & following)
+            np.cumsum(word_ends - word_starts + 1, out=offsets[1:])
+        doc_of_word = np.searchsorted(np.flatnonzero(codes == DOC_BREAK), word_starts)
+        ids = raw.translate(self._encode_table, self._delete_separators)
+        return ids, offsets, doc_of_word
+
+    def _np_decode(self, ids, offsets):
+        data = np.frombuffer(bytes(ids), dtype=np.uint8)
+        if data.size and int(data.max()) >= len(self.NumvocabSpace):
+            raise KeyError(int(data.max()))
+        chars = self._np_decode_table[data]
+        bounds = np.frombuffer(offsets, dtype=np.int64) if isinstance(offsets, array) else np.asarray(offsets)
+        return np.insert(chars, bounds[1:-1], ord(" ")).tobytes().decode("ascii")
+
+    def encode_array(self, text):
+        """Encode to a flat uint8 id array plus word offsets instead of nested lists."""
+        if np is not None and text.isascii() and "\x00" not in text:
+            ids, offsets, _ = self._np_words(text.encode("ascii"))
+            return EncodedText(array("B", ids), array("q", offsets.tobytes()))
+
+        pieces = self._word_pieces(text)
+        return EncodedText(
+            array("B", b"".join(pieces)),
+            array("q", accumulate(map(len, pieces), initial=0)),
+        )
+
+    def decode_array(self, ids, offsets):
+        """Inverse of encode_array; matches decode(encode(text))."""
+        if np is not None:
+            return self._np_decode(ids, offsets)
+
+        data = bytes(ids)
+        if data and max(data) >= len(self.NumvocabSpace):
+            raise KeyError(max(data))
+        data = data.translate(self._decode_table)
+        words = map(data.__getitem__, map(slice, offsets[:-1], offsets[1:]))
+        return b" ".join(words).decode("ascii")
+
+    def encode_batch(self, texts):
+        """Encode many texts into one flat id array with word and per-text offsets."""
+        texts = list(texts)
+        if np is not None and texts:
+            # One pass over all texts, joined with NUL as the text separator
+            joined = "\x00".join(texts)
+            if joined.isascii() and joined.count("\x00") == len(texts) - 1:
+                ids, offsets, doc_of_word = self._np_words(joined.encode("ascii"))
+                doc_offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+                np.cumsum(np.bincount(doc_of_word, minlength=len(texts)), out=doc_offsets[1:])
+                return EncodedBatch(
+                    array("B", ids),
+                    array("q", offsets.tobytes()),
+                    array("q", doc_offsets.tobytes()),
+                )
+
+        pieces = []
+        doc_offsets = [0]
+        for text in texts:
+            pieces.extend(self._word_pieces(text))
+            doc_offsets.append(len(pieces))
+        return EncodedBatch(
+            array("B", b"".join(pieces)),
+            array("q", accumulate(map(len, pieces), initial=0)),
+            array("q", doc_offsets),
+        )
+
+    def decode_batch(self, ids, offsets, doc_offsets):
+        if np is not None:
+            # Decode everything once, then cut each text out: word w starts at offsets[w] + w
+            joined = self._np_decode(ids, offsets)
+            texts = []
+            for start, end in zip(doc_offsets, doc_offsets[1:]):
+                texts.append(joined[offsets[start] + start:offsets[end] + end - 1] if end > start else "")
+            return texts
+
+        data = bytes(ids)
+        if data and max(data) >= len(self.NumvocabSpace):
+            raise KeyError(max(data))
+        data = data.translate(self._decode_table)
+        texts = []
+        for start, end in zip(doc_offsets, doc_offsets[1:]):
+            words = map(data.__getitem__, map(slice, offsets[start:end], offsets[start + 1:end + 1]))
+            texts.append(b" ".join(words).decode("ascii"))
+        return texts
+
+
+# GPT-2 style pre-tokenization with the stdlib re module. Every character is matched
+# by one of the branches, so "".join(findall(text)) == text and nothing is dropped.
+PRETOKENIZE = re.compile(r"""'(?:[sdmt]|ll|ve|re)| ?[^\W\d_]+| ?\d{1,3}| ?(?:[^\s\w]|_)+|\s+(?!\S)|\s+""")
+
+BPE_MAGIC = b"BPE1"
+
+
+class BytePairTokenizer:
+    """Trainable byte-level BPE tokenizer.
+
+    Ids 0-255 are raw bytes, so any text (digits, punctuation, emoji...) encodes
+    losslessly even with no merges. Each merge adds one id on top.
+    """
+
+    def __init__(self, merges=None, cache_size=100_000):
+        # (left id, right id) -> merged id; ids are assigned in merge order so they double as ranks
+        self.merges = {}
+        self.vocab = {i: bytes([i]) for i in range(256)}
+        self.cache_size = cache_size
+        self._cache = {}
+        for pair in merges or []:
+            self._add_merge(tuple(pair))
+
+    def _add_merge(self, pair):
+        new_id = 256 + len(self.merges)
+        self.merges[pair] = new_id
+        self.vocab[new_id] = self.vocab[pair[0]] + self.vocab[pair[1]]
+        return new_id
+
+    @property
+    def vocab_size(self):
+        return len(self.vocab)
+
+    # === Training ===
+    def train(self, texts, vocab_size, min_frequency=2):
+        """Learn merges until the vocab reaches `vocab_size` (texts: a string or an iterable of strings).
+
+        Pair counts live in a max-heap (lazy deletion) and are updated only for the
+        words touched by each merge, instead of recounting the corpus every round.
+        """
+        if isinstance(texts, str):
+            texts = [texts]
+        chunk_counts = Counter()
+        for text in texts:
+            chunk_counts.update(PRETOKENIZE.findall(text))
+
+        # Work on unique chunks weighted by frequency, already merged by any existing merges
+        words = [self._encode_chunk(chunk) for chunk in chunk_counts]
+        freqs = list(chunk_counts.values())
+
+        pair_counts = defaultdict(int)
+        where = defaultdict(set)
+        for i, word in enumerate(words):
+            for pair in zip(word, word[1:]):
+                pair_counts[pair] += freqs[i]
+                where[pair].add(i)
+
+        heap = [(-count, pair) for pair, count in pair_counts.items()]
+        heapq.heapify(heap)
+
+        while len(self.vocab) < vocab_size and heap:
+            neg_count, pair = heapq.heappop(heap)
+            count = pair_counts.get(pair, 0)
+            if count != -neg_count:
+                continue  # stale entry, a fresher one is in the heap
+            if count < min_frequency:
+                break
+
+            new_id = self._add_merge(pair)
+            changed = set()
+            for i in where.pop(pair, ()):
+                word = words[i]
+                merged = merge_pair(word, pair, new_id)
+                if len(merged) == len(word):
+                    continue
+                freq = freqs[i]
+                for old in zip(word, word[1:]):
+                    pair_counts[old] -= freq
+                    changed.add(old)
+                for new in zip(merged, merged[1:]):
+                    pair_counts[new] += freq
+                    where[new].add(i)
+                    changed.add(new)
+                words[i] = merged
+
+            for changed_pair in changed:
+                count = pair_counts[changed_pair]
+                if count > 0:
+                    heapq.heappush(heap, (-count, changed_pair))
+                else:
+                    del pair_counts[changed_pair]
+
+        self._cache.clear()
+        return self
+
+    # === Encoding ===
+    def _encode_chunk(self, chunk):
+        ids = list(chunk.encode("utf-8"))
+        merges = self.merges
+        while len(ids) > 1:
+            # Lowest id = earliest merge
+            best = min(zip(ids, ids[1:]), key=lambda pair: merges.get(pair, float("inf")))
+            if best not in merges:
+                break
+            ids = merge_pair(ids, best, merges[best])
+        return ids
+
+    def encode(self, text):
+        ids = []
+        cache = self._cache
+        for chunk in PRETOKENIZE.findall(text):
+            chunk_ids = cache.get(chunk)
+            if chunk_ids is None:
+                chunk_ids = self._encode_chunk(chunk)
+                if len(cache) >= self.cache_size:
+                    cache.clear()
+                cache[chunk] = chunk_ids
+            ids.extend(chunk_ids)
+        return ids
+
+    def decode(self, ids):
+        return b"".join(self.vocab[i] for i in ids).decode("utf-8", errors="replace")
+
+    # === Persistence ===
+    def save(self, path):
+        """Write the merges as a flat little-endian uint32 array; the vocab is rebuilt from them."""
+        pairs = array("I", [i for pair in self.merges for i in pair])
+        if pairs.itemsize != 4:
+            pairs = array("L", pairs)
+        if array("H", [1]).tobytes() != b"\x01\x00":
+            pairs.byteswap()
+        with open(path, "wb") as f:
+            f.write(BPE_MAGIC)
+            f.write(len(self.merges).to_bytes(4, "little"))
+            f.write(pairs.tobytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        if data[:4] != BPE_MAGIC:
+            raise ValueError(f"{path} is not a BytePairTokenizer file")
+        count = int.from_bytes(data[4:8], "little")
+        pairs = array("I")
+        pairs.frombytes(data[8:8 + count * 8])
+        if array("H", [1]).tobytes() != b"\x01\x00":
+            pairs.byteswap()
+        return cls(merges=zip(pairs[::2], pairs[1::2]))
+
+
+def merge_pair(ids, pair, new_id):
+    """Replace every occurrence of `pair` in `ids` with `new_id`."""
+    merged = []
+    i = 0
+    n = len(ids)
+    first, second = pair
+    while i < n:
+        if i < n - 1 and ids[i] == first and ids[i + 1] == second:
+            merged.append(new_id)
+            i += 2
+        else:
+            merged.append(ids[i])
+            i += 1
+    return merged
+
 
-# Example :
-tokenizer = EnglishCharTokenizer()
-text = "Humpty Dumpty sat on a wall"
-encoded = tokenizer.encode(text)
-decoded = tokenizer.decode(encoded)
+if __name__ == "__main__":
+    # Example :
+    tokenizer = EnglishCharTokenizer()
+    text = "Humpty Dumpty sat on a wall"
+    encoded = tokenizer.encode(text)
+    decoded = tokenizer.decode(encoded)
 
-print("Original:", text)
-print("Encoded :", encoded)
-print("Decoded :", decoded)
+    print("Original:", text)
+    print("Encoded :", encoded)
+    print("Decoded :", decoded)
@@ -0,0 +1,244 @@
+import os
+import threading
+import time
+
+# Set PROMPT_CACHE=0 to always send the prefix inline
+ENABLED = os.getenv("PROMPT_CACHE", "1") != "0"
+# Renew the cache this many seconds before its TTL runs out, so no request references an expired one
+RENEW_MARGIN = 60
+# After a transient failure (429, 5xx, network) creation is retried after this many seconds, doubling up to the max
+RETRY_BACKOFF = 5
+RETRY_BACKOFF_MAX = 300
+
+
+def ttl_seconds(ttl):
+    """Seconds in a caches.create TTL such as "3600s"."""
+    return float(str(ttl).rstrip("s"))
+
+
+def is_permanent(error):
+    """Whether a caches.create failure will not go away on retry (prompt too small, unsupported model...)."""
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    return isinstance(code, int) and 400 <= code < 500 and code not in (408, 429)
+
+
+class PromptCache:
+    """Register a static prompt prefix once as Gemini cached content and reuse it.
+
+    Callers keep their history *without* the prefix and go through this class:
+    when the cache exists requests reference it by name, otherwise the prefix is
+    sent inline exactly as before (so implicit caching can still kick in).
+    Every call records cached/uncached input tokens and time to first token.
+    """
+
+    def __init__(self, system_prompt, model="gemini-2.0-flash-001", client=None, ttl="3600s", display_name=None):
+        self.system_prompt = system_prompt
+        self.model = model
+        self.ttl = ttl
+        self.display_name = display_name
+        self._client = client
+        self.cache_name = None
+        self.expires_at = None
+        self.retry_at = 0.0
+        self.backoff = RETRY_BACKOFF
+        self.last_error = None
+        self._lock = threading.Lock()
+        self.disabled_reason = None if ENABLED else "disabled with PROMPT_CACHE=0"
+        self.calls = []
+
+    @property
+    def client(self):
+        if self._client is None:
+            from llmTransport import gemini_client
+
+            self._client = gemini_client(api_key=os.getenv("GEMINI_API_KEY"))
+        return self._client
+
+    # === Cache Lifecycle ===
+    def ensure(self):
+        """Return the cached content name, creating it on first use or renewing it before it expires; None means fall back."""
+        with self._lock:
+            if self.disabled_reason:
+                return None
+            now = time.monotonic()
+            if self.cache_name and now < self.expires_at:
+                return self.cache_name
+            if now < self.retry_at:
+                return None
+
+            from google.genai import types
+
+            if self.cache_name:
+                try:
+                    # Extend the existing cache instead of leaving it behind next to a new one
+                    self.client.caches.update(name=self.cache_name, config=types.UpdateCachedContentConfig(ttl=self.ttl))
+                    self._created()
+                    return self.cache_name
+                except Exception:
+                    self._forget()
+            try:
+                cache = self.client.caches.create(
+                    model=self.model,
+                    config=types.CreateCachedContentConfig(
+                        contents=self.prefix(),
+                        ttl=self.ttl,
+                        display_name=self.display_name,
+                    ),
+                )
+                self.cache_name = cache.name
+                self._created()
+            except Exception as e:
+                self.cache_name = None
+                self.last_error = str(e)
+                if is_permanent(e):
+                    # Prompt below the model's minimum cache size, unsupported model...
+                    self.disabled_reason = str(e)
+                else:
+                    # Rate limits, server errors, network: send the prefix inline for a while
+                    self.retry_at = time.monotonic() + self.backoff
+                    self.backoff = min(self.backoff * 2, RETRY_BACKOFF_MAX)
+            return self.cache_name
+
+    def _created(self):
+        self.expires_at = time.monotonic() + max(0.0, ttl_seconds(self.ttl) - RENEW_MARGIN)
+        self.backoff = RETRY_BACKOFF
+        self.last_error = None
+
+    def _forget(self):
+        """Drop the current cache name, deleting the cache if the server still has it."""
+        name, self.cache_name, self.expires_at = self.cache_name, None, None
+        try:
+            self.client.caches.delete(name=name)
+        except Exception:
+            pass
+
+    def invalidate(self):
+        """Forget the cache (e.g. it was rejected) so the next call recreates it."""
+        with self._lock:
+            if self.cache_name:
+                self._forget()
+
+    def prefix(self):
+        from google.genai import types
+
+        return [types.Content(role="user", parts=[types.Part.from_text(text=self.system_prompt)])]
+
+    # === Gemini (google-genai) ===
+    def request(self, contents, config):
+        """Return (contents, config) for a generate_content call with the prefix applied."""
+        name = self.ensure()
+        if name:
+            return contents, config.model_copy(update={"cached_content": name})
+        return self.prefix() + list(contents), config
+
+    def generate_content(self, contents, config):
+        for attempt in range(2):
+            request_contents, request_config = self.request(contents, config)
+            start = time.perf_counter()
+            try:
+                response = self.client.models.generate_content(
+                    model=self.model, contents=request_contents, config=request_config
+                )
+            except Exception:
+                if attempt or not request_config.cached_content:
+                    raise
+                self.invalidate()
+                continue
+            seconds = time.perf_counter() - start
+            self.record_gemini(response.usage_metadata, seconds, seconds)
+            return response
+
+    def generate_content_stream(self, contents, config):
+        """Stream chunks like client.models.generate_content_stream, recording usage at the end."""
+        for attempt in range(2):
+            request_contents, request_config = self.request(contents, config)
+            start = time.perf_counter()
+            stream = self.client.models.generate_content_stream(
+                model=self.model, contents=request_contents, config=request_config
+            )
+            try:
+                first = next(iter(stream))
+            except StopIteration:
+                return
+            except Exception:
+                if attempt or not request_config.cached_content:
+                    raise
+                self.invalidate()
+                continue
+            break
+
+        ttft = time.perf_counter() - start
+        usage = first.usage_metadata
+        try:
+            yield first
+            for chunk in stream:
+                usage = chunk.usage_metadata or usage
+                yield chunk
+        finally:
+            self.record_gemini(usage, ttft, time.perf_counter() - start)
+
+    def record_gemini(self, usage, ttft, seconds):
+        prompt_tokens = getattr(usage, "prompt_token_count", None) or 0
+        cached_tokens = getattr(usage, "cached_content_token_count", None) or 0
+        output_tokens = getattr(usage, "candidates_token_count", None) or 0
+        self._record(prompt_tokens, cached_tokens, output_tokens, ttft, seconds)
+
+    # === OpenAI compatible endpoint ===
+    def openai_kwargs(self, messages):
+        """Return model/messages/extra_body for chat.completions.create with the prefix applied."""
+        name = self.ensure()
+        if name:
+            return {
+                "model": self.model,
+                "messages": list(messages),
+                "extra_body": {"extra_body": {"google": {"cached_content": name}}},
+            }
+        return {
+            "model": self.model,
+            "messages": [{"role": "system", "content": self.system_prompt}] + list(messages),
+        }
+
+    def openai_create(self, client, messages, **kwargs):
+        """client.chat.completions.create with the prefix applied; a rejected cache is recreated once."""
+        for attempt in range(2):
+            request = self.openai_kwargs(messages)
+            try:
+                return client.chat.completions.create(**request, **kwargs)
+            except Exception:
+                if attempt or "extra_body" not in request:
+                    raise
+                self.invalidate()
+
+    def record_openai(self, usage, ttft, seconds):
+        prompt_tokens = getattr(usage, "prompt_tokens", None) or 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", None) or 0
+        output_tokens = getattr(usage, "completion_tokens", None) or 0
+        self._record(prompt_tokens, cached_tokens, output_tokens, ttft, seconds)
+
+    # === Accounting ===
+    def _record(self, prompt_tokens, cached_tokens, output_tokens, ttft, seconds):
+        self.calls.append({
+            "cached_tokens": cached_tokens,
+            "uncached_tokens": max(prompt_tokens - cached_tokens, 0),
+            "output_tokens": output_tokens,
+            "ttft": ttft,
+            "seconds": seconds,
+        })
+
+    def totals(self):
+        totals = {"calls": len(self.calls), "cached_tokens": 0, "uncached_tokens": 0, "output_tokens": 0}
+        for call in self.calls:
+            for key in ("cached_tokens", "uncached_tokens", "output_tokens"):
+                totals[key] += call[key]
+        if self.calls:
+            totals["avg_ttft"] = sum(call["ttft"] for call in self.calls) / len(self.calls)
+        return totals
+
+    def summary(self):
+        t = self.totals()
+        state = f"cache {self.cache_name}" if self.cache_name else f"no cache ({self.disabled_reason or self.last_error or 'not created'})"
+        line = f"{t['calls']} calls, {t['cached_tokens']} cached / {t['uncached_tokens']} uncached input tokens"
+        if "avg_ttft" in t:
+            line += f", avg time to first token {t['avg_ttft']:.2f}s"
+        return f"{line} [{state}]"
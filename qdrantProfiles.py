@@ -0,0 +1,98 @@
+"""Storage profiles for the docs collections: quantization, where vectors live, HNSW shape.
+
+    float32   full vectors and graph in RAM (Qdrant's defaults)
+    scalar    int8 copies in RAM, float32 originals on disk for rescoring (~4x less RAM)
+    binary    1-bit copies in RAM, originals on disk, heavier oversampling (~30x less RAM)
+    lowmem    int8 copies in RAM, originals and the HNSW graph on disk, sparser graph
+
+Ingestion uses STORAGE_PROFILE (default scalar); searches read the profile back from the
+collection's config so the right rescoring settings are used.
+"""
+import os
+
+from qdrant_client import models
+
+PROFILE = os.getenv("STORAGE_PROFILE", "scalar")
+
+PROFILES = {
+    "float32": {"quantization": None, "vectors_on_disk": False, "hnsw_on_disk": False,
+                "m": 16, "ef_construct": 100, "hnsw_ef": 64, "oversampling": None},
+    "scalar": {"quantization": "int8", "vectors_on_disk": True, "hnsw_on_disk": False,
+               "m": 16, "ef_construct": 128, "hnsw_ef": 64, "oversampling": 2.0},
+    "binary": {"quantization": "binary", "vectors_on_disk": True, "hnsw_on_disk": False,
+               "m": 32, "ef_construct": 256, "hnsw_ef": 128, "oversampling": 3.0},
+    "lowmem": {"quantization": "int8", "vectors_on_disk": True, "hnsw_on_disk": True,
+               "m": 8, "ef_construct": 100, "hnsw_ef": 64, "oversampling": 2.0},
+}
+
+# Payload fields the app filters or groups on
+PAYLOAD_INDEXES = {
+    "metadata.source": models.PayloadSchemaType.KEYWORD,
+    "metadata.language": models.PayloadSchemaType.KEYWORD,
+}
+
+
+def get_profile(name=None):
+    name = name or PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"Unknown storage profile {name}; choose from {', '.join(PROFILES)}")
+    return PROFILES[name]
+
+
+# === Collection settings ===
+def collection_config(vector_size, name=None):
+    """Keyword arguments for create_collection."""
+    profile = get_profile(name)
+    config = {
+        "vectors_config": models.VectorParams(
+            size=vector_size, distance=models.Distance.COSINE, on_disk=profile["vectors_on_disk"]
+        ),
+        "hnsw_config": models.HnswConfigDiff(
+            m=profile["m"], ef_construct=profile["ef_construct"], on_disk=profile["hnsw_on_disk"]
+        ),
+    }
+    if profile["quantization"] == "int8":
+        config["quantization_config"] = models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, quantile=0.99, always_ram=True)
+        )
+    elif profile["quantization"] == "binary":
+        config["quantization_config"] = models.BinaryQuantization(
+            binary=models.BinaryQuantizationConfig(always_ram=True)
+        )
+    return config
+
+
+def profile_of(info):
+    """Best matching profile name for an existing collection (from get_collection)."""
+    params = info.config
+    quantization = params.quantization_config
+    if isinstance(quantization, models.BinaryQuantization):
+        return "binary"
+    if isinstance(quantization, models.ScalarQuantization):
+        return "lowmem" if params.hnsw_config.on_disk else "scalar"
+    return "float32"
+
+
+def search_params(name=None):
+    """SearchParams matching a profile: rescore quantized hits against the originals."""
+    profile = get_profile(name)
+    quantization = None
+    if profile["quantization"]:
+        quantization = models.QuantizationSearchParams(rescore=True, oversampling=profile["oversampling"])
+    return models.SearchParams(hnsw_ef=profile["hnsw_ef"], quantization=quantization)
+
+
+def estimated_ram(name, vectors, dim):
+    """Approximate resident bytes: in-RAM vector copies plus the HNSW graph's level-0 links."""
+    profile = get_profile(name)
+    if profile["quantization"] == "int8":
+        vector_bytes = dim
+    elif profile["quantization"] == "binary":
+        vector_bytes = dim / 8
+    else:
+        vector_bytes = dim * 4
+    if profile["quantization"] and not profile["vectors_on_disk"]:
+        vector_bytes += dim * 4
+    graph_bytes = 0 if profile["hnsw_on_disk"] else profile["m"] * 2 * 4
+    # Qdrant's sizing guide adds ~50% for segment overhead and optimizer headroom
+    return 1.5 * vectors * (vector_bytes + graph_bytes)
@@ -0,0 +1,142 @@
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+
+class ScaffoldError(Exception):
+    pass
+
+
+def plan_tree(structure, prefix=""):
+    """Flatten a nested {name: dict | str} structure into (dirs, files) with relative paths.
+
+    Names may contain slashes ("src/index.js"); paths that escape the root are rejected.
+    """
+    dirs, files = [], []
+
+    def walk(node, prefix):
+        for name, content in node.items():
+            path = os.path.normpath(os.path.join(prefix, str(name)))
+            if os.path.isabs(path) or path == ".." or path.startswith(".." + os.sep):
+                raise ScaffoldError(f"path escapes the project root: {name}")
+            parent = os.path.dirname(path)
+            while parent:
+                dirs.append(parent)
+                parent = os.path.dirname(parent)
+            if isinstance(content, dict):
+                dirs.append(path)
+                walk(content, path)
+            else:
+                files.append((path, "" if content is None else str(content)))
+
+    walk(structure, prefix)
+    dirs = sorted(set(dirs), key=lambda d: (d.count(os.sep), d))
+    seen = set(dirs)
+    for path, _ in files:
+        if path in seen:
+            raise ScaffoldError(f"{path} is listed twice or as both a file and a folder")
+        seen.add(path)
+    return dirs, files
+
+
+def _check_conflicts(base_path, dirs, files):
+    for path in dirs:
+        target = os.path.join(base_path, path)
+        if os.path.lexists(target) and not os.path.isdir(target):
+            raise ScaffoldError(f"{target} exists and is not a folder")
+    for path, _ in files:
+        if os.path.isdir(os.path.join(base_path, path)):
+            raise ScaffoldError(f"{os.path.join(base_path, path)} exists and is a folder")
+
+
+def _write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+    return len(data)
+
+
+def _commit(staged, target, backups, journal):
+    """Move the staged tree into place, merging into folders that already exist."""
+    for name in sorted(os.listdir(staged)):
+        src = os.path.join(staged, name)
+        dst = os.path.join(target, name)
+        if os.path.isdir(src) and os.path.isdir(dst) and not os.path.islink(dst):
+            _commit(src, dst, backups, journal)
+            continue
+        if os.path.lexists(dst):
+            backup = os.path.join(backups, str(len(journal)))
+            os.replace(dst, backup)
+            journal.append(("restore", dst, backup))
+        os.replace(src, dst)
+        journal.append(("created", dst, None))
+
+
+def _rollback(journal):
+    for action, path, backup in reversed(journal):
+        try:
+            if action == "created":
+                if os.path.isdir(path) and not os.path.islink(path):
+                    shutil.rmtree(path)
+                else:
+                    os.remove(path)
+            else:
+                os.replace(backup, path)
+        except OSError:
+            pass
+
+
+def materialize(structure, base_path=".", max_workers=MAX_WORKERS):
+    """Create a whole folder structure all-or-nothing and return a manifest of counts.
+
+    Files are written concurrently into a staging folder next to the targets and then
+    renamed into place. Any failure leaves `base_path` as it was.
+    """
+    start = time.perf_counter()
+    dirs, files = plan_tree(structure)
+    _check_conflicts(base_path, dirs, files)
+
+    os.makedirs(base_path, exist_ok=True)
+    # Same filesystem as the targets, so the final moves are plain renames
+    staging = tempfile.mkdtemp(prefix=".scaffold-", dir=base_path)
+    try:
+        tree = os.path.join(staging, "tree")
+        backups = os.path.join(staging, "backups")
+        os.makedirs(backups)
+        os.makedirs(tree)
+        for path in dirs:
+            os.makedirs(os.path.join(tree, path), exist_ok=True)
+
+        payloads = [(os.path.join(tree, path), content.encode("utf-8")) for path, content in files]
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            written = sum(pool.map(lambda item: _write(*item), payloads))
+
+        existing = sum(os.path.lexists(os.path.join(base_path, path)) for path, _ in files)
+        journal = []
+        try:
+            _commit(tree, base_path, backups, journal)
+        except BaseException:
+            _rollback(journal)
+            raise
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    return {
+        "root": base_path,
+        "dirs": len(dirs),
+        "files": len(files),
+        "bytes": written,
+        "overwritten": existing,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def format_manifest(manifest):
+    text = (f"Created {manifest['dirs']} folders and {manifest['files']} files "
+            f"({manifest['bytes']:,} bytes) under {manifest['root']} in {manifest['seconds']}s")
+    if manifest["overwritten"]:
+        text += f", {manifest['overwritten']} existing files replaced"
+    return text
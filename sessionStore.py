@@ -0,0 +1,164 @@
+import sqlite3
+import threading
+import time
+import uuid
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+class SessionStore:
+    """Persist chat sessions in a local SQLite database keyed by session id."""
+
+    def __init__(self, path="sessions.db"):
+        # Streamlit runs each session on its own thread: they share the connection, one at a time
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                id TEXT PRIMARY KEY,
+                summary TEXT NOT NULL DEFAULT '',
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS turns (
+                session_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                summarized INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (session_id, seq)
+            );
+        """)
+        self.conn.commit()
+
+    def new_session_id(self):
+        return uuid.uuid4().hex
+
+    def load(self, session_id, **session_kwargs):
+        """Load a session: its running summary plus the turns not folded into it yet."""
+        with self._lock:
+            row = self.conn.execute("SELECT summary FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            if row is None:
+                self.conn.execute(
+                    "INSERT INTO sessions (id, summary, updated_at) VALUES (?, '', ?)", (session_id, time.time())
+                )
+                self.conn.commit()
+                return ChatSession(self, session_id, **session_kwargs)
+
+            turns = self.conn.execute(
+                "SELECT seq, role, content FROM turns WHERE session_id = ? AND summarized = 0 ORDER BY seq",
+                (session_id,),
+            ).fetchall()
+            next_seq = self.conn.execute(
+                "SELECT COALESCE(MAX(seq) + 1, 0) FROM turns WHERE session_id = ?", (session_id,)
+            ).fetchone()[0]
+        return ChatSession(
+            self,
+            session_id,
+            summary=row[0],
+            turns=[{"seq": seq, "role": role, "content": content} for seq, role, content in turns],
+            next_seq=next_seq,
+            **session_kwargs,
+        )
+
+    def append_turn(self, session_id, seq, role, content):
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO turns (session_id, seq, role, content) VALUES (?, ?, ?, ?)",
+                (session_id, seq, role, content),
+            )
+            self.conn.execute("UPDATE sessions SET updated_at = ? WHERE id = ?", (time.time(), session_id))
+            self.conn.commit()
+
+    def fold_turns(self, session_id, summary, up_to_seq):
+        """Store the new summary and mark every turn up to `up_to_seq` as summarized."""
+        with self._lock:
+            self.conn.execute(
+                "UPDATE sessions SET summary = ?, updated_at = ? WHERE id = ?", (summary, time.time(), session_id)
+            )
+            self.conn.execute(
+                "UPDATE turns SET summarized = 1 WHERE session_id = ? AND seq <= ?", (session_id, up_to_seq)
+            )
+            self.conn.commit()
+
+
+class ChatSession:
+    """A conversation kept as a running summary plus a token-bounded window of recent turns.
+
+    Only the window lives in memory; older turns stay in the SQLite store.
+    When the window grows past `max_tokens`, the oldest turns are folded into the
+    summary (with `summarize` if given, else an extractive fallback) until the
+    window is back under `keep_tokens`.
+    """
+
+    def __init__(self, store, session_id, summary="", turns=None, next_seq=0,
+                 max_tokens=3000, keep_tokens=1500, summary_tokens=300, summarize=None, count_tokens=estimate_tokens):
+        self.store = store
+        self.session_id = session_id
+        self.summary = summary
+        self.turns = turns or []
+        self.next_seq = next_seq
+        self.max_tokens = max_tokens
+        self.keep_tokens = keep_tokens
+        self.summary_tokens = summary_tokens
+        self.summarize = summarize
+        self.count_tokens = count_tokens
+
+    def add_turn(self, role, content):
+        """Append a turn; returns False when it repeats the previous turn (e.g. a Streamlit rerun)."""
+        if self.turns and self.turns[-1]["role"] == role and self.turns[-1]["content"] == content:
+            return False
+        turn = {"seq": self.next_seq, "role": role, "content": content}
+        self.next_seq += 1
+        self.turns.append(turn)
+        self.store.append_turn(self.session_id, turn["seq"], role, content)
+        self.compact()
+        return True
+
+    def window_tokens(self):
+        return sum(self.count_tokens(turn["content"]) for turn in self.turns)
+
+    def compact(self):
+        """Fold the oldest turns into the running summary once the window is over budget."""
+        if self.window_tokens() <= self.max_tokens:
+            return
+
+        folded = []
+        while self.turns and (self.window_tokens() > self.keep_tokens or self.turns[0]["role"] != "user"):
+            folded.append(self.turns.pop(0))
+            if len(self.turns) <= 1:
+                break
+        if not folded:
+            return
+
+        summary = None
+        if self.summarize:
+            try:
+                summary = self.summarize(self.summary, folded)
+            except Exception:
+                summary = None
+        if not summary:
+            summary = self._extractive_summary(folded)
+        self.summary = self._clip(summary)
+        self.store.fold_turns(self.session_id, self.summary, folded[-1]["seq"])
+
+    def _extractive_summary(self, folded):
+        lines = [self.summary] if self.summary else []
+        for turn in folded:
+            lines.append(f"{turn['role']}: {turn['content'][:200]}")
+        return "\n".join(lines)
+
+    def _clip(self, summary):
+        # Keep the newest part of the summary when it runs over its own budget
+        max_chars = self.summary_tokens * 4
+        return summary if len(summary) <= max_chars else summary[-max_chars:]
+
+    def messages(self):
+        """OpenAI-style messages to send: the running summary, then the recent window."""
+        messages = []
+        if self.summary:
+            messages.append({"role": "user", "content": f"Summary of our conversation so far:\n{self.summary}"})
+        messages.extend({"role": turn["role"], "content": turn["content"]} for turn in self.turns)
+        return messages
@@ -0,0 +1,71 @@
+import threading
+import time
+
+
+def normalize_query(query):
+    """Key for "the same question": case, spacing and trailing punctuation don't matter."""
+    return " ".join(query.casefold().split()).rstrip(" ?!.")
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Run at most one call per key at a time; concurrent callers with the same key share its result.
+
+    Nothing is cached: once the leader's call finishes, the next caller starts a new one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.stats = {"requests": 0, "executions": 0, "coalesced": 0, "errors": 0, "max_waiters": 0, "seconds_saved": 0.0}
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            self.stats["requests"] += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.stats["executions"] += 1
+            else:
+                call.waiters += 1
+                self.stats["coalesced"] += 1
+                self.stats["max_waiters"] = max(self.stats["max_waiters"], call.waiters)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        start = time.perf_counter()
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self.stats["errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                # Every follower would otherwise have paid for its own call
+                self.stats["seconds_saved"] += call.waiters * (time.perf_counter() - start)
+            call.done.set()
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+    def summary(self):
+        s = self.stats
+        return (f"{s['requests']} requests, {s['executions']} executed, {s['coalesced']} coalesced "
+                f"(max {s['max_waiters']} waiting on one call, ~{s['seconds_saved']:.1f}s of upstream work saved)")
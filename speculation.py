@@ -0,0 +1,54 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Set SPECULATE=0 to only run tools when the model asks for them
+ENABLED = os.getenv("SPECULATE", "1") != "0"
+
+
+class Speculator:
+    """Start side-effect-free tool calls early on a guess of their input, and hand the result over if guessed right.
+
+    Keys are (tool, normalized input). Whatever the model never asks for is dropped with discard().
+    """
+
+    def __init__(self, max_workers=4, enabled=ENABLED):
+        self.enabled = enabled
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="speculate")
+        self._lock = threading.Lock()
+        self._pending = {}
+        self.stats = {"started": 0, "hits": 0, "misses": 0, "wasted": 0}
+
+    @staticmethod
+    def key(tool, tool_input):
+        return tool, " ".join(str(tool_input).casefold().split())
+
+    def start(self, tool, tool_input, fn):
+        if not self.enabled:
+            return
+        key = self.key(tool, tool_input)
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending[key] = self._pool.submit(fn, tool_input)
+            self.stats["started"] += 1
+
+    def take(self, tool, tool_input):
+        """The speculative future for this call, or None; each guess is used at most once."""
+        with self._lock:
+            future = self._pending.pop(self.key(tool, tool_input), None)
+            if self.enabled:
+                self.stats["hits" if future else "misses"] += 1
+            return future
+
+    def discard(self):
+        """Forget guesses the model didn't use (e.g. at the end of a turn)."""
+        with self._lock:
+            for future in self._pending.values():
+                future.cancel()
+            self.stats["wasted"] += len(self._pending)
+            self._pending.clear()
+
+    def summary(self):
+        s = self.stats
+        return f"{s['started']} started, {s['hits']} used, {s['misses']} calls not guessed, {s['wasted']} discarded"
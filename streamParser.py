@@ -0,0 +1,182 @@
+import json
+from collections import namedtuple
+
+# kind is one of "field", "delta", "object" or "error"
+StepEvent = namedtuple("StepEvent", ["kind", "key", "value"])
+
+
+class StepStreamParser:
+    """Incrementally parse streamed `{ "step": ..., "content": ... }` JSON objects.
+
+    Feed raw text chunks as they arrive from the model and get back events:
+    - field:  a top-level string field is complete, e.g. ("field", "step", "plan")
+    - delta:  new decoded characters of a streamed field, e.g. ("delta", "content", "Hel")
+    - object: a whole step object is complete and parsed
+    - error:  a completed object could not be parsed (value is the raw text)
+
+    Step objects can be sent one after another or inside a top-level array.
+    Deltas for `stream_keys` are held back until `lead_key` is known so the
+    caller can print a header (the step name) before the content.
+    """
+
+    def __init__(self, stream_keys=("content",), lead_key="step"):
+        self.stream_keys = set(stream_keys)
+        self.lead_key = lead_key
+        self._reset_object()
+        self.stack = []
+
+    def _reset_object(self):
+        self.in_object = False
+        self.raw = []
+        self.fields = {}
+        self.key = None
+        self.expect_key = False
+        self.in_string = False
+        self.string_is_key = False
+        self.buffer = []
+        self.escape = False
+        self.unicode_digits = None
+        self.high_surrogate = None
+        self.held = {}
+
+    def _at_step_level(self):
+        # Directly inside a step object: `{` or `[{`
+        return self.stack == ["{"] or self.stack == ["[", "{"]
+
+    def feed(self, chunk):
+        """Consume a text chunk and return the list of events it produced."""
+        events = []
+        deltas = {}
+
+        for ch in chunk:
+            if self.in_string:
+                self._raw_append(ch)
+                decoded = self._string_char(ch)
+                if decoded is None:
+                    # Closing quote
+                    self._close_string(events, deltas)
+                elif decoded and not self.string_is_key and self.key in self.stream_keys and self._at_step_level():
+                    deltas.setdefault(self.key, []).append(decoded)
+                continue
+
+            if ch == '"':
+                self._raw_append(ch)
+                self.in_string = True
+                self.string_is_key = self._at_step_level() and self.expect_key
+                self.buffer = []
+                continue
+
+            if ch in "{[":
+                if ch == "{" and self.stack in ([], ["["]):
+                    self._reset_object()
+                    self.in_object = True
+                    self.expect_key = True
+                self.stack.append(ch)
+                self._raw_append(ch)
+                continue
+
+            if ch in "}]":
+                if not self.stack:
+                    continue
+                self._raw_append(ch)
+                self.stack.pop()
+                if ch == "}" and self.stack in ([], ["["]):
+                    self._flush_deltas(events, deltas, force=True)
+                    self._close_object(events)
+                continue
+
+            if self._at_step_level():
+                if ch == ":":
+                    self.expect_key = False
+                elif ch == ",":
+                    self.expect_key = True
+                    self.key = None
+
+            self._raw_append(ch)
+
+        self._flush_deltas(events, deltas)
+        return events
+
+    def _raw_append(self, ch):
+        if self.in_object:
+            self.raw.append(ch)
+
+    def _string_char(self, ch):
+        """Decode one character of a JSON string; None means the string ended."""
+        if self.unicode_digits is not None:
+            self.unicode_digits.append(ch)
+            if len(self.unicode_digits) < 4:
+                return ""
+            code = int("".join(self.unicode_digits), 16)
+            self.unicode_digits = None
+            if 0xD800 <= code <= 0xDBFF:
+                self.high_surrogate = code
+                return ""
+            if 0xDC00 <= code <= 0xDFFF and self.high_surrogate is not None:
+                code = 0x10000 + ((self.high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+                self.high_surrogate = None
+            return self._keep(chr(code))
+
+        if self.escape:
+            self.escape = False
+            if ch == "u":
+                self.unicode_digits = []
+                return ""
+            return self._keep({"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f"}.get(ch, ch))
+
+        if ch == "\\":
+            self.escape = True
+            return ""
+        if ch == '"':
+            return None
+        return self._keep(ch)
+
+    def _keep(self, text):
+        self.buffer.append(text)
+        return text
+
+    def _close_string(self, events, deltas):
+        self.in_string = False
+        value = "".join(self.buffer)
+        self.buffer = []
+        if not self._at_step_level():
+            return
+        if self.string_is_key:
+            self.key = value
+            return
+        self.fields[self.key] = value
+        if self.key == self.lead_key:
+            # Report the lead field first, then release anything held back for it
+            events.append(StepEvent("field", self.key, value))
+            self._flush_deltas(events, deltas, force=True)
+        else:
+            self._flush_deltas(events, deltas)
+            events.append(StepEvent("field", self.key, value))
+
+    def _flush_deltas(self, events, deltas, force=False):
+        ready = force or self.lead_key is None or self.lead_key in self.fields
+        for key, parts in deltas.items():
+            self.held.setdefault(key, []).extend(parts)
+        deltas.clear()
+        if not ready:
+            return
+        for key, parts in self.held.items():
+            if parts:
+                events.append(StepEvent("delta", key, "".join(parts)))
+        self.held = {}
+
+    def _close_object(self, events):
+        raw = "".join(self.raw)
+        try:
+            events.append(StepEvent("object", None, json.loads(raw)))
+        except json.JSONDecodeError:
+            events.append(StepEvent("error", None, raw))
+        self._reset_object()
+
+
+def iter_step_events(chunks, **parser_kwargs):
+    """Yield StepEvents from an iterable of streamed text chunks."""
+    parser = StepStreamParser(**parser_kwargs)
+    for chunk in chunks:
+        if chunk:
+            yield from parser.feed(chunk)
@@ -0,0 +1,332 @@
+"""Local, content-addressed project templates for initialize_project.
+
+Each template is generated once (e.g. with create-react-app), snapshotted into a
+shared object store keyed by SHA-256, and instantiated from there with no network:
+template files are cloned (copy-on-write where the filesystem supports it) with the
+project name substituted, and dependency files are hardlinked from the (read-only) store.
+
+Usage:
+    python templateStore.py list
+    python templateStore.py warm react vite-react   # generate once, while online
+    python templateStore.py snapshot my-template path/to/project --name-placeholder my-project
+    python templateStore.py remove react
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import secrets
+import shutil
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+STORE_DIR = os.getenv("TEMPLATE_STORE", os.path.join(os.path.expanduser("~"), ".cache", "genai", "templates"))
+# Project name used when generating a template; replaced by {{project_name}} in the snapshot
+PLACEHOLDER = "genaitemplateapp"
+DEPENDENCY_DIRS = ("node_modules",)
+EXCLUDED_DIRS = (".git", "__pycache__")
+# Secrets a generator writes into the project (Django's SECRET_KEY) are stored as {{secret_key}}
+# and regenerated for every project, so no two projects share one
+SECRET_ASSIGNMENT = re.compile(rb"""(\bSECRET_KEY\s*=\s*)(['"])(.+?)\2""")
+SECRET_CHARS = "abcdefghijklmnopqrstuvwxyz0123456789!@#$%^&*(-_=+)"
+# Manifests written by an older snapshot format are regenerated on next use
+MANIFEST_VERSION = 2
+MAX_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+GENERATORS = {
+    "react": "npx --yes create-react-app {name}",
+    "next": "npx --yes create-next-app {name} --use-npm --yes",
+    "vue": "npm init --yes vue@latest {name} -- --default",
+    "express": "npx --yes express-generator {name}",
+    "django": "django-admin startproject {name}",
+    "vite-react": "npm create --yes vite@latest {name} -- --template react",
+    "vite-vue": "npm create --yes vite@latest {name} -- --template vue",
+    "vite-svelte": "npm create --yes vite@latest {name} -- --template svelte",
+}
+
+# Templates that need no generator at all
+BUILTIN_TEMPLATES = {
+    "flask": {
+        "app.py": (
+            "from flask import Flask\n\napp = Flask(__name__)\n\n\n@app.route('/')\ndef home():\n"
+            "    return 'Hello, World!'\n\n\nif __name__ == '__main__':\n    app.run(debug=True)\n"
+        ),
+    },
+}
+
+
+class TemplateError(Exception):
+    pass
+
+
+# === Object store ===
+def _object_path(key):
+    return os.path.join(STORE_DIR, "objects", key[:2], key)
+
+
+def _manifest_path(name):
+    return os.path.join(STORE_DIR, "templates", f"{name}.json")
+
+
+def _put(data, executable=False):
+    """Store bytes once by content hash and return the key."""
+    key = hashlib.sha256(data).hexdigest() + ("-x" if executable else "")
+    path = _object_path(key)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        # Read-only: dependency files are hardlinked into projects and must not be edited through them
+        os.chmod(tmp_path, 0o555 if executable else 0o444)
+        os.replace(tmp_path, path)
+    return key
+
+
+def _clone(src, dst):
+    """Copy-on-write clone where supported (btrfs, XFS, APFS), else a plain copy."""
+    try:
+        import fcntl
+
+        with open(src, "rb") as s, open(dst, "wb") as d:
+            fcntl.ioctl(d.fileno(), 0x40049409, s.fileno())  # FICLONE
+    except (ImportError, OSError):
+        shutil.copyfile(src, dst)
+    # Store objects are read-only; the project's copy is the user's to edit
+    os.chmod(dst, os.stat(src).st_mode & 0o777 | 0o200)
+
+
+def _link(src, dst):
+    mode = os.stat(src).st_mode
+    if mode & 0o222:
+        # Objects stored before they were made read-only
+        os.chmod(src, mode & ~0o222 & 0o777)
+    try:
+        os.link(src, dst)
+    except OSError:
+        _clone(src, dst)
+
+
+# === Snapshots ===
+def snapshot(name, source_dir, placeholder=PLACEHOLDER, source=None):
+    """Store a generated project as template `name`; returns its manifest."""
+    manifest = {"name": name, "version": MANIFEST_VERSION, "created": time.time(), "source": source,
+                "dirs": [], "files": [], "deps": [], "symlinks": []}
+    token = placeholder.encode("utf-8")
+
+    def relative(path):
+        return os.path.relpath(path, source_dir).replace(os.sep, "/").replace(placeholder, "{{project_name}}")
+
+    jobs = []
+    for root, dirs, files in os.walk(source_dir):
+        dirs[:] = [d for d in dirs if d not in EXCLUDED_DIRS]
+        is_dependency = any(part in DEPENDENCY_DIRS for part in os.path.relpath(root, source_dir).split(os.sep))
+        for d in list(dirs):
+            path = os.path.join(root, d)
+            if os.path.islink(path):
+                manifest["symlinks"].append([relative(path), os.readlink(path)])
+                dirs.remove(d)
+            else:
+                manifest["dirs"].append(relative(path))
+        for f in files:
+            path = os.path.join(root, f)
+            if os.path.islink(path):
+                manifest["symlinks"].append([relative(path), os.readlink(path)])
+            else:
+                jobs.append((path, is_dependency))
+
+    def store(job):
+        path, is_dependency = job
+        with open(path, "rb") as f:
+            data = f.read()
+        executable = bool(os.stat(path).st_mode & 0o111)
+        render = False
+        if not is_dependency and _is_text(data):
+            data, secrets_found = SECRET_ASSIGNMENT.subn(rb"\1\2{{secret_key}}\2", data)
+            render = bool(secrets_found) or token in data
+            data = data.replace(token, b"{{project_name}}")
+        return relative(path), _put(data, executable), render, is_dependency
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        for path, key, render, is_dependency in pool.map(store, jobs):
+            if is_dependency:
+                manifest["deps"].append([path, key])
+            else:
+                manifest["files"].append([path, key, render])
+
+    os.makedirs(os.path.dirname(_manifest_path(name)), exist_ok=True)
+    tmp_path = _manifest_path(name) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, _manifest_path(name))
+    return manifest
+
+
+def snapshot_structure(name, structure):
+    """Snapshot a template given as {relative path: text}."""
+    with tempfile.TemporaryDirectory() as tmp:
+        for path, content in structure.items():
+            target = os.path.join(tmp, path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "w", encoding="utf-8") as f:
+                f.write(content)
+        return snapshot(name, tmp, source="builtin")
+
+
+def generate(name):
+    """Run the template's generator once (needs the network) and snapshot the result."""
+    if name in BUILTIN_TEMPLATES:
+        return snapshot_structure(name, BUILTIN_TEMPLATES[name])
+    if name not in GENERATORS:
+        raise TemplateError(f"Unsupported project type: {name}. Available types: {', '.join(available())}")
+    command = GENERATORS[name].format(name=PLACEHOLDER)
+    with tempfile.TemporaryDirectory() as tmp:
+        result = subprocess.run(command, shell=True, cwd=tmp, capture_output=True, text=True)
+        project = os.path.join(tmp, PLACEHOLDER)
+        if result.returncode != 0 or not os.path.isdir(project):
+            raise TemplateError(f"`{command}` failed: {(result.stderr or result.stdout).strip()[-500:]}")
+        return snapshot(name, project, source=command)
+
+
+def load_manifest(name):
+    try:
+        with open(_manifest_path(name), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    return manifest if manifest.get("version") == MANIFEST_VERSION else None
+
+
+def available():
+    return sorted(set(GENERATORS) | set(BUILTIN_TEMPLATES))
+
+
+def cached():
+    folder = os.path.join(STORE_DIR, "templates")
+    return sorted(f[:-5] for f in os.listdir(folder) if f.endswith(".json")) if os.path.isdir(folder) else []
+
+
+# === Instantiation ===
+def _is_text(data):
+    try:
+        data.decode("utf-8")
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def secret_key():
+    """A fresh key in the format of Django's get_random_secret_key()."""
+    return "django-insecure-" + "".join(secrets.choice(SECRET_CHARS) for _ in range(50))
+
+
+def _render(text, variables):
+    for key, value in variables.items():
+        text = text.replace("{{" + key + "}}", value)
+    return text
+
+
+def instantiate(name, project_name, base_path=".", variables=None):
+    """Create `project_name` from template `name`; generates the template on first use."""
+    start = time.perf_counter()
+    target = os.path.join(base_path, project_name)
+    if os.path.exists(target) and os.listdir(target):
+        raise TemplateError(f"{target} already exists and is not empty")
+
+    manifest = load_manifest(name)
+    generated = manifest is None
+    if generated:
+        manifest = generate(name)
+
+    variables = {"project_name": project_name, "secret_key": secret_key(), **(variables or {})}
+    os.makedirs(base_path, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".template-", dir=base_path)
+    try:
+        for path in manifest["dirs"]:
+            os.makedirs(os.path.join(staging, _render(path, variables)), exist_ok=True)
+
+        def place_file(entry):
+            path, key, render = entry
+            dst = os.path.join(staging, _render(path, variables))
+            if render:
+                with open(_object_path(key), "rb") as f:
+                    data = f.read()
+                # Binary files (favicons, fonts) are never rendered, only copied
+                render = b"{{" in data and _is_text(data)
+            if not render:
+                _clone(_object_path(key), dst)
+                return
+            with open(dst, "w", encoding="utf-8", newline="") as f:
+                f.write(_render(data.decode("utf-8"), variables))
+            os.chmod(dst, os.stat(_object_path(key)).st_mode & 0o777 | 0o200)
+
+        def place_dependency(entry):
+            path, key = entry
+            _link(_object_path(key), os.path.join(staging, _render(path, variables)))
+
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            list(pool.map(place_file, manifest["files"]))
+            list(pool.map(place_dependency, manifest["deps"]))
+        for path, link_target in manifest["symlinks"]:
+            os.symlink(link_target, os.path.join(staging, _render(path, variables)))
+
+        if os.path.isdir(target):
+            os.rmdir(target)  # empty, checked above
+        os.replace(staging, target)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    return {
+        "template": name,
+        "path": target,
+        "files": len(manifest["files"]),
+        "dependency_files": len(manifest["deps"]),
+        "generated": generated,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def format_result(result):
+    text = (f"Created {result['template']} project at {result['path']} "
+            f"({result['files']} files, {result['dependency_files']} dependency files linked) in {result['seconds']}s")
+    if result["generated"]:
+        text += "; template generated and cached, next time works offline"
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the local project template store.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="show available and cached templates")
+    snap = commands.add_parser("snapshot", help="store a project folder as a template")
+    snap.add_argument("name")
+    snap.add_argument("path")
+    snap.add_argument("--name-placeholder", default=PLACEHOLDER, help="project name to replace with {{project_name}}")
+    warm = commands.add_parser("warm", help="generate and cache templates now")
+    warm.add_argument("names", nargs="*", help="default: all")
+    remove = commands.add_parser("remove", help="forget a cached template (objects are kept)")
+    remove.add_argument("name")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        cached_names = set(cached())
+        for name in sorted(set(available()) | cached_names):
+            print(f"{'✅' if name in cached_names else '  '} {name}")
+    elif args.command == "snapshot":
+        manifest = snapshot(args.name, args.path, args.name_placeholder, source=os.path.abspath(args.path))
+        print(f"📦 {args.name}: {len(manifest['files'])} files, {len(manifest['deps'])} dependency files")
+    elif args.command == "warm":
+        for name in args.names or available():
+            manifest = generate(name)
+            print(f"📦 {name}: {len(manifest['files'])} files, {len(manifest['deps'])} dependency files")
+    elif args.command == "remove":
+        if os.path.exists(_manifest_path(args.name)):
+            os.remove(_manifest_path(args.name))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+pytest.importorskip("websockets")
+pytest.importorskip("google.genai")
+# No network or API key: the agents' models answer from the stub transport
+os.environ.setdefault("LLM_TRANSPORT", "stub")
+
+from agentServer import AgentServer, Session
+
+
+@pytest.fixture
+def server():
+    server = AgentServer(token="test")
+    yield server
+    server.tool_pool.shutdown(wait=True)
+    server.model_pool.shutdown(wait=True)
+
+
+def sessions(server, count):
+    agent = server.agent("coding")
+    return [Session(f"s{i}", "coding", agent) for i in range(count)]
+
+
+def test_sessions_keep_their_own_deferred_installs(server, tmp_path):
+    first, second = sessions(server, 2)
+    request = json.dumps({"packages": "left-pad", "manager": "npm", "directory": str(tmp_path), "defer": True})
+
+    async def both():
+        return await asyncio.gather(
+            server.run_tool(first, "install_dependencies", request),
+            server.run_tool(second, "run_command", "echo hello"),
+        )
+
+    queued, ran = asyncio.run(both())
+
+    assert "Queued" in queued
+    # The other session's command neither ran nor dropped the first session's queued install
+    assert ran == "hello"
+    assert first.tool_state.pending and not second.tool_state.pending
+
+
+def test_tools_in_other_directories_do_not_move_the_process(server, tmp_path):
+    project, other = sessions(server, 2)
+    cwd = os.getcwd()
+
+    async def both():
+        server_started = server.run_tool(
+            project, "run_dev_server", json.dumps({"command": "pwd > started.txt", "directory": str(tmp_path)}))
+
+        async def commands():
+            return [await server.run_tool(other, "run_command", "pwd") for _ in range(20)]
+
+        return await asyncio.gather(server_started, commands())
+
+    started, outputs = asyncio.run(both())
+
+    assert "Development server started" in started
+    assert set(outputs) == {cwd}
+    assert os.getcwd() == cwd
+    assert (tmp_path / "started.txt").read_text().strip() == str(tmp_path)
@@ -0,0 +1,121 @@
+import pytest
+
+pytest.importorskip("bs4")
+pytest.importorskip("langchain_core")
+
+from docChunker import Block, BoilerplateFilter, Page, _pack, chunk_page, chunk_pages, parse_page, render, sections
+
+PAGE = """<html lang="en"><head><title>Models</title><script>var x = 1;</script></head><body>
+<nav>Home Docs Blog</nav>
+<main>
+  <h1>Models</h1>
+  <p>Django models map <code>classes</code> to tables.</p>
+  <h2>Fields</h2>
+  <ul><li>CharField</li><li>IntegerField</li></ul>
+  <pre>class Post(models.Model):
+    title = models.CharField(max_length=200)</pre>
+  <table><tr><th>Field</th><th>Type</th></tr><tr><td>title</td><td>varchar</td></tr></table>
+  <h2>Relations</h2>
+  <p>ForeignKey links two models.</p>
+</main>
+<footer>Copyright</footer>
+</body></html>"""
+
+FOOTER = "Made with love by the docs team, edit this page on GitHub"
+
+
+def text(value):
+    return Block("text", value, 0)
+
+
+def test_parse_page_keeps_structure_and_drops_chrome():
+    page = parse_page(PAGE)
+
+    assert (page.title, page.language) == ("Models", "en")
+    assert [b.kind for b in page.blocks] == ["heading", "text", "heading", "text", "text", "code", "table",
+                                             "heading", "text"]
+    assert page.blocks[1].text == "Django models map classes to tables."
+    assert page.blocks[5].text.startswith("class Post(models.Model):\n    title")
+    assert page.blocks[6].text == "Field | Type\ntitle | varchar"
+    assert not any(word in b.text for b in page.blocks for word in ("Home Docs", "Copyright", "var x"))
+
+
+def test_sections_follow_the_heading_path():
+    paths = [path for path, _ in sections(parse_page(PAGE).blocks)]
+
+    assert paths == [("Models",), ("Models", "Fields"), ("Models", "Relations")]
+
+
+def test_boilerplate_text_repeated_across_pages_is_dropped():
+    pages = [[text(f"Page {i} has its own unique content about topic number {i}"), text(FOOTER)] for i in range(4)]
+    boilerplate = BoilerplateFilter(pages)
+
+    assert boilerplate.clean(pages[0]) == pages[0][:1]
+
+
+def test_boilerplate_filter_never_drops_headings_code_or_tables():
+    shared = [Block("heading", "Introduction to the chapter", 1), Block("code", "pip install django", 0),
+              Block("table", "Command | Effect\nrunserver | starts the dev server", 0)]
+    pages = [shared + [text(FOOTER)] for _ in range(4)]
+    boilerplate = BoilerplateFilter(pages)
+
+    assert boilerplate.clean(pages[0]) == shared
+
+
+def test_no_boilerplate_is_learned_from_too_few_pages():
+    pages = [[text(FOOTER)], [text(FOOTER)]]
+
+    assert BoilerplateFilter(pages).clean(pages[0]) == pages[0]
+
+
+def test_pack_with_a_header_never_emits_it_alone():
+    pieces = _pack(["a" * 50, "b" * 5, "c" * 50], 20, repeat="header")
+
+    assert pieces == [["header", "a" * 50], ["header", "b" * 5], ["header", "c" * 50]]
+
+
+def test_pack_overlaps_a_short_last_unit():
+    pieces = _pack(["First sentence here.", "Ok.", "A third sentence follows."], 30, overlap_last=True)
+
+    assert pieces == [["First sentence here.", "Ok."], ["Ok.", "A third sentence follows."]]
+
+
+def test_large_table_pieces_repeat_the_header():
+    rows = "\n".join(f"row {i} | value {i}" for i in range(40))
+    pieces = render(Block("table", "Name | Value\n" + rows, 0), 120)
+
+    assert len(pieces) > 1
+    assert all(piece.startswith("Name | Value\nrow") and len(piece) <= 120 for piece in pieces)
+
+
+def test_large_code_block_stays_fenced():
+    code = "\n".join(f"print({i})" for i in range(100))
+    pieces = render(Block("code", code, 0), 200)
+
+    assert len(pieces) > 1
+    assert all(piece.startswith("```\n") and piece.endswith("\n```") for piece in pieces)
+    assert "\n".join(piece[4:-4] for piece in pieces) == code
+
+
+def test_chunks_start_with_their_breadcrumb():
+    documents = chunk_page("https://docs.example/models", parse_page(PAGE), size=200)
+
+    assert len(documents) > 1
+    for document in documents:
+        assert document.page_content.startswith("Models > Models")
+        assert document.metadata["source"] == "https://docs.example/models"
+        assert len(document.page_content) <= 200
+    assert documents[-1].metadata["section"] == "Models > Relations"
+
+
+def test_chunk_pages_reports_dropped_boilerplate():
+    pages = {f"https://docs.example/{i}": Page(f"Page {i}", "en", [Block("heading", f"Topic {i}", 1),
+                                                                    text(f"Unique words for page number {i} only"),
+                                                                    text(FOOTER)])
+             for i in range(4)}
+
+    documents, stats = chunk_pages(pages)
+
+    assert (stats["pages"], stats["blocks"], stats["dropped_blocks"]) == (4, 12, 4)
+    assert stats["chunks"] == len(documents) == 4
+    assert not any(FOOTER in d.page_content for d in documents)
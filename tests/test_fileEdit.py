@@ -0,0 +1,122 @@
+import pytest
+
+from fileEdit import apply_patch, parse_unified_diff
+
+MULTI_FILE_DIFF = """\
+diff --git a/one.py b/one.py
+index 83db48f..bf269f4 100644
+--- a/one.py
++++ b/one.py
+@@ -1,3 +1,3 @@
+ def one():
+-    return 1
++    return 10
+ 
+diff --git a/two.py b/two.py
+--- a/two.py
++++ b/two.py
+@@ -1,2 +1,2 @@
+-x = 2
++x = 20
+ y = 3
+"""
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_parse_multi_file_diff():
+    files = parse_unified_diff(MULTI_FILE_DIFF)
+
+    assert [target for target, _ in files] == ["one.py", "two.py"]
+    assert [len(hunks) for _, hunks in files] == [1, 1]
+    assert files[1][1][0].old == ["x = 2", "y = 3"]
+
+
+def test_header_lookalikes_inside_a_hunk_are_content():
+    diff = "--- a/notes.md\n+++ b/notes.md\n@@ -1,2 +1,2 @@\n--- old rule\n+++ new rule\n keep\n"
+
+    (target, hunks), = parse_unified_diff(diff)
+    assert target == "notes.md"
+    assert hunks[0].old == ["-- old rule", "keep"]
+    assert hunks[0].new == ["++ new rule", "keep"]
+
+
+def test_multi_file_diff_is_applied_to_every_file(workdir):
+    (workdir / "one.py").write_text("def one():\n    return 1\n\n")
+    (workdir / "two.py").write_text("x = 2\ny = 3\n")
+
+    result = apply_patch("", MULTI_FILE_DIFF)
+
+    assert "[ERROR]" not in result
+    assert (workdir / "one.py").read_text() == "def one():\n    return 10\n\n"
+    assert (workdir / "two.py").read_text() == "x = 20\ny = 3\n"
+
+
+def test_failing_file_leaves_every_file_untouched(workdir):
+    (workdir / "one.py").write_text("def one():\n    return 1\n\n")
+    (workdir / "two.py").write_text("something else entirely\n")
+
+    assert apply_patch("", MULTI_FILE_DIFF).startswith("[ERROR]")
+    assert (workdir / "one.py").read_text() == "def one():\n    return 1\n\n"
+
+
+def test_deleted_lines_leave_no_blank_line(workdir):
+    path = workdir / "code.py"
+    path.write_text("import os\nimport sys\n\nprint(sys.argv)\n")
+
+    apply_patch(str(path), "<<<<<<< SEARCH\nimport os\n=======\n>>>>>>> REPLACE")
+
+    assert path.read_text() == "import sys\n\nprint(sys.argv)\n"
+
+
+def test_diff_deleting_lines(workdir):
+    path = workdir / "code.py"
+    path.write_text("a\nb\nc\n")
+
+    apply_patch(str(path), "@@ -1,3 +1,2 @@\n a\n-b\n c\n")
+
+    assert path.read_text() == "a\nc\n"
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("@@ -2,0 +3 @@", "a\nb\nX\nc\n"),
+    ("@@ -0,0 +1 @@", "X\na\nb\nc\n"),
+    ("@@ -3,0 +4 @@", "a\nb\nc\nX\n"),
+])
+def test_zero_context_insertion(workdir, header, expected):
+    path = workdir / "f.txt"
+    path.write_text("a\nb\nc\n")
+
+    apply_patch(str(path), f"{header}\n+X\n")
+
+    assert path.read_text() == expected
+
+
+def test_new_file_from_additions_only(workdir):
+    result = apply_patch("", "--- /dev/null\n+++ b/new.txt\n@@ -0,0 +1,2 @@\n+hello\n+world\n")
+
+    assert "[ERROR]" not in result
+    assert (workdir / "new.txt").read_text() == "hello\nworld\n"
+
+
+def test_indentation_drift_is_anchored_and_reindented(workdir):
+    path = workdir / "code.py"
+    path.write_text("class A:\n    def f(self):\n        return 1\n")
+
+    result = apply_patch(str(path), "<<<<<<< SEARCH\ndef f(self):\n    return 1\n=======\ndef f(self):\n    return 2\n>>>>>>> REPLACE")
+
+    assert "(strip)" in result
+    assert path.read_text() == "class A:\n    def f(self):\n        return 2\n"
+
+
+def test_crlf_files_keep_their_line_endings(workdir):
+    path = workdir / "win.txt"
+    path.write_bytes(b"one\r\ntwo\r\n")
+
+    apply_patch(str(path), "<<<<<<< SEARCH\ntwo\n=======\nthree\n>>>>>>> REPLACE")
+
+    assert path.read_bytes() == b"one\r\nthree\r\n"
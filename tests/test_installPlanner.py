@@ -0,0 +1,97 @@
+import json
+import shlex
+
+import pytest
+
+from installPlanner import InstallPlanner, parse_packages, satisfies, split_flags
+
+
+@pytest.mark.parametrize("version, spec, expected", [
+    ("18.2.0", "^18", True),
+    ("18.2.0", "^18.3.0", False),
+    ("19.0.0", "^18.2.0", False),
+    ("0.2.5", "^0.2.3", True),
+    ("0.3.0", "^0.2.3", False),
+    ("4.17.21", "~4.17.0", True),
+    ("4.18.0", "~4.17.0", False),
+    ("5.0.0", ">=4.1", True),
+    ("4.0.9", ">=4.1", False),
+    ("1.2.3", "1.2", True),
+    ("1.2.3", "=1.2.4", False),
+    ("1.2.3", "v1.2.3", True),
+    ("1.0.0", "", True),
+    ("1.0.0", "latest", True),
+    ("1.0.0", "1.x || 2.x", False),  # unknown syntax is never trusted
+    (None, "", False),
+])
+def test_node_specs(version, spec, expected):
+    assert satisfies(version, spec, "node") is expected
+
+
+@pytest.mark.parametrize("version, spec, expected", [
+    ("3.0.3", ">=3", True),
+    ("2.3.0", ">=3", False),
+    ("2.32.3", "==2.32.3", True),
+    ("2.32.3", "~=2.31", True),
+    ("1.26.0", ">=1.24,<2", True),
+    ("4.0.0rc1", ">=3", True),
+    ("1.0", "", True),
+    ("1.0", "not a spec", False),
+])
+def test_python_specs(version, spec, expected):
+    pytest.importorskip("packaging")
+    assert satisfies(version, spec, "python") is expected
+
+
+def test_parse_node_packages():
+    requirements = parse_packages("react@^18 @types/node@20 lodash react@^19", "npm")
+
+    assert [(r.name, r.spec) for r in requirements] == [("@types/node", "20"), ("lodash", ""), ("react", "^19")]
+
+
+def test_parse_python_packages_normalizes_names():
+    requirements = parse_packages("Flask>=3 'uvicorn[standard]==0.30' Typing_Extensions", "pip")
+
+    assert [(r.name, r.spec) for r in requirements] == [
+        ("flask", ">=3"), ("uvicorn", "==0.30"), ("typing-extensions", "")]
+    assert requirements[1].raw == "uvicorn[standard]==0.30"
+
+
+def test_flags_and_their_values_are_kept():
+    assert split_flags("-D --registry https://r.example typescript") == (
+        ["typescript"], ("-D", "--registry", "https://r.example"))
+    assert {r.flags for r in parse_packages("--pre -i https://pypi.example flask", "pip")} == {
+        ("--pre", "-i", "https://pypi.example")}
+
+
+def test_command_keeps_flags_and_quotes_paths():
+    planner = InstallPlanner(cache_dir="/tmp/my cache")
+
+    command, _ = planner.command("npm", parse_packages("-D typescript@^5", "npm"))
+
+    assert shlex.split(command) == ["npm", "install", "--cache", "/tmp/my cache/npm", "--prefer-offline",
+                                    "--no-audit", "--no-fund", "-D", "typescript@^5"]
+
+
+def test_satisfied_packages_are_skipped(tmp_path):
+    package = tmp_path / "node_modules" / "lodash"
+    package.mkdir(parents=True)
+    (package / "package.json").write_text(json.dumps({"name": "lodash", "version": "4.17.21"}))
+    planner = InstallPlanner(cache_dir=str(tmp_path / "cache"))
+
+    result = planner.add("lodash@^4.17 left-pad", "npm", str(tmp_path), defer=True)
+
+    assert "Already installed: lodash@4.17.21" in result
+    (queue,) = planner.pending.values()
+    assert list(queue) == ["left-pad"]
+
+
+def test_reinstall_flags_do_not_skip(tmp_path):
+    package = tmp_path / "node_modules" / "lodash"
+    package.mkdir(parents=True)
+    (package / "package.json").write_text(json.dumps({"version": "4.17.21"}))
+    planner = InstallPlanner(cache_dir=str(tmp_path / "cache"))
+
+    planner.add("--force lodash", "npm", str(tmp_path), defer=True)
+
+    assert planner.stats["skipped"] == 0
@@ -0,0 +1,100 @@
+import json
+
+import pytest
+
+import modelRouter
+from modelRouter import CAP_STEP, ModelRouter, Route
+
+
+@pytest.fixture(autouse=True)
+def enabled(monkeypatch):
+    monkeypatch.setattr(modelRouter, "ENABLED", True)
+
+
+@pytest.fixture
+def router(tmp_path):
+    return ModelRouter("agent", max_output_tokens=1000, strong_steps={"output"}, min_output_tokens=64,
+                       strong_model="strong", cheap_model="cheap", path=str(tmp_path / "router.json"))
+
+
+def learn(router, previous, step, output_tokens, times=1):
+    for _ in range(times):
+        router.record(router.route(previous), step, 100, output_tokens, 0.1)
+
+
+def test_unknown_transitions_go_to_the_strong_model(router):
+    learn(router, "user", "plan", 50, times=modelRouter.MIN_OBSERVATIONS - 1)
+
+    assert router.route("user") == Route("strong", 1000, "user", None, False)
+
+
+def test_cheap_transitions_go_to_the_cheap_model_with_a_learned_cap(router):
+    learn(router, "user", "plan", 50, times=10)
+    learn(router, "user", "plan", 200)
+
+    route = router.route("user")
+
+    assert (route.model, route.predicted) == ("cheap", "plan")
+    # p95 of the samples (200) with headroom, rounded up to CAP_STEP
+    assert route.max_output_tokens == 320 and route.max_output_tokens % CAP_STEP == 0
+
+
+def test_risky_transitions_stay_on_the_strong_model(router):
+    learn(router, "observe", "plan", 50, times=7)
+    learn(router, "observe", "output", 50, times=3)
+
+    route = router.route("observe")
+
+    assert route.model == "strong"
+    assert route.predicted == "plan"
+
+
+def test_cap_is_clamped_to_the_agent_limits(router):
+    learn(router, "a", "tiny", 1, times=5)
+    learn(router, "b", "huge", 5000, times=5)
+
+    assert router.cap("tiny") == 64
+    assert router.cap("huge") == 1000
+
+
+def test_failure_retries_on_the_strong_model_and_raises_the_cap(router):
+    learn(router, "user", "plan", 50, times=5)
+    cheap = router.route("user")
+
+    router.failed(cheap)
+    retry = router.route("user")
+
+    assert retry.model == "strong" and retry.escalated
+    assert router.state["outputs"]["plan"][-1] == cheap.max_output_tokens * 2
+    assert router.route("user").model == "cheap"
+
+
+def test_state_round_trips_through_the_stats_file(router, tmp_path):
+    learn(router, "user", "plan", 50, times=5)
+    router.save()
+    other = ModelRouter("other", max_output_tokens=10, path=router.path)
+    other.record(other.route("user"), "output", 1, 1, 0.1)
+    other.save()
+
+    reloaded = ModelRouter("agent", max_output_tokens=1000, strong_steps={"output"}, min_output_tokens=64,
+                           strong_model="strong", cheap_model="cheap", path=router.path)
+
+    assert reloaded.state == json.loads(json.dumps(router.state))
+    assert reloaded.route("user") == router.route("user")
+    assert set(json.loads((tmp_path / "router.json").read_text())) == {"agent", "other"}
+
+
+def test_corrupt_stats_file_starts_fresh(tmp_path):
+    path = tmp_path / "router.json"
+    path.write_text("{not json")
+
+    router = ModelRouter("agent", max_output_tokens=100, path=str(path))
+
+    assert router.state == {"transitions": {}, "outputs": {}, "latency": {}}
+
+
+def test_disabled_router_only_uses_the_strong_model(router, monkeypatch):
+    learn(router, "user", "plan", 50, times=5)
+    monkeypatch.setattr(modelRouter, "ENABLED", False)
+
+    assert router.route("user").model == "strong"
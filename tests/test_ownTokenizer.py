@@ -0,0 +1,84 @@
+import pytest
+
+import ownTokenizer
+from ownTokenizer import EnglishCharTokenizer
+
+TEXTS = ["Humpty Dumpty sat on a wall", "  spaced\tout\n\nlines  ", "", "42 is not a word!", "café déjà vu", "a"]
+
+
+@pytest.fixture(params=["numpy", "stdlib"])
+def tokenizer(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(ownTokenizer, "np", None)
+    return EnglishCharTokenizer()
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_array_path_matches_nested_lists(tokenizer, text):
+    encoded = tokenizer.encode_array(text)
+
+    words = [list(encoded.ids[a:b]) for a, b in zip(encoded.offsets, encoded.offsets[1:])]
+    assert words == tokenizer.encode(text)
+    assert tokenizer.decode_array(encoded.ids, encoded.offsets) == tokenizer.decode(tokenizer.encode(text))
+
+
+def test_batch_round_trip(tokenizer):
+    batch = tokenizer.encode_batch(TEXTS)
+
+    assert len(batch.doc_offsets) == len(TEXTS) + 1
+    assert tokenizer.decode_batch(*batch) == [tokenizer.decode(tokenizer.encode(t)) for t in TEXTS]
+
+
+def test_decode_rejects_unknown_ids(tokenizer):
+    encoded = tokenizer.encode_array("ok")
+    encoded.ids[0] = 200
+
+    with pytest.raises(KeyError):
+        tokenizer.decode_array(encoded.ids, encoded.offsets)
+
+
+# === BytePairTokenizer ===
+CORPUS = "the cat sat on the mat. the cat ate the rat; 3 cats, 12 mats and 1000 rats!\n" * 20
+ROUND_TRIP = ["the cat sat", "unseen words: zebra, qux", "digits 1234567 and _under_scores",
+              "emoji 😀 and accents déjà vu", "  leading, trailing and\n\ndouble newlines  ", ""]
+
+
+@pytest.fixture(scope="module")
+def bpe():
+    return ownTokenizer.BytePairTokenizer().train(CORPUS, vocab_size=300)
+
+
+@pytest.mark.parametrize("text", ROUND_TRIP)
+def test_bpe_round_trip(bpe, text):
+    assert bpe.decode(bpe.encode(text)) == text
+
+
+def test_bpe_without_merges_is_raw_bytes():
+    text = "déjà 😀"
+
+    assert ownTokenizer.BytePairTokenizer().encode(text) == list(text.encode("utf-8"))
+
+
+def test_bpe_training_merges_frequent_pairs(bpe):
+    assert 256 < bpe.vocab_size <= 300
+    assert len(bpe.encode(CORPUS)) < len(CORPUS.encode("utf-8")) / 2
+    assert bpe.vocab[bpe.encode(" cat")[0]] == b" cat"
+
+
+def test_bpe_save_and_load(bpe, tmp_path):
+    path = tmp_path / "bpe.bin"
+    bpe.save(path)
+    loaded = ownTokenizer.BytePairTokenizer.load(path)
+
+    assert loaded.merges == bpe.merges
+    assert loaded.encode(CORPUS) == bpe.encode(CORPUS)
+
+
+def test_bpe_load_rejects_other_files(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"nope")
+
+    with pytest.raises(ValueError):
+        ownTokenizer.BytePairTokenizer.load(path)
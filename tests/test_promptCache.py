@@ -0,0 +1,105 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("google.genai")
+
+import promptCache
+from promptCache import PromptCache
+
+
+class ApiError(Exception):
+    def __init__(self, code):
+        super().__init__(f"{code} error")
+        self.code = code
+
+
+class FakeCaches:
+    def __init__(self, failures=()):
+        self.failures = list(failures)
+        self.created, self.updated, self.deleted = [], [], []
+
+    def create(self, model, config):
+        if self.failures:
+            raise self.failures.pop(0)
+        self.created.append(f"cachedContents/{len(self.created)}")
+        return SimpleNamespace(name=self.created[-1])
+
+    def update(self, name, config):
+        self.updated.append(name)
+
+    def delete(self, name):
+        self.deleted.append(name)
+
+
+def cache_with(caches):
+    return PromptCache("system prompt", client=SimpleNamespace(caches=caches))
+
+
+@pytest.fixture(autouse=True)
+def enabled(monkeypatch):
+    monkeypatch.setattr(promptCache, "ENABLED", True)
+
+
+def test_cache_is_created_once():
+    caches = FakeCaches()
+    cache = cache_with(caches)
+
+    assert cache.ensure() == cache.ensure() == "cachedContents/0"
+    assert len(caches.created) == 1
+
+
+@pytest.mark.parametrize("error", [ApiError(429), ApiError(503), ConnectionError("reset")])
+def test_transient_errors_back_off_instead_of_disabling(error):
+    caches = FakeCaches(failures=[error])
+    cache = cache_with(caches)
+
+    assert cache.ensure() is None
+    assert cache.disabled_reason is None
+    assert cache.ensure() is None  # still backing off, no new request
+    assert caches.created == []
+
+    cache.retry_at = 0.0
+    assert cache.ensure() == "cachedContents/0"
+    assert cache.backoff == promptCache.RETRY_BACKOFF
+
+
+def test_backoff_grows_up_to_the_max():
+    cache = cache_with(FakeCaches(failures=[ApiError(500)] * 20))
+
+    for _ in range(20):
+        cache.retry_at = 0.0
+        cache.ensure()
+    assert cache.backoff == promptCache.RETRY_BACKOFF_MAX
+
+
+def test_permanent_rejection_disables_the_cache():
+    caches = FakeCaches(failures=[ApiError(400)])
+    cache = cache_with(caches)
+
+    assert cache.ensure() is None
+    assert cache.disabled_reason == "400 error"
+    cache.retry_at = 0.0
+    assert cache.ensure() is None
+    assert caches.created == []
+
+
+def test_renewal_extends_the_existing_cache():
+    caches = FakeCaches()
+    cache = cache_with(caches)
+    cache.ensure()
+
+    cache.expires_at = 0.0
+    assert cache.ensure() == "cachedContents/0"
+    assert (caches.created, caches.updated) == (["cachedContents/0"], ["cachedContents/0"])
+
+
+def test_invalidated_cache_is_deleted_and_replaced():
+    caches = FakeCaches()
+    cache = cache_with(caches)
+    cache.ensure()
+
+    cache.invalidate()
+
+    assert caches.deleted == ["cachedContents/0"]
+    assert cache.ensure() == "cachedContents/1"
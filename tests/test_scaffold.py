@@ -0,0 +1,93 @@
+import os
+
+import pytest
+
+import scaffold
+from scaffold import ScaffoldError, format_manifest, materialize, plan_tree
+
+STRUCTURE = {
+    "app": {
+        "src/index.js": "console.log('hi')\n",
+        "src/utils": {"math.js": "export const add = (a, b) => a + b\n"},
+        "README.md": "# App\n",
+        "empty": {},
+    },
+    "LICENSE": None,
+}
+
+
+def listing(root):
+    found = []
+    for directory, dirs, files in os.walk(root):
+        rel = os.path.relpath(directory, root)
+        found += [os.path.normpath(os.path.join(rel, name)) + "/" for name in dirs]
+        found += [os.path.normpath(os.path.join(rel, name)) for name in files]
+    return sorted(found)
+
+
+def test_plan_tree_flattens_nested_and_slashed_names():
+    dirs, files = plan_tree(STRUCTURE)
+
+    join = os.path.join
+    assert dirs == ["app", join("app", "empty"), join("app", "src"), join("app", "src", "utils")]
+    assert dict(files)[join("app", "src", "index.js")] == "console.log('hi')\n"
+    assert dict(files)["LICENSE"] == ""
+
+
+@pytest.mark.parametrize("structure", [{"../evil.txt": "x"}, {"a": {"../../evil.txt": "x"}}, {"/etc/evil": "x"}])
+def test_paths_outside_the_root_are_rejected(structure):
+    with pytest.raises(ScaffoldError):
+        plan_tree(structure)
+
+
+def test_a_path_listed_as_file_and_folder_is_rejected():
+    with pytest.raises(ScaffoldError):
+        plan_tree({"src": {"a.js": ""}, "src/": "not a folder"})
+
+
+def test_materialize_writes_the_tree(tmp_path):
+    manifest = materialize(STRUCTURE, str(tmp_path))
+
+    assert (tmp_path / "app" / "src" / "utils" / "math.js").read_text() == STRUCTURE["app"]["src/utils"]["math.js"]
+    assert (tmp_path / "app" / "empty").is_dir()
+    assert (manifest["dirs"], manifest["files"], manifest["overwritten"]) == (4, 4, 0)
+    assert not [name for name in os.listdir(tmp_path) if name.startswith(".scaffold-")]
+    assert "4 folders and 4 files" in format_manifest(manifest)
+
+
+def test_materialize_merges_into_existing_folders(tmp_path):
+    (tmp_path / "app").mkdir()
+    (tmp_path / "app" / "keep.txt").write_text("mine")
+    (tmp_path / "app" / "README.md").write_text("old")
+
+    manifest = materialize(STRUCTURE, str(tmp_path))
+
+    assert (tmp_path / "app" / "keep.txt").read_text() == "mine"
+    assert (tmp_path / "app" / "README.md").read_text() == "# App\n"
+    assert manifest["overwritten"] == 1
+
+
+def test_conflicting_file_fails_before_writing(tmp_path):
+    (tmp_path / "app").write_text("a file where a folder should go")
+
+    with pytest.raises(ScaffoldError):
+        materialize(STRUCTURE, str(tmp_path))
+    assert listing(tmp_path) == ["app"]
+
+
+def test_failed_commit_is_rolled_back(tmp_path, monkeypatch):
+    (tmp_path / "app").mkdir()
+    (tmp_path / "app" / "README.md").write_text("old")
+    before = listing(tmp_path)
+    commit = scaffold._commit
+
+    def commit_then_fail(*args):
+        commit(*args)
+        raise OSError("disk full")
+
+    monkeypatch.setattr(scaffold, "_commit", commit_then_fail)
+    with pytest.raises(OSError):
+        materialize(STRUCTURE, str(tmp_path))
+
+    assert listing(tmp_path) == before
+    assert (tmp_path / "app" / "README.md").read_text() == "old"
@@ -0,0 +1,88 @@
+import threading
+
+import pytest
+
+from sessionStore import SessionStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SessionStore(str(tmp_path / "sessions.db"))
+
+
+def chat(session, turns):
+    for i in range(turns):
+        session.add_turn("user", f"Question {i}: " + "tell me more about this topic " * 8)
+        session.add_turn("assistant", f"Answer {i}: " + "here is a detailed explanation " * 12)
+
+
+def test_window_stays_bounded_over_100_turns(store):
+    session = store.load(store.new_session_id(), max_tokens=600, keep_tokens=300, summary_tokens=100)
+    sizes = []
+    for i in range(100):
+        chat(session, 1)
+        sizes.append(session.window_tokens())
+
+    assert max(sizes) <= 600
+    prompt_chars = [len(m["content"]) for m in session.messages()]
+    assert sum(prompt_chars) <= (600 + 100) * 4 + 100
+    assert session.messages()[0]["content"].startswith("Summary of our conversation so far:")
+    # The window always starts with a user turn
+    assert session.turns[0]["role"] == "user"
+
+
+def test_repeated_turn_is_ignored(store):
+    session = store.load("s")
+
+    assert session.add_turn("user", "hi") is True
+    assert session.add_turn("user", "hi") is False
+    assert session.add_turn("assistant", "hi") is True
+    assert [t["seq"] for t in session.turns] == [0, 1]
+
+
+def test_reload_restores_summary_and_remaining_turns(store, tmp_path):
+    session = store.load("s", max_tokens=600, keep_tokens=300)
+    chat(session, 20)
+
+    reloaded = SessionStore(str(tmp_path / "sessions.db")).load("s", max_tokens=600, keep_tokens=300)
+
+    assert reloaded.summary == session.summary != ""
+    assert reloaded.turns == session.turns
+    assert reloaded.next_seq == session.next_seq == 40
+    reloaded.add_turn("user", "one more")
+    assert reloaded.turns[-1]["seq"] == 40
+
+
+def test_summarize_callback_and_fallback(store):
+    folded = []
+
+    def summarize(summary, turns):
+        folded.extend(turns)
+        return "SUMMARY"
+
+    session = store.load("a", max_tokens=200, keep_tokens=100, summarize=summarize)
+    chat(session, 3)
+    assert session.summary == "SUMMARY" and folded
+
+    failing = store.load("b", max_tokens=200, keep_tokens=100, summarize=lambda *_: 1 / 0)
+    chat(failing, 3)
+    assert failing.summary.startswith("user: Question 0")
+
+
+def test_sessions_on_many_threads(store):
+    errors = []
+
+    def worker(i):
+        try:
+            chat(store.load(f"s{i}", max_tokens=300, keep_tokens=150), 10)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert store.conn.execute("SELECT COUNT(*) FROM turns").fetchone()[0] == 8 * 20
@@ -0,0 +1,101 @@
+import threading
+import time
+
+import pytest
+
+from singleFlight import SingleFlight, normalize_query
+
+FOLLOWERS = 5
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def run_concurrently(flight, key, fn):
+    """Start a leader blocked inside fn, then FOLLOWERS callers of the same key; returns results."""
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(flight.do(key, fn))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(FOLLOWERS + 1)]
+    threads[0].start()
+    wait_for(lambda: flight.in_flight() == 1)
+    for thread in threads[1:]:
+        thread.start()
+    wait_for(lambda: flight.stats["coalesced"] == FOLLOWERS)
+    return threads, results, errors
+
+
+def test_concurrent_callers_share_one_execution():
+    flight, release, calls = SingleFlight(), threading.Event(), []
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return "answer"
+
+    threads, results, errors = run_concurrently(flight, "q", slow)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert (len(calls), results, errors) == (1, ["answer"] * (FOLLOWERS + 1), [])
+    assert flight.stats["executions"] == 1
+    assert flight.stats["max_waiters"] == FOLLOWERS
+    assert flight.in_flight() == 0
+
+
+def test_errors_reach_every_caller():
+    flight, release = SingleFlight(), threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise RuntimeError("upstream down")
+
+    threads, results, errors = run_concurrently(flight, "q", failing)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == []
+    assert [str(e) for e in errors] == ["upstream down"] * (FOLLOWERS + 1)
+    assert flight.stats["errors"] == 1
+
+
+def test_results_are_not_cached():
+    flight, counter = SingleFlight(), iter(range(10))
+
+    assert [flight.do("q", next, counter) for _ in range(3)] == [0, 1, 2]
+    assert flight.stats["coalesced"] == 0
+
+
+def test_a_failed_call_does_not_block_the_key():
+    flight = SingleFlight()
+    with pytest.raises(ZeroDivisionError):
+        flight.do("q", lambda: 1 / 0)
+
+    assert flight.do("q", lambda: "ok") == "ok"
+
+
+def test_different_keys_run_independently():
+    flight, release = SingleFlight(), threading.Event()
+    thread = threading.Thread(target=flight.do, args=("slow", release.wait, 5))
+    thread.start()
+    wait_for(lambda: flight.in_flight() == 1)
+
+    assert flight.do("fast", lambda: "done") == "done"
+    release.set()
+    thread.join()
+
+
+@pytest.mark.parametrize("query", ["What is Django?", "what  is django", "WHAT IS DJANGO ?!", " what is\tdjango."])
+def test_normalize_query(query):
+    assert normalize_query(query) == "what is django"
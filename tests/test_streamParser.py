@@ -0,0 +1,46 @@
+import pytest
+
+from streamParser import StepStreamParser, iter_step_events
+
+STEPS = '[{"step": "plan", "content": "Hi \\u00e9 \\ud83d\\ude00 \\"q\\"\\n"}, {"content": "late", "step": "output"}]'
+
+
+def chunked(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 5, len(STEPS)])
+def test_chunk_boundaries_do_not_change_the_result(size):
+    events = list(iter_step_events(chunked(STEPS, size)))
+
+    objects = [e.value for e in events if e.kind == "object"]
+    assert objects == [{"step": "plan", "content": 'Hi é 😀 "q"\n'}, {"content": "late", "step": "output"}]
+    assert "".join(e.value for e in events if e.kind == "delta") == 'Hi é 😀 "q"\nlate'
+
+
+def test_deltas_wait_for_the_lead_field():
+    events = list(iter_step_events(chunked('{"content": "early", "step": "output"}', 3)))
+
+    kinds = [(e.kind, e.key) for e in events]
+    assert kinds.index(("field", "step")) < kinds.index(("delta", "content"))
+
+
+def test_nested_values_are_not_streamed():
+    events = StepStreamParser().feed('{"step": "action", "input": {"content": "inner"}, "content": "outer"}')
+
+    assert [e.value for e in events if e.kind == "delta"] == ["outer"]
+    assert events[-1].value["input"] == {"content": "inner"}
+
+
+def test_objects_sent_back_to_back():
+    events = StepStreamParser().feed('{"step": "plan"}\n{"step": "output"}')
+
+    assert [e.value["step"] for e in events if e.kind == "object"] == ["plan", "output"]
+
+
+def test_malformed_object_is_reported_and_parsing_continues():
+    parser = StepStreamParser()
+    events = parser.feed('{"step": "plan", "content": oops}') + parser.feed('{"step": "output"}')
+
+    assert [e.kind for e in events if e.kind in ("object", "error")] == ["error", "object"]
+    assert events[-1].value == {"step": "output"}
@@ -0,0 +1,33 @@
+import os
+
+import pytest
+
+# No network or API key: the model answers from the stub transport
+os.environ.setdefault("LLM_TRANSPORT", "stub")
+
+import weatherAgent
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(weatherAgent, "weather_cache", weatherAgent.OrderedDict())
+
+
+def test_weather_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(weatherAgent, "WEATHER_CACHE_SIZE", 3)
+
+    for city in ["delhi", "pune", "goa", "agra", "pune"]:
+        weatherAgent.store_weather(city, "sunny")
+
+    assert list(weatherAgent.weather_cache) == ["goa", "agra", "pune"]
+
+
+def test_expired_answers_are_dropped_on_insert(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(weatherAgent.time, "monotonic", lambda: now[0])
+
+    for city, seconds in [("delhi", 0.0), ("pune", 100.0), ("goa", weatherAgent.WEATHER_TTL + 50)]:
+        now[0] = seconds
+        weatherAgent.store_weather(city, "sunny")
+
+    assert list(weatherAgent.weather_cache) == ["pune", "goa"]
@@ -0,0 +1,198 @@
+import hashlib
+import os
+from collections import OrderedDict
+
+# Default context budget for the agent loops (input tokens per request)
+MAX_CONTEXT_TOKENS = int(os.getenv("MAX_CONTEXT_TOKENS", "100000"))
+
+# Rough per-message framing overhead (role, separators)
+MESSAGE_OVERHEAD = 4
+
+
+def message_text(message):
+    """Text of an OpenAI-style dict, a google-genai Content, or a Content-like dict with parts."""
+    if isinstance(message, str):
+        return message
+    if isinstance(message, dict):
+        if "content" in message:
+            return message["content"] or ""
+        parts = message.get("parts", [])
+    else:
+        parts = getattr(message, "parts", None) or []
+    texts = []
+    for part in parts:
+        text = part.get("text") if isinstance(part, dict) else getattr(part, "text", None)
+        if text:
+            texts.append(text)
+    return "".join(texts)
+
+
+def message_role(message):
+    if isinstance(message, dict):
+        return message.get("role")
+    return getattr(message, "role", None)
+
+
+def starts_turn(message):
+    """A user query, as opposed to a tool observation sent back with the user role."""
+    if message_role(message) != "user":
+        return False
+    return not message_text(message).lstrip().startswith('{"step": "observe"')
+
+
+class TokenCounter:
+    """Token counts memoized by content hash, so history is never re-tokenized.
+
+    Uses the tiktoken encoder from tokenization.py. For Gemini (`calibrated=True`)
+    the tiktoken count is scaled by a factor learned from the usage the API reports.
+    Falls back to ~4 chars per token when the encoder can't be loaded (e.g. offline).
+    """
+
+    def __init__(self, calibrated=False, max_entries=50_000):
+        self.calibrated = calibrated
+        self.ratio = 1.0
+        self.max_entries = max_entries
+        self._counts = OrderedDict()
+        self._encoder = None
+        self._encoder_failed = False
+        self.hits = 0
+        self.misses = 0
+
+    def _raw_count(self, text):
+        if self._encoder is None and not self._encoder_failed:
+            try:
+                from tokenization import get_encoder
+
+                self._encoder = get_encoder()
+            except Exception:
+                self._encoder_failed = True
+        if self._encoder is not None:
+            return len(self._encoder.encode_ordinary(text))
+        return len(text) // 4 + 1
+
+    def raw_count(self, text):
+        """Uncalibrated (tiktoken) count, memoized by content hash."""
+        key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+        count = self._counts.get(key)
+        if count is None:
+            self.misses += 1
+            count = self._raw_count(text)
+            self._counts[key] = count
+            if len(self._counts) > self.max_entries:
+                self._counts.popitem(last=False)
+        else:
+            self.hits += 1
+            self._counts.move_to_end(key)
+        return count
+
+    def scale(self, raw):
+        return round(raw * self.ratio) if self.calibrated else raw
+
+    def count_text(self, text):
+        return self.scale(self.raw_count(text))
+
+    def raw_count_message(self, message):
+        return self.raw_count(message_text(message)) + MESSAGE_OVERHEAD
+
+    def count_message(self, message):
+        return self.scale(self.raw_count_message(message))
+
+    def calibrate(self, raw_estimate, actual):
+        """Nudge the Gemini scale factor towards actual / raw estimate (from usage metadata)."""
+        if not self.calibrated or not raw_estimate or not actual:
+            return
+        observed = actual / raw_estimate
+        self.ratio = min(2.0, max(0.5, 0.8 * self.ratio + 0.2 * observed))
+
+
+class ConversationBudget:
+    """Running token total for one conversation, with trimming to stay under a budget.
+
+    Counts are tracked per message in step with the history, so each step only
+    counts the messages appended since the last call.
+    """
+
+    def __init__(self, counter, max_tokens=MAX_CONTEXT_TOKENS, fixed_text="", pinned=0):
+        self.counter = counter
+        self.max_tokens = max_tokens
+        # Sent with every request outside of `messages` (e.g. a cached system prompt)
+        self.fixed_raw = counter.raw_count(fixed_text) if fixed_text else 0
+        # Leading messages that are never trimmed
+        self.pinned = pinned
+        self._messages = []
+        self._counts = []
+        self.raw_total = self.fixed_raw
+        self.trimmed = 0
+        self.sent = 0
+
+    @property
+    def total(self):
+        return self.counter.scale(self.raw_total)
+
+    def update(self, messages):
+        """Sync with `messages` and return the running total."""
+        known = len(self._messages)
+        if known > len(messages) or (known and messages[known - 1] is not self._messages[-1]):
+            # History was rewritten: re-sync (counts are still memoized by content)
+            self._messages, self._counts = [], []
+            known = 0
+        for message in messages[known:]:
+            self._messages.append(message)
+            self._counts.append(self.counter.raw_count_message(message))
+        self.raw_total = self.fixed_raw + sum(self._counts)
+        return self.total
+
+    def _drop(self, messages, start, end):
+        del messages[start:end]
+        self.raw_total -= sum(self._counts[start:end])
+        del self._counts[start:end]
+        del self._messages[start:end]
+        return end - start
+
+    def fit(self, messages):
+        """Drop old history (in place) until it fits the budget, keeping the structure valid.
+
+        Whole turns go first, oldest first: a user query with every step and observation
+        up to its answer, so no observation is left without its action and the history
+        never starts with an assistant message. If the current turn alone is too big, its
+        oldest steps go, each together with the observation that answered it.
+        """
+        self.update(messages)
+        dropped = 0
+        while self.total > self.max_tokens:
+            starts = [i for i in range(self.pinned, len(messages)) if starts_turn(messages[i])]
+            if starts and starts[-1] > self.pinned:
+                # Everything before the current turn's query belongs to older turns
+                end = next(i for i in starts if i > self.pinned)
+                dropped += self._drop(messages, self.pinned, end)
+                continue
+            first_step = starts[-1] + 1 if starts else self.pinned
+            if len(messages) - first_step <= 1:
+                break
+            end = first_step + 1
+            if end < len(messages) - 1 and message_role(messages[end]) == "user":
+                end += 1  # the observation of the dropped action
+            dropped += self._drop(messages, first_step, end)
+        self.trimmed += dropped
+        self.sent += self.total
+        return dropped
+
+    def calibrate(self, actual_input_tokens):
+        """Feed back the provider's input token count for the request we just sized."""
+        self.counter.calibrate(self.raw_total, actual_input_tokens)
+
+    def summary(self):
+        return (
+            f"~{self.total:,} tokens in context (budget {self.max_tokens:,}), "
+            f"{self.sent:,} sent so far, {self.trimmed} messages trimmed"
+        )
+
+
+# Shared counters, one per provider family, so memoized counts are reused across agents
+_counters = {}
+
+
+def get_counter(provider="gemini"):
+    if provider not in _counters:
+        _counters[provider] = TokenCounter(calibrated=provider == "gemini")
+    return _counters[provider]
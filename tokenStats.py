@@ -0,0 +1,204 @@
+"""Token statistics for whole corpora and agent transcripts, using the tiktoken encoder.
+
+Usage:
+    python tokenStats.py docs/ transcripts/ --ext .md .txt .jsonl
+    python tokenStats.py big.log --workers 8 --chunk-mb 16 --json
+"""
+import argparse
+import json
+import mmap
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from tokenization import MODEL, get_encoder
+
+SNIFF_BYTES = 8192
+# How far past the target offset to look for a clean split point
+BOUNDARY_SEARCH = 1 << 20
+
+_encoder = None
+
+
+# === Workers ===
+def _init_worker(model):
+    """Load the encoder once per worker process."""
+    global _encoder
+    _encoder = get_encoder(model)
+
+
+def _count_range(path, start, end):
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        text = mm[start:end].decode("utf-8", errors="replace")
+    return [(path, len(_encoder.encode_ordinary(text)), end - start)]
+
+
+def _count_files(paths):
+    texts = []
+    sizes = []
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        texts.append(data.decode("utf-8", errors="replace"))
+        sizes.append(len(data))
+    # The pool already gives us one process per core, so no extra threads here
+    counts = _encoder.encode_ordinary_batch(texts, num_threads=1)
+    return [(path, len(tokens), size) for path, tokens, size in zip(paths, counts, sizes)]
+
+
+def _run_task(task):
+    kind, args = task
+    return _count_range(*args) if kind == "range" else _count_files(args)
+
+
+# === Planning ===
+def find_boundary(mm, target, end):
+    """First offset >= target right after a newline that is followed by non-whitespace.
+
+    Splitting there keeps the pre-tokenizer from merging text across chunks, and it
+    is always a UTF-8 character boundary.
+    """
+    limit = min(end, target + BOUNDARY_SEARCH)
+    pos = target
+    while True:
+        pos = mm.find(b"\n", pos, limit)
+        if pos == -1 or pos + 1 >= end:
+            break
+        if mm[pos + 1] not in b" \t\r\n":
+            return pos + 1
+        pos += 1
+    # No clean split nearby: take any newline, or give up and keep the rest together
+    pos = mm.find(b"\n", target, end)
+    return pos + 1 if pos != -1 else end
+
+
+def split_file(path, size, chunk_bytes):
+    ranges = []
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start = 0
+        while start < size:
+            end = size if size - start <= chunk_bytes else find_boundary(mm, start + chunk_bytes, size)
+            ranges.append((path, start, end))
+            start = end
+    return ranges
+
+
+def is_binary(path):
+    with open(path, "rb") as f:
+        return b"\0" in f.read(SNIFF_BYTES)
+
+
+def collect_files(paths, extensions=None, excluded_dirs=("node_modules", "__pycache__", ".git", "venv", "env")):
+    for path in paths:
+        if os.path.isfile(path):
+            yield path
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs[:] = [d for d in dirs if d not in excluded_dirs]
+            for name in files:
+                if not extensions or name.endswith(tuple(extensions)):
+                    yield os.path.join(root, name)
+
+
+def plan_tasks(files, chunk_bytes):
+    """Big files become byte ranges; small files are grouped into batches of ~chunk_bytes."""
+    tasks = []
+    batch, batch_bytes = [], 0
+    for path in files:
+        size = os.path.getsize(path)
+        if size == 0 or is_binary(path):
+            continue
+        if size > chunk_bytes:
+            tasks.extend(("range", r) for r in split_file(path, size, chunk_bytes))
+            continue
+        batch.append(path)
+        batch_bytes += size
+        if batch_bytes >= chunk_bytes:
+            tasks.append(("files", batch))
+            batch, batch_bytes = [], 0
+    if batch:
+        tasks.append(("files", batch))
+    # Largest first so one big range doesn't finish last on its own
+    tasks.sort(key=lambda t: -(t[1][2] - t[1][1]) if t[0] == "range" else -len(t[1]))
+    return tasks
+
+
+# === Stats ===
+def histogram(counts):
+    """Files per power-of-two token bucket, e.g. {"1K-2K": 3}."""
+    def label(n):
+        for unit, scale in (("M", 1 << 20), ("K", 1 << 10)):
+            if n >= scale:
+                return f"{n // scale}{unit}"
+        return str(n)
+
+    buckets = defaultdict(int)
+    for count in counts:
+        low = 1 << max(count.bit_length() - 1, 0) if count else 0
+        buckets[low] += 1
+    return {f"{label(low)}-{label(max(low * 2, 1))}": buckets[low] for low in sorted(buckets)}
+
+
+def token_stats(paths, model=MODEL, workers=None, chunk_mb=8, extensions=None, top=10):
+    start = time.perf_counter()
+    tasks = plan_tasks(collect_files(paths, extensions), int(chunk_mb * (1 << 20)))
+
+    tokens_per_file = defaultdict(int)
+    bytes_per_file = defaultdict(int)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model,)) as pool:
+        for results in pool.map(_run_task, tasks):
+            for path, tokens, size in results:
+                tokens_per_file[path] += tokens
+                bytes_per_file[path] += size
+
+    seconds = time.perf_counter() - start
+    total_tokens = sum(tokens_per_file.values())
+    total_bytes = sum(bytes_per_file.values())
+    return {
+        "model": model,
+        "files": len(tokens_per_file),
+        "tasks": len(tasks),
+        "bytes": total_bytes,
+        "tokens": total_tokens,
+        "bytes_per_token": total_bytes / total_tokens if total_tokens else 0.0,
+        "seconds": seconds,
+        "mb_per_second": total_bytes / 1_000_000 / seconds if seconds else 0.0,
+        "histogram": histogram(tokens_per_file.values()),
+        "top_files": sorted(tokens_per_file.items(), key=lambda item: -item[1])[:top],
+    }
+
+
+def print_report(stats):
+    print(f"📊 {stats['files']} files, {stats['bytes'] / 1_000_000:.1f} MB -> {stats['tokens']:,} tokens ({stats['model']})")
+    print(f"   {stats['bytes_per_token']:.2f} bytes/token, {stats['seconds']:.1f}s, {stats['mb_per_second']:.1f} MB/s over {stats['tasks']} tasks")
+    print("\nTokens per file:")
+    width = max(stats["histogram"].values(), default=0)
+    for bucket, files in stats["histogram"].items():
+        bar = "█" * max(1, round(40 * files / width))
+        print(f"  {bucket:>12} {bar} {files}")
+    print("\nTop files:")
+    for path, tokens in stats["top_files"]:
+        print(f"  {tokens:>12,}  {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count tokens across files with tiktoken.")
+    parser.add_argument("paths", nargs="+", help="files or directories")
+    parser.add_argument("--model", default=MODEL)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-mb", type=float, default=8, help="bytes per task")
+    parser.add_argument("--ext", nargs="*", help="only count files with these extensions")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--json", action="store_true", help="print the stats as JSON")
+    args = parser.parse_args()
+
+    stats = token_stats(args.paths, args.model, args.workers, args.chunk_mb, args.ext, args.top)
+    if args.json:
+        print(json.dumps(stats, indent=2))
+    else:
+        print_report(stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,23 @@
+import functools
+
 import tiktoken
 
-encoder=tiktoken.encoding_for_model('gpt-4o')
+MODEL = "gpt-4o"
+
+
+@functools.lru_cache(maxsize=None)
+def get_encoder(model=MODEL):
+    """The tiktoken encoder for `model`, loaded once per process."""
+    return tiktoken.encoding_for_model(model)
+
+
+if __name__ == "__main__":
+    encoder=get_encoder()
 
-text="The quick brown fox jumps over the lazy dog."
+    text="The quick brown fox jumps over the lazy dog."
 
-tokens=encoder.encode(text)
-print(tokens)
+    tokens=encoder.encode(text)
+    print(tokens)
 
-decoded=encoder.decode(tokens)
-print(decoded)
\ No newline at end of file
+    decoded=encoder.decode(tokens)
+    print(decoded)
@@ -0,0 +1,298 @@
+"""Structured tracing for the agent loops, written as OpenTelemetry-shaped JSONL spans.
+
+Set TRACE_FILE to turn it on; every turn, model call, tool call and JSON parse becomes
+a span with its timing and attributes (tokens, time to first token, output size...).
+
+Usage:
+    TRACE_FILE=traces.jsonl python codingAgent.py
+    python tracing.py summarize traces.jsonl            # per-session breakdown and p95s
+    python tracing.py summarize traces.jsonl --session 3f2a
+    python tracing.py otlp traces.jsonl > otlp.json     # OTLP/JSON for a collector
+"""
+import argparse
+import atexit
+import contextvars
+import json
+import os
+import secrets
+import threading
+import time
+from collections import defaultdict
+
+TRACE_FILE = os.getenv("TRACE_FILE", "")
+
+_current = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed operation; use through Tracer.span as a context manager."""
+
+    def __init__(self, tracer, name, attributes):
+        parent = _current.get()
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes
+        self.events = []
+        self.status = None
+        self._token = None
+
+    def set(self, **attributes):
+        self.attributes.update((k, v) for k, v in attributes.items() if v is not None)
+        return self
+
+    def event(self, name, **attributes):
+        self.events.append({"name": name, "timeUnixNano": time.time_ns(), "attributes": attributes})
+
+    def __enter__(self):
+        self.start_ns = time.time_ns()
+        self._start = time.perf_counter()
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self._start
+        _current.reset(self._token)
+        if exc is not None and not isinstance(exc, (GeneratorExit, KeyboardInterrupt)):
+            self.status = {"code": "ERROR", "message": f"{exc_type.__name__}: {exc}"}
+        self.tracer.export({
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.start_ns + int(duration * 1e9),
+            "attributes": self.attributes,
+            "events": self.events,
+            "status": self.status or {"code": "OK"},
+            "resource": self.tracer.resource,
+        }, flush=self.parent_id is None)
+        return False
+
+
+class _NoopSpan:
+    def set(self, **attributes):
+        return self
+
+    def event(self, name, **attributes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def current_span():
+    """The active span, for adding attributes from helpers that don't own it."""
+    return _current.get() or _NOOP
+
+
+class Tracer:
+    def __init__(self, service, path=TRACE_FILE):
+        self.path = path
+        self.resource = {"service.name": service, "session.id": secrets.token_hex(4)}
+        self._lock = threading.Lock()
+        self._file = None
+
+    @property
+    def enabled(self):
+        return bool(self.path)
+
+    def span(self, name, **attributes):
+        if not self.path:
+            return _NOOP
+        return Span(self, name, {k: v for k, v in attributes.items() if v is not None})
+
+    def export(self, record, flush=False):
+        line = json.dumps(record, separators=(",", ":"), ensure_ascii=False, default=str)
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+                atexit.register(self.close)
+            self._file.write(line + "\n")
+            if flush:
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+_tracers = {}
+
+
+def get_tracer(service):
+    if service not in _tracers:
+        _tracers[service] = Tracer(service)
+    return _tracers[service]
+
+
+# === Summaries ===
+def load_spans(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, round(q / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def _seconds(span):
+    return (span["endTimeUnixNano"] - span["startTimeUnixNano"]) / 1e9
+
+
+def _label(span):
+    """Span name plus the attribute that tells calls apart (tool name, model)."""
+    attributes = span.get("attributes", {})
+    detail = attributes.get("tool") or attributes.get("model")
+    return f"{span['name']}[{detail}]" if detail else span["name"]
+
+
+def flame(spans):
+    """Total and self seconds per call path, e.g. ("turn", "tool.call[read_file]")."""
+    by_id = {s["spanId"]: s for s in spans}
+    children_time = defaultdict(float)
+    for s in spans:
+        if s.get("parentSpanId") in by_id:
+            children_time[s["parentSpanId"]] += _seconds(s)
+
+    totals = defaultdict(lambda: [0.0, 0.0, 0])
+    for s in spans:
+        path, node = [], s
+        while node is not None:
+            path.append(_label(node))
+            node = by_id.get(node.get("parentSpanId"))
+        entry = totals[tuple(reversed(path))]
+        entry[0] += _seconds(s)
+        entry[1] += max(0.0, _seconds(s) - children_time[s["spanId"]])
+        entry[2] += 1
+    return totals
+
+
+def span_stats(spans):
+    groups = defaultdict(list)
+    for s in spans:
+        groups[_label(s)].append(s)
+    stats = {}
+    for label, group in sorted(groups.items()):
+        seconds = [_seconds(s) for s in group]
+        row = {
+            "count": len(group),
+            "total": sum(seconds),
+            "p50": percentile(seconds, 50),
+            "p95": percentile(seconds, 95),
+            "max": max(seconds),
+            "errors": sum(s.get("status", {}).get("code") == "ERROR" for s in group),
+        }
+        ttfts = [s["attributes"]["ttft"] for s in group if "ttft" in s.get("attributes", {})]
+        if ttfts:
+            row["ttft_p95"] = percentile(ttfts, 95)
+        for key in ("input_tokens", "output_tokens", "cached_tokens", "output_bytes"):
+            values = [s["attributes"][key] for s in group if key in s.get("attributes", {})]
+            if values:
+                row[key] = sum(values)
+        stats[label] = row
+    return stats
+
+
+def print_summary(spans, width=30):
+    sessions = defaultdict(list)
+    for s in spans:
+        resource = s.get("resource", {})
+        sessions[(resource.get("service.name", "?"), resource.get("session.id", "?"))].append(s)
+
+    for (service, session), group in sessions.items():
+        turns = [s for s in group if not s.get("parentSpanId")]
+        wall = sum(_seconds(s) for s in turns)
+        print(f"\n🧵 {service} session {session}: {len(turns)} turns, {len(group)} spans, {wall:.2f}s")
+        totals = flame(group)
+        for path in sorted(totals):
+            total, own, count = totals[path]
+            bar = "█" * max(1, round(width * total / wall)) if wall else ""
+            indent = "  " * (len(path) - 1)
+            print(f"  {indent}{path[-1]:<{40 - len(indent)}} {total:8.2f}s self {own:7.2f}s x{count:<4} {bar}")
+
+    print(f"\n{'span':<40}{'count':>7}{'total s':>10}{'p50 s':>9}{'p95 s':>9}{'max s':>9}{'ttft p95':>10}{'tokens in/out':>16}")
+    for label, row in span_stats(spans).items():
+        ttft = f"{row['ttft_p95']:.2f}" if "ttft_p95" in row else "-"
+        tokens = f"{row['input_tokens']}/{row.get('output_tokens', 0)}" if "input_tokens" in row else "-"
+        print(f"{label[:39]:<40}{row['count']:>7}{row['total']:>10.2f}{row['p50']:>9.3f}{row['p95']:>9.3f}"
+              f"{row['max']:>9.3f}{ttft:>10}{tokens:>16}")
+
+
+def to_otlp(spans):
+    """OTLP/JSON (resourceSpans) for loading the spans into a collector or tracing UI."""
+    def value(v):
+        if isinstance(v, bool):
+            return {"boolValue": v}
+        if isinstance(v, int):
+            return {"intValue": str(v)}
+        if isinstance(v, float):
+            return {"doubleValue": v}
+        return {"stringValue": str(v)}
+
+    def attributes(d):
+        return [{"key": k, "value": value(v)} for k, v in d.items()]
+
+    resources = defaultdict(list)
+    for s in spans:
+        resources[json.dumps(s.get("resource", {}), sort_keys=True)].append(s)
+    return {"resourceSpans": [{
+        "resource": {"attributes": attributes(json.loads(resource))},
+        "scopeSpans": [{"scope": {"name": "genai.tracing"}, "spans": [{
+            "traceId": s["traceId"],
+            "spanId": s["spanId"],
+            **({"parentSpanId": s["parentSpanId"]} if s.get("parentSpanId") else {}),
+            "name": s["name"],
+            "kind": 1,
+            "startTimeUnixNano": str(s["startTimeUnixNano"]),
+            "endTimeUnixNano": str(s["endTimeUnixNano"]),
+            "attributes": attributes(s.get("attributes", {})),
+            "events": [{"name": e["name"], "timeUnixNano": str(e["timeUnixNano"]),
+                        "attributes": attributes(e.get("attributes", {}))} for e in s.get("events", [])],
+            "status": {"code": 2 if s.get("status", {}).get("code") == "ERROR" else 1,
+                       **({"message": s["status"]["message"]} if s.get("status", {}).get("message") else {})},
+        } for s in group]}],
+    } for resource, group in resources.items()]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize or convert agent traces.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    summarize = commands.add_parser("summarize", help="per-session breakdown and latency percentiles")
+    summarize.add_argument("path")
+    summarize.add_argument("--session", help="only sessions whose id starts with this")
+    summarize.add_argument("--service", help="only this agent (e.g. codingAgent)")
+    otlp = commands.add_parser("otlp", help="print the spans as OTLP/JSON")
+    otlp.add_argument("path")
+    args = parser.parse_args()
+
+    spans = load_spans(args.path)
+    if args.command == "otlp":
+        print(json.dumps(to_otlp(spans)))
+        return
+    if args.session:
+        spans = [s for s in spans if s.get("resource", {}).get("session.id", "").startswith(args.session)]
+    if args.service:
+        spans = [s for s in spans if s.get("resource", {}).get("service.name") == args.service]
+    if not spans:
+        print("No spans found")
+        return
+    print_summary(spans)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,189 @@
+import functools
 import json
-from google import genai
-from google.genai import types
+import re
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import os
 from dotenv import load_dotenv
-import requests
+from lazyImport import lazy_import, prewarm
+from streamParser import iter_step_events
+from llmTransport import gemini_client
+from modelRouter import ModelRouter
+from speculation import Speculator
+from tokenBudget import ConversationBudget, get_counter
+from tracing import current_span, get_tracer
 
 load_dotenv()
 
-client = genai.Client(
+# The SDK and requests load on first use (prewarmed while main() waits for the first query)
+types = lazy_import("google.genai.types")
+requests = lazy_import("requests")
+
+# Stream each step as it is generated (set STREAM=0 to wait for the whole JSON object)
+STREAM = os.getenv("STREAM", "1") != "0"
+
+client = gemini_client(
     api_key=os.environ.get("GEMINI_API_KEY"),
 )
 
+# === Weather lookups ===
+# (connect, read) seconds for wttr.in
+WEATHER_TIMEOUT = (3, float(os.getenv("WEATHER_TIMEOUT", "10")))
+# Answers are reused for this many seconds
+WEATHER_TTL = float(os.getenv("WEATHER_TTL", "300"))
+# Most cities kept at once; the least recently stored go first
+WEATHER_CACHE_SIZE = int(os.getenv("WEATHER_CACHE_SIZE", "256"))
+MAX_CITIES = 10
+# Shell commands are killed after this many seconds (the same limit agentServer puts on tools)
+COMMAND_TIMEOUT = float(os.getenv("TOOL_TIMEOUT", "120"))
+
+lookup_pool = ThreadPoolExecutor(max_workers=MAX_CITIES, thread_name_prefix="weather")
+# key -> (expires at, answer), oldest first: every entry has the same TTL, so expired ones sit at the front
+weather_cache = OrderedDict()
+weather_cache_lock = threading.Lock()
+_http = None
+_http_lock = threading.Lock()
+
+
+# Weather lookups started while the model is still planning (SPECULATE=0 to turn off)
+speculator = Speculator()
+
+WEATHER_WORDS = re.compile(r"\b(weather|temperature|forecast|climate|rain\w*|snow\w*|sunny|humid\w*|hot|cold|warm)\b", re.I)
+# Looks ahead so "interested in weather data of new york" also tries the phrase after "of"
+PLACE_PHRASE = re.compile(r"\b(?:in|of|at|for)\s+(?=([^?.!;:\"]+))", re.I)
+NOT_PLACE_WORDS = {
+    "today", "now", "tomorrow", "tonight", "right", "currently", "please", "weather", "temperature",
+    "forecast", "data", "is", "like", "looks", "this", "that", "city", "i", "should", "call", "tool",
+    "it", "my", "me", "user", "next", "week", "the", "a", "get_weather", "order", "general",
+}
+
+
+def guess_cities(text):
+    """Likely get_weather inputs mentioned in a query or plan, e.g. "weather of new york" -> ["new york"]."""
+    if not WEATHER_WORDS.search(text):
+        return []
+    cities = []
+    for match in PLACE_PHRASE.finditer(text):
+        for part in re.split(r",|\band\b|\bor\b|\bvs\.?", match.group(1), flags=re.I):
+            words = []
+            for word in part.split():
+                if word.lower().strip("'\"") in NOT_PLACE_WORDS:
+                    break
+                words.append(word.strip("'\""))
+            city = " ".join(words[:3])
+            if city and city.lower() not in (c.lower() for c in cities):
+                cities.append(city)
+    return cities[:5]
+
+
+def speculate(text):
+    for city in guess_cities(text):
+        speculator.start("get_weather", city, fetch_weather)
+
+
+def weather_session():
+    """One pooled connection set to wttr.in for every lookup, opened by the first one."""
+    global _http
+    with _http_lock:
+        if _http is None:
+            _http = requests.Session()
+            _http.mount("https://", requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=MAX_CITIES))
+        return _http
 
-def get_weather(city: str):
-    # TODO!: Do an actual API Call
-    print("🔨 Tool Called: get_weather", city)
+
+def fetch_weather(city):
+    key = " ".join(city.casefold().split())
+    with weather_cache_lock:
+        cached = weather_cache.get(key)
+    if cached and cached[0] > time.monotonic():
+        return f"The weather in {city} is {cached[1]}."
 
     url = f"https://wttr.in/{city}?format=%C+%t"
-    response = requests.get(url)
+    try:
+        response = weather_session().get(url, timeout=WEATHER_TIMEOUT)
+    except requests.RequestException as e:
+        return f"[ERROR] Weather lookup for {city} failed: {e.__class__.__name__}"
 
     if response.status_code == 200:
+        store_weather(key, response.text)
         return f"The weather in {city} is {response.text}."
     return "Something went wrong"
 
 
+def store_weather(key, answer):
+    """Cache an answer, dropping expired entries and the oldest ones past WEATHER_CACHE_SIZE."""
+    now = time.monotonic()
+    with weather_cache_lock:
+        weather_cache.pop(key, None)
+        weather_cache[key] = (now + WEATHER_TTL, answer)
+        while weather_cache:
+            expires, _ = next(iter(weather_cache.values()))
+            if expires > now and len(weather_cache) <= WEATHER_CACHE_SIZE:
+                break
+            weather_cache.popitem(last=False)
+
+
+def parse_cities(cities):
+    """Cities from a JSON array, a list or a comma separated string."""
+    if isinstance(cities, str):
+        try:
+            cities = json.loads(cities)
+        except json.JSONDecodeError:
+            cities = cities.split(",")
+    if isinstance(cities, str):
+        cities = [cities]
+    names = []
+    for city in cities:
+        city = str(city).strip()
+        if city and city.casefold() not in (n.casefold() for n in names):
+            names.append(city)
+    return names
+
+
+def get_weather(city: str):
+    # TODO!: Do an actual API Call
+    print("🔨 Tool Called: get_weather", city)
+
+    prefetched = speculator.take("get_weather", city)
+    if prefetched is not None:
+        try:
+            return prefetched.result()
+        except Exception:
+            pass  # the guess failed; make the call for real
+    return fetch_weather(city)
+
+
+def get_weather_batch(cities):
+    names = parse_cities(cities)
+    print("🔨 Tool Called: get_weather_batch", ", ".join(names))
+    if not names:
+        return "[ERROR] No cities provided"
+    if len(names) > MAX_CITIES:
+        return f"[ERROR] At most {MAX_CITIES} cities per call, got {len(names)}"
+
+    def lookup(city):
+        prefetched = speculator.take("get_weather", city)
+        if prefetched is not None:
+            try:
+                return prefetched.result()
+            except Exception:
+                pass
+        return fetch_weather(city)
+
+    return "\n".join(lookup_pool.map(lookup, names))
+
+
 def run_command(command):
-    result = os.system(command=command)
-    return result
+    try:
+        result = subprocess.run(command, shell=True, capture_output=True, text=True, timeout=COMMAND_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        return f"[ERROR] Command timed out after {COMMAND_TIMEOUT:.0f} seconds"
+    if result.returncode != 0:
+        return f"[ERROR] Command failed with exit code {result.returncode}:\n{result.stderr}"
+    return result.stdout.strip()
 
 
 avaiable_tools = {
@@ -34,6 +191,10 @@ avaiable_tools = {
         "fn": get_weather,
         "description": "Takes a city name as an input and returns the current weather for the city",
     },
+    "get_weather_batch": {
+        "fn": get_weather_batch,
+        "description": "Takes a list of city names as an input and returns the current weather for each of them",
+    },
     "run_command": {
         "fn": run_command,
         "description": "Takes a command as input to execute on system and returns ouput",
@@ -61,6 +222,7 @@ Output JSON Format:
 
 Available Tools:
 - get_weather: Takes a city name as an input and returns the current weather for the city
+- get_weather_batch: Takes a list of city names as an input and returns the current weather for each of them. Use it whenever the query needs more than one city, in a single action
 - run_command: Takes a command as input to execute on system and returns ouput
 
 
@@ -71,61 +233,202 @@ Output: {{ "step": "plan", "content": "From the available tools I should call ge
 Output: {{ "step": "action", "function": "get_weather", "input": "new york" }}
 Output: {{ "step": "observe", "output": "12 Degree Cel" }}
 Output: {{ "step": "output", "content": "The weather for new york seems to be 12 degrees." }}
+
+User Query: Is it warmer in delhi, mumbai or pune?
+Output: {{ "step": "plan", "content": "The user wants to compare the weather of three cities, I should call get_weather_batch once" }}
+Output: {{ "step": "action", "function": "get_weather_batch", "input": ["delhi", "mumbai", "pune"] }}
+Output: {{ "step": "observe", "output": "The weather in delhi is Sunny +34°C.\nThe weather in mumbai is Haze +31°C.\nThe weather in pune is Clear +29°C." }}
+Output: {{ "step": "output", "content": "Delhi is the warmest at 34 degrees, then Mumbai at 31 and Pune at 29." }}
 """
 
-messages = [
-    types.Content(
-        role="user",
-        parts=[types.Part.from_text(text=f"{system_prompt}")],
-    )
-]
-
-while True:
-    userQuery = input("> ")
-    messages.append(
-        types.Content(
-            role="user",
-            parts=[types.Part.from_text(text=f"{userQuery}")],
-        )
+# The system prompt is added with the first query (see main), once the SDK is loaded
+messages = []
+
+MAX_OUTPUT_TOKENS = 400
+# Invalid or cut-off replies in a row before the turn is given up
+MAX_RETRIES = 3
+
+
+@functools.cache
+def generation_config():
+    return types.GenerateContentConfig(
+        max_output_tokens=MAX_OUTPUT_TOKENS,
+        response_mime_type="application/json",
     )
-    while True:
+
+
+# Every step here is short (plans, a city name, a one-line answer), so all of them may use the cheap model
+router = ModelRouter("weatherAgent", max_output_tokens=MAX_OUTPUT_TOKENS, strong_model="gemini-2.0-flash-001")
+
+# Token counts reported for the last model call
+last_usage = {}
+
+# Tracks the context size as messages are appended; the system prompt is never trimmed
+budget = ConversationBudget(get_counter("gemini"), pinned=1)
+
+# Spans for each turn, model call and tool call when TRACE_FILE is set
+tracer = get_tracer("weatherAgent")
+
+
+def stream_texts(stream):
+    calibrated = False
+    span = current_span()
+    start = time.perf_counter()
+    for i, chunk in enumerate(stream):
+        if i == 0:
+            span.set(ttft=round(time.perf_counter() - start, 4))
+        usage = chunk.usage_metadata
+        if not calibrated and usage and usage.prompt_token_count:
+            budget.calibrate(usage.prompt_token_count)
+            calibrated = True
+        if usage and usage.candidates_token_count:
+            span.set(input_tokens=usage.prompt_token_count, output_tokens=usage.candidates_token_count)
+            last_usage.update(input_tokens=usage.prompt_token_count, output_tokens=usage.candidates_token_count)
+        yield chunk.text
+
+
+def next_step(route):
+    """Get the next step from Gemini, printing plan/output content as it streams in."""
+    last_usage.clear()
+    if not STREAM:
         response = client.models.generate_content(
-            model="gemini-2.0-flash-001",
+            model=route.model,
             contents=messages,
-            config=types.GenerateContentConfig(
-                max_output_tokens=400,
-                response_mime_type="application/json",
-            ),
+            config=router.config(generation_config(), route),
         )
-        parsedResponse = json.loads(response.candidates[0].content.parts[0].text)
+        if response.usage_metadata:
+            budget.calibrate(response.usage_metadata.prompt_token_count)
+            current_span().set(
+                input_tokens=response.usage_metadata.prompt_token_count,
+                output_tokens=response.usage_metadata.candidates_token_count,
+            )
+            last_usage.update(
+                input_tokens=response.usage_metadata.prompt_token_count,
+                output_tokens=response.usage_metadata.candidates_token_count,
+            )
+        text = response.candidates[0].content.parts[0].text
+        with tracer.span("parse", chars=len(text)):
+            return json.loads(text), False
+
+    stream = client.models.generate_content_stream(
+        model=route.model,
+        contents=messages,
+        config=router.config(generation_config(), route),
+    )
+    printing = False
+    for event in iter_step_events(stream_texts(stream)):
+        if event.kind == "field" and event.key == "step":
+            step = event.value.lower()
+            printing = step in ("plan", "output")
+            if step == "plan":
+                print(f"🧠 [{event.value.upper()}]: ", end="", flush=True)
+            elif step == "output":
+                print("🤖: ", end="", flush=True)
+        elif event.kind == "delta" and printing:
+            print(event.value, end="", flush=True)
+        elif event.kind == "object":
+            # Return as soon as the object closes so an action is dispatched right away
+            if printing:
+                print()
+            return event.value, printing
+        elif event.kind == "error":
+            raise json.JSONDecodeError("Invalid step object", event.value, 0)
+    raise json.JSONDecodeError("Stream ended before a complete step", "", 0)
 
+
+def main():
+    prewarm("google.genai", "requests")
+    while True:
+        userQuery = input("> ")
+        if not messages:
+            messages.append(
+                types.Content(
+                    role="user",
+                    parts=[types.Part.from_text(text=f"{system_prompt}")],
+                )
+            )
         messages.append(
             types.Content(
-                role="assistant",
-                parts=[types.Part.from_text(text=json.dumps(parsedResponse))],
+                role="user",
+                parts=[types.Part.from_text(text=f"{userQuery}")],
             )
         )
+        # Start likely lookups now; the model needs a few steps before it asks for them
+        speculate(userQuery)
+        with tracer.span("turn", query_chars=len(userQuery)):
+            previous = "user"
+            retries = 0
+            while True:
+                if budget.fit(messages):
+                    print(f"✂️ Trimmed old messages: {budget.summary()}")
+                route = router.route(previous)
+                start = time.perf_counter()
+                with tracer.span("model.call", model=route.model, stream=STREAM,
+                                 max_output_tokens=route.max_output_tokens) as call:
+                    try:
+                        parsedResponse, printed = next_step(route)
+                    except json.JSONDecodeError:
+                        # Cut off or malformed: the next attempt goes to the strong model
+                        router.failed(route)
+                        retries += 1
+                        if retries >= MAX_RETRIES:
+                            print(f"❌ No valid reply from the model after {MAX_RETRIES} attempts, please ask again")
+                            break
+                        print("⚠️ Invalid JSON from the model, retrying")
+                        continue
+                    retries = 0
+                    call.set(step=str(parsedResponse.get("step")))
+                router.record(
+                    route,
+                    str(parsedResponse.get("step")).lower(),
+                    last_usage.get("input_tokens") or budget.total,
+                    last_usage.get("output_tokens") or get_counter("gemini").count_text(json.dumps(parsedResponse)),
+                    time.perf_counter() - start,
+                )
+                previous = "observe" if parsedResponse["step"].lower() == "action" else parsedResponse["step"].lower()
 
-        if parsedResponse["step"].lower() == "plan":
-            print(f"🧠 [{parsedResponse['step'].upper()}]: {parsedResponse['content']}")
-            continue
-
-        if parsedResponse["step"].lower() == "action":
-            toolName = parsedResponse["function"]
-            toolInput = parsedResponse["input"]
-
-            if avaiable_tools.get(toolName, False):
-                output = avaiable_tools[toolName].get("fn")(toolInput)
                 messages.append(
                     types.Content(
-                        role="user",
-                        parts=[
-                            types.Part.from_text(text=json.dumps({"step": "observe", "output": output}))
-                        ],
+                        role="assistant",
+                        parts=[types.Part.from_text(text=json.dumps(parsedResponse))],
                     )
                 )
-                continue
 
-        if parsedResponse.get("step").lower() == "output":
-            print(f"🤖: {parsedResponse.get('content')}")
-            break
+                if parsedResponse["step"].lower() == "plan":
+                    speculate(str(parsedResponse.get("content", "")))
+                    if not printed:
+                        print(f"🧠 [{parsedResponse['step'].upper()}]: {parsedResponse['content']}")
+                    continue
+
+                if parsedResponse["step"].lower() == "action":
+                    toolName = parsedResponse["function"]
+                    toolInput = parsedResponse["input"]
+
+                    if avaiable_tools.get(toolName, False):
+                        with tracer.span("tool.call", tool=toolName, input_bytes=len(str(toolInput))) as tool_span:
+                            output = avaiable_tools[toolName].get("fn")(toolInput)
+                            tool_span.set(output_bytes=len(str(output)))
+                        messages.append(
+                            types.Content(
+                                role="user",
+                                parts=[
+                                    types.Part.from_text(text=json.dumps({"step": "observe", "output": output}))
+                                ],
+                            )
+                        )
+                        continue
+
+                if parsedResponse.get("step").lower() == "output":
+                    if not printed:
+                        print(f"🤖: {parsedResponse.get('content')}")
+                    speculator.discard()
+                    break
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except (KeyboardInterrupt, EOFError):
+        print(f"\n🔀 Routing: {router.summary()}")
+        print(f"⚡ Prefetched lookups: {speculator.summary()}")
+        router.save()